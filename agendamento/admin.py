@@ -1,10 +1,27 @@
 from django.contrib import admin
-from .models import Agendamento
+from .models import Agendamento, PreReserva, ResumoDiario
 
 @admin.register(Agendamento)
 class AgendamentoAdmin(admin.ModelAdmin):
-    list_display = ['cliente', 'servico', 'data', 'hora', 'criado_em']
-    list_filter = ['data', 'servico', 'criado_em']
+    list_display = ['cliente', 'servico', 'funcionario', 'data', 'hora', 'criado_em']
+    list_filter = ['data', 'servico', 'funcionario', 'criado_em']
     search_fields = ['cliente__nome', 'cliente__email', 'servico__nome']
     date_hierarchy = 'data'
     ordering = ['data', 'hora']
+
+
+@admin.register(ResumoDiario)
+class ResumoDiarioAdmin(admin.ModelAdmin):
+    list_display = ['data', 'servico', 'quantidade', 'receita', 'minutos']
+    list_filter = ['servico']
+    date_hierarchy = 'data'
+    ordering = ['-data']
+    readonly_fields = ['data', 'servico', 'quantidade', 'receita', 'minutos']
+
+
+@admin.register(PreReserva)
+class PreReservaAdmin(admin.ModelAdmin):
+    list_display = ['cliente', 'servico', 'funcionario', 'data', 'hora', 'expira_em']
+    list_filter = ['data', 'funcionario']
+    search_fields = ['cliente__nome', 'cliente__email']
+    ordering = ['data', 'hora']
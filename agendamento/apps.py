@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class AgendamentoConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'agendamento'
+
+    def ready(self):
+        import agendamento.signals  # noqa: F401
@@ -0,0 +1,391 @@
+from bisect import bisect_left, bisect_right
+from datetime import time
+from itertools import accumulate
+
+# Intervalo padrão entre os horários oferecidos na agenda (em minutos)
+PASSO_PADRAO = 30
+
+
+def para_minutos(hora):
+    """Converte um datetime.time em minutos desde a meia-noite"""
+    return hora.hour * 60 + hora.minute
+
+
+def para_hora(minutos):
+    """Converte minutos desde a meia-noite em datetime.time"""
+    return time(minutos // 60, minutos % 60)
+
+
+def duracao_em_minutos(duracao):
+    """Converte um timedelta de duração de serviço em minutos inteiros"""
+    return int(duracao.total_seconds() / 60)
+
+
+def ocupacao_em_minutos(servico):
+    """Minutos que um agendamento do serviço ocupa a cadeira: duração mais a folga de limpeza"""
+    return duracao_em_minutos(servico.duracao) + servico.folga_minutos
+
+
+def passo_do_servico(servico, horario_funcionamento):
+    """Intervalo entre os horários oferecidos: o do serviço ou, se vazio, o do dia"""
+    return servico.intervalo_minutos or horario_funcionamento.intervalo_minutos
+
+
+def inicios_livres(ocupacao, servico, horario_funcionamento, barbeiro=None):
+    """
+    Inícios (em minutos) livres para o serviço na ocupação do dia, com o passo,
+    a folga e o modo de encaixe configurados no serviço e no horário de funcionamento
+    """
+    return ocupacao.horarios_livres(
+        duracao_em_minutos(servico.duracao),
+        passo_do_servico(servico, horario_funcionamento),
+        barbeiro=barbeiro,
+        folga=servico.folga_minutos,
+        encaixe=horario_funcionamento.encaixe
+    )
+
+
+def candidatos(abertura, fechamento, passo, fins=()):
+    """
+    Inícios a testar: a grade de `passo` em passo a partir da abertura e, no
+    modo de encaixe, também os fins dos intervalos ocupados (`fins`), para
+    oferecer horários colados aos agendamentos sem deixar sobras inúteis.
+    """
+    grade = range(abertura, fechamento, passo)
+    if not fins:
+        return grade
+    return sorted(set(grade).union(fim for fim in fins if abertura <= fim < fechamento))
+
+
+def ordenar_intervalos(agendamentos):
+    """Lista de (inicio, fim, agendamento) em minutos, ordenada pelo início"""
+    return sorted(
+        (
+            (
+                para_minutos(agendamento.hora),
+                para_minutos(agendamento.hora) + ocupacao_em_minutos(agendamento.servico),
+                agendamento,
+            )
+            for agendamento in agendamentos
+        ),
+        key=lambda intervalo: (intervalo[0], intervalo[1]),
+    )
+
+
+class OcupacaoDia:
+    """
+    Índice de ocupação de um dia de funcionamento.
+
+    Monta uma única vez um mapa minuto a minuto do expediente (com soma
+    acumulada) e a lista ordenada dos intervalos ocupados, de forma que
+    verificar se um serviço cabe em um horário custa O(1) e listar todos os
+    horários livres é uma única passada pelo expediente.
+    """
+
+    def __init__(self, abertura, fechamento, agendamentos=()):
+        self.abertura = para_minutos(abertura)
+        self.fechamento = para_minutos(fechamento)
+
+        # (inicio, fim, agendamento) ordenados pelo início
+        self.intervalos = ordenar_intervalos(agendamentos)
+        self._inicios = [intervalo[0] for intervalo in self.intervalos]
+
+        # Mapa de ocupação do expediente: 1 para cada minuto ocupado
+        self._ocupado = bytearray(max(self.fechamento - self.abertura, 0))
+        for inicio, fim, _ in self.intervalos:
+            self._ocupar(inicio, fim)
+        self._acumulado = list(accumulate(self._ocupado, initial=0))
+
+    def _ocupar(self, inicio, fim):
+        a = max(inicio, self.abertura) - self.abertura
+        b = min(fim, self.fechamento) - self.abertura
+        if a < b:
+            self._ocupado[a:b] = b'\x01' * (b - a)
+
+    @classmethod
+    def do_horario(cls, horario_funcionamento, agendamentos=()):
+        """Cria o índice a partir de um HorarioFuncionamento"""
+        return cls(horario_funcionamento.hora_inicio, horario_funcionamento.hora_fim, agendamentos)
+
+    def marcar(self, agendamento):
+        """
+        Acrescenta um agendamento ao índice sem remontá-lo: custa uma passada
+        pelo expediente, e não uma pelos agendamentos do dia
+        """
+        intervalo = ordenar_intervalos([agendamento])[0]
+        posicao = bisect_right(self.intervalos, intervalo[:2], key=lambda item: item[:2])
+        self.intervalos.insert(posicao, intervalo)
+        self._inicios.insert(posicao, intervalo[0])
+        self._ocupar(intervalo[0], intervalo[1])
+        self._acumulado = list(accumulate(self._ocupado, initial=0))
+
+    def cabe(self, inicio, duracao):
+        """Indica se um serviço de `duracao` minutos iniciando em `inicio` cabe no expediente"""
+        return inicio >= self.abertura and inicio + duracao <= self.fechamento
+
+    def livre(self, inicio, duracao, folga=0):
+        """
+        Indica se um serviço de `duracao` minutos iniciando em `inicio` cabe no
+        expediente sem conflito, incluindo a `folga` seguinte (que pode passar do fechamento)
+        """
+        if not self.cabe(inicio, duracao):
+            return False
+        a = inicio - self.abertura
+        b = min(inicio + duracao + folga, self.fechamento) - self.abertura
+        return self._acumulado[b] == self._acumulado[a]
+
+    def conflito(self, inicio, duracao, folga=0):
+        """Retorna o primeiro intervalo (inicio, fim, agendamento) que se sobrepõe, ou None"""
+        fim = inicio + duracao + folga
+        if self.livre(inicio, duracao, folga):
+            return None
+        # Só os intervalos que começam antes do fim do novo podem sobrepor
+        for intervalo in self.intervalos[:bisect_left(self._inicios, fim)]:
+            if intervalo[1] > inicio:
+                return intervalo
+        return None
+
+    def horarios_livres(self, duracao, passo=PASSO_PADRAO, folga=0, encaixe=False):
+        """Lista, em minutos, os inícios onde um serviço de `duracao` minutos cabe sem conflito"""
+        acumulado = self._acumulado
+        ultimo_inicio = self.fechamento - duracao
+        fins = [intervalo[1] for intervalo in self.intervalos] if encaixe else ()
+        return [
+            minutos
+            for minutos in candidatos(self.abertura, self.fechamento, passo, fins)
+            if minutos <= ultimo_inicio
+            and acumulado[min(minutos + duracao + folga, self.fechamento) - self.abertura]
+            == acumulado[minutos - self.abertura]
+        ]
+
+
+class OcupacaoCadeiras:
+    """
+    Ocupação de um dia com várias cadeiras (um OcupacaoDia por barbeiro).
+
+    Cada barbeiro tem seu próprio expediente (o da barbearia, recortado pelo
+    horário do barbeiro) e seus próprios agendamentos. Agendamentos sem
+    barbeiro ocupam todas as cadeiras. Sem barbeiros cadastrados, a barbearia
+    funciona como uma cadeira única (chave None).
+    """
+
+    def __init__(self, abertura, fechamento, cadeiras, intervalos):
+        self.abertura = para_minutos(abertura)
+        self.fechamento = para_minutos(fechamento)
+        # funcionario_id -> OcupacaoDia
+        self.cadeiras = cadeiras
+        # Todos os agendamentos do dia, ordenados pelo início
+        self.intervalos = intervalos
+
+    @classmethod
+    def montar(cls, horario_funcionamento, agendamentos, barbeiros=(), horarios_barbeiros=None):
+        """
+        `barbeiros` são os ids dos barbeiros que atendem e `horarios_barbeiros`
+        mapeia id -> HorarioFuncionario do dia da semana (quando houver).
+        """
+        agendamentos = list(agendamentos)
+        abertura = horario_funcionamento.hora_inicio
+        fechamento = horario_funcionamento.hora_fim
+
+        if not barbeiros:
+            unica = OcupacaoDia(abertura, fechamento, agendamentos)
+            return cls(abertura, fechamento, {None: unica}, unica.intervalos)
+
+        horarios_barbeiros = horarios_barbeiros or {}
+        sem_barbeiro = []
+        por_barbeiro = {barbeiro: [] for barbeiro in barbeiros}
+        for agendamento in agendamentos:
+            if agendamento.funcionario_id is None:
+                sem_barbeiro.append(agendamento)
+            elif agendamento.funcionario_id in por_barbeiro:
+                por_barbeiro[agendamento.funcionario_id].append(agendamento)
+
+        cadeiras = {}
+        for barbeiro in barbeiros:
+            horario = horarios_barbeiros.get(barbeiro)
+            if horario is not None and not horario.ativo:
+                continue
+            inicio = max(abertura, horario.hora_inicio) if horario else abertura
+            fim = min(fechamento, horario.hora_fim) if horario else fechamento
+            cadeiras[barbeiro] = OcupacaoDia(inicio, fim, por_barbeiro[barbeiro] + sem_barbeiro)
+
+        return cls(abertura, fechamento, cadeiras, ordenar_intervalos(agendamentos))
+
+    def marcar(self, agendamento):
+        """Acrescenta um agendamento às cadeiras que ele ocupa, como montar() faria"""
+        if None in self.cadeiras:
+            # Cadeira única: a lista de intervalos do dia é a dela
+            self.cadeiras[None].marcar(agendamento)
+            return
+        if agendamento.funcionario_id is None:
+            cadeiras = self.cadeiras.values()
+        else:
+            cadeiras = [self.cadeiras[agendamento.funcionario_id]] if agendamento.funcionario_id in self.cadeiras else []
+        for ocupacao in cadeiras:
+            ocupacao.marcar(agendamento)
+        intervalo = ordenar_intervalos([agendamento])[0]
+        self.intervalos.insert(bisect_right(self.intervalos, intervalo[:2], key=lambda item: item[:2]), intervalo)
+
+    def cadeiras_livres(self, inicio, duracao, folga=0):
+        """Ids dos barbeiros livres durante [inicio, inicio + duracao) e a folga seguinte"""
+        return [barbeiro for barbeiro, ocupacao in self.cadeiras.items() if ocupacao.livre(inicio, duracao, folga)]
+
+    def conflito(self, inicio, duracao, barbeiro=None, folga=0):
+        """Primeiro intervalo que impede o horário na cadeira pedida (ou em todas), ou None"""
+        if barbeiro is None:
+            cadeiras = self.cadeiras.values()
+        elif barbeiro in self.cadeiras:
+            cadeiras = [self.cadeiras[barbeiro]]
+        else:
+            return None
+        for ocupacao in cadeiras:
+            intervalo = ocupacao.conflito(inicio, duracao, folga)
+            if intervalo:
+                return intervalo
+        return None
+
+    def horarios_livres(self, duracao, passo=PASSO_PADRAO, barbeiro=None, folga=0, encaixe=False):
+        """
+        Inícios (em minutos) em que ao menos uma cadeira — ou a cadeira pedida —
+        está livre. Com `encaixe`, testa também os fins dos agendamentos dessas cadeiras.
+        """
+        if barbeiro is not None:
+            ocupacao = self.cadeiras.get(barbeiro)
+            if ocupacao is None:
+                return []
+            cadeiras = [ocupacao]
+        else:
+            cadeiras = list(self.cadeiras.values())
+            if len(cadeiras) == 1 and cadeiras[0].abertura == self.abertura:
+                return cadeiras[0].horarios_livres(duracao, passo, folga, encaixe)
+
+        fins = [intervalo[1] for ocupacao in cadeiras for intervalo in ocupacao.intervalos] if encaixe else ()
+        return [
+            minutos for minutos in candidatos(self.abertura, self.fechamento, passo, fins)
+            if any(ocupacao.livre(minutos, duracao, folga) for ocupacao in cadeiras)
+        ]
+
+
+class OcupacaoSlots:
+    """
+    Ocupação de um dia lida da grade materializada (tabela Slot), com a mesma
+    interface de OcupacaoCadeiras.
+
+    Cada cadeira tem um mapa das suas células de `granularidade` minutos que
+    estão livres (com soma acumulada); um serviço cabe em uma cadeira quando
+    todas as células que ele toca estão livres.
+    """
+
+    # Um dia e mais um, para serviços que passam da meia-noite
+    TAMANHO = 2 * 24 * 60
+
+    def __init__(self, abertura, fechamento, granularidade, celulas, extras=()):
+        """
+        `celulas` são (cadeira, minuto, agendamento ou None) de cada célula do
+        dia; `extras` são ocupações que não estão na grade (ex.: pré-reservas),
+        que bloqueiam a cadeira do seu funcionario_id ou todas.
+        """
+        self.abertura = para_minutos(abertura)
+        self.fechamento = para_minutos(fechamento)
+        self.granularidade = granularidade
+
+        livres = {}
+        ocupantes = {}
+        self._fim = {}
+        for cadeira, minuto, agendamento in celulas:
+            mapa = livres.setdefault(cadeira, bytearray(self.TAMANHO // granularidade))
+            self._fim[cadeira] = max(self._fim.get(cadeira, 0), minuto // granularidade + 1)
+            if agendamento is None:
+                mapa[minuto // granularidade] = 1
+            else:
+                ocupantes.setdefault(agendamento.pk, (agendamento, set()))[1].add(cadeira)
+
+        for extra in extras:
+            cadeiras = [extra.funcionario_id] if extra.funcionario_id in livres else list(livres)
+            inicio = para_minutos(extra.hora)
+            a, b = self._celulas(inicio, ocupacao_em_minutos(extra.servico))
+            for cadeira in cadeiras:
+                livres[cadeira][a:b] = bytes(b - a)
+            ocupantes[('extra', id(extra))] = (extra, set(cadeiras))
+
+        self._acumulado = {cadeira: list(accumulate(mapa, initial=0)) for cadeira, mapa in livres.items()}
+        self.cadeiras = list(self._acumulado)
+
+        ordenados = ordenar_intervalos(ocupante for ocupante, _ in ocupantes.values())
+        self._cadeiras_do_ocupante = {id(ocupante): cadeiras for ocupante, cadeiras in ocupantes.values()}
+        self.intervalos = ordenados
+        self._inicios = [intervalo[0] for intervalo in ordenados]
+
+    def _celulas(self, inicio, duracao):
+        """Índices [a, b) das células tocadas por [inicio, inicio + duracao)"""
+        g = self.granularidade
+        return inicio // g, min(-(-(inicio + duracao) // g), self.TAMANHO // g)
+
+    def livre(self, cadeira, inicio, duracao, folga=0):
+        """
+        Indica se o serviço cabe na cadeira: as células do serviço precisam
+        existir e estar livres; as da folga, só estar livres (podem passar do fechamento)
+        """
+        acumulado = self._acumulado.get(cadeira)
+        if acumulado is None or inicio < 0:
+            return False
+        a, b = self._celulas(inicio, duracao)
+        if acumulado[b] - acumulado[a] != b - a:
+            return False
+        if not folga:
+            return True
+        # Só as células da folga dentro do expediente da cadeira precisam estar livres
+        c = max(b, min(self._celulas(inicio, duracao + folga)[1], self._fim[cadeira]))
+        return acumulado[c] - acumulado[b] == c - b
+
+    def marcar(self, agendamento):
+        """Acrescenta um agendamento às cadeiras que ele ocupa, como montar() faria"""
+        if None in self.cadeiras:
+            # Cadeira única: a lista de intervalos do dia é a dela
+            self.cadeiras[None].marcar(agendamento)
+            return
+        if agendamento.funcionario_id is None:
+            cadeiras = self.cadeiras.values()
+        else:
+            cadeiras = [self.cadeiras[agendamento.funcionario_id]] if agendamento.funcionario_id in self.cadeiras else []
+        for ocupacao in cadeiras:
+            ocupacao.marcar(agendamento)
+        intervalo = ordenar_intervalos([agendamento])[0]
+        self.intervalos.insert(bisect_right(self.intervalos, intervalo[:2], key=lambda item: item[:2]), intervalo)
+
+    def cadeiras_livres(self, inicio, duracao, folga=0):
+        """Ids dos barbeiros (None = cadeira única) livres durante [inicio, inicio + duracao) e a folga seguinte"""
+        return [cadeira for cadeira in self.cadeiras if self.livre(cadeira, inicio, duracao, folga)]
+
+    def conflito(self, inicio, duracao, barbeiro=None, folga=0):
+        """Primeiro intervalo que impede o horário na cadeira pedida (ou em todas), ou None"""
+        if barbeiro is not None and barbeiro not in self._acumulado:
+            return None
+        # Compara pelas células, que é como a grade enxerga a ocupação
+        a, b = self._celulas(inicio, duracao + folga)
+        for intervalo in self.intervalos[:bisect_left(self._inicios, b * self.granularidade)]:
+            inicio_ocupado, fim_ocupado = self._celulas(intervalo[0], intervalo[1] - intervalo[0])
+            if fim_ocupado > a and inicio_ocupado < b and (
+                barbeiro is None or barbeiro in self._cadeiras_do_ocupante[id(intervalo[2])]
+            ):
+                return intervalo
+        return None
+
+    def horarios_livres(self, duracao, passo=PASSO_PADRAO, barbeiro=None, folga=0, encaixe=False):
+        """Inícios (em minutos) em que ao menos uma cadeira — ou a cadeira pedida — está livre"""
+        cadeiras = self.cadeiras if barbeiro is None else [barbeiro]
+        ultimo_inicio = self.fechamento - duracao
+        fins = ()
+        if encaixe:
+            # Na grade, um agendamento libera a cadeira no fim da sua última célula
+            g = self.granularidade
+            fins = [
+                -(-intervalo[1] // g) * g for intervalo in self.intervalos
+                if barbeiro is None or barbeiro in self._cadeiras_do_ocupante[id(intervalo[2])]
+            ]
+        return [
+            minutos for minutos in candidatos(self.abertura, self.fechamento, passo, fins)
+            if minutos <= ultimo_inicio
+            and any(self.livre(cadeira, minutos, duracao, folga) for cadeira in cadeiras)
+        ]
+
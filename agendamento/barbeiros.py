@@ -0,0 +1,18 @@
+from agendamento.availability import OcupacaoCadeiras
+from agendamento.catalogo import acatalogo, catalogo
+
+
+def _montar(cadastro, data, horario_funcionamento, agendamentos):
+    return OcupacaoCadeiras.montar(
+        horario_funcionamento, agendamentos, cadastro.barbeiros_ids(), cadastro.horarios_barbeiros[data.weekday()]
+    )
+
+
+def ocupacao_do_dia(data, horario_funcionamento, agendamentos):
+    """Monta a ocupação das cadeiras de uma data a partir dos agendamentos do dia"""
+    return _montar(catalogo(), data, horario_funcionamento, agendamentos)
+
+
+async def aocupacao_do_dia(data, horario_funcionamento, agendamentos):
+    """Versão assíncrona de ocupacao_do_dia()"""
+    return _montar(await acatalogo(), data, horario_funcionamento, agendamentos)
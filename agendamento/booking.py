@@ -0,0 +1,173 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from agendamento import slots
+from agendamento.availability import duracao_em_minutos, para_minutos
+from agendamento.barbeiros import aocupacao_do_dia, ocupacao_do_dia
+from agendamento.models import Agendamento, DiaAgenda, PreReserva
+
+
+class ConflitoHorario(Exception):
+    """
+    Levantada quando o horário pedido não está livre. `agendamento` é o
+    agendamento que se sobrepõe, ou None quando o barbeiro não atende no horário.
+    """
+
+    def __init__(self, intervalo=None):
+        self.inicio, self.fim, self.agendamento = intervalo or (None, None, None)
+        super().__init__('Horário indisponível')
+
+    @property
+    def pre_reserva(self):
+        """Indica se o horário está apenas reservado temporariamente por outro cliente"""
+        return isinstance(self.agendamento, PreReserva)
+
+
+def pre_reservas_ativas(data=None):
+    """Pré-reservas ainda não expiradas (de uma data, se informada)"""
+    pre_reservas = PreReserva.objects.filter(expira_em__gt=timezone.now())
+    if data is not None:
+        pre_reservas = pre_reservas.filter(data=data)
+    return pre_reservas.select_related('servico')
+
+
+def ocupacao_atual(data, horario_funcionamento, exceto_cliente=None):
+    """
+    Ocupação das cadeiras na data: agendamentos e pré-reservas ativas (menos
+    as de `exceto_cliente`). Lida da grade materializada quando ela existe
+    para a data; caso contrário, calculada a partir dos agendamentos.
+    """
+    pre_reservas = pre_reservas_ativas(data)
+    if exceto_cliente is not None:
+        pre_reservas = pre_reservas.exclude(cliente_id=exceto_cliente)
+    pre_reservas = list(pre_reservas)
+
+    if slots.ativo():
+        grade = slots.grade_do_dia(data, horario_funcionamento, pre_reservas)
+        if grade is not None:
+            return grade
+    agendamentos = list(Agendamento.objects.filter(data=data).select_related('servico'))
+    return ocupacao_do_dia(data, horario_funcionamento, agendamentos + pre_reservas)
+
+
+async def aocupacao_atual(data, horario_funcionamento):
+    """Versão assíncrona de ocupacao_atual()"""
+    pre_reservas = [pre_reserva async for pre_reserva in pre_reservas_ativas(data)]
+
+    if slots.ativo():
+        grade = await slots.agrade_do_dia(data, horario_funcionamento, pre_reservas)
+        if grade is not None:
+            return grade
+    agendamentos = Agendamento.objects.filter(data=data).select_related('servico')
+    agendamentos = [agendamento async for agendamento in agendamentos]
+    return await aocupacao_do_dia(data, horario_funcionamento, agendamentos + pre_reservas)
+
+
+def limpar_pre_reservas_expiradas(data=None):
+    """Remove as pré-reservas expiradas; os sinais de exclusão atualizam a disponibilidade"""
+    expiradas = PreReserva.objects.filter(expira_em__lte=timezone.now())
+    if data is not None:
+        expiradas = expiradas.filter(data=data)
+    return expiradas.delete()[0]
+
+
+def _escolher_cadeira(data, hora, servico, horario_funcionamento, funcionario_id, cliente_id):
+    """
+    Barbeiro livre para o horário, considerando agendamentos e pré-reservas de
+    outros clientes. Deve ser chamada com o dia bloqueado.
+    """
+    ocupacao = ocupacao_atual(data, horario_funcionamento, exceto_cliente=cliente_id)
+    inicio = para_minutos(hora)
+    duracao = duracao_em_minutos(servico.duracao)
+
+    livres = ocupacao.cadeiras_livres(inicio, duracao, servico.folga_minutos)
+    if funcionario_id is not None:
+        livres = [barbeiro for barbeiro in livres if barbeiro == funcionario_id]
+    if not livres:
+        raise ConflitoHorario(ocupacao.conflito(inicio, duracao, funcionario_id, servico.folga_minutos))
+    return livres[0]
+
+
+def _bloquear_dia(data):
+    # Cria a linha do dia fora da transação principal: no MySQL (REPEATABLE READ)
+    # uma leitura comum antes do bloqueio fixaria um snapshot desatualizado
+    DiaAgenda.objects.get_or_create(data=data)
+    limpar_pre_reservas_expiradas(data)
+
+
+def reservar(cliente_id, servico, data, hora, horario_funcionamento, observacoes='', funcionario_id=None):
+    """
+    Cria um agendamento de forma atômica.
+
+    As reservas de uma mesma data são serializadas por um bloqueio
+    (select_for_update) na linha DiaAgenda do dia: a verificação de conflito e
+    a criação acontecem dentro da mesma transação, então duas requisições
+    simultâneas não conseguem reservar o mesmo horário. Datas diferentes não
+    disputam o mesmo bloqueio.
+
+    Com `funcionario_id` o agendamento vai para esse barbeiro; sem ele, para o
+    primeiro barbeiro livre no horário. Pré-reservas ativas de outros clientes
+    contam como ocupadas; as do próprio cliente são convertidas no agendamento.
+    """
+    _bloquear_dia(data)
+
+    with transaction.atomic():
+        DiaAgenda.objects.select_for_update().get(data=data)
+
+        if funcionario_id is None:
+            # Mantém o barbeiro da pré-reserva do cliente para este mesmo horário
+            pre_reserva = pre_reservas_ativas(data).filter(
+                cliente_id=cliente_id, hora=hora, servico=servico
+            ).first()
+            funcionario_id = pre_reserva.funcionario_id if pre_reserva else None
+
+        barbeiro = _escolher_cadeira(data, hora, servico, horario_funcionamento, funcionario_id, cliente_id)
+        PreReserva.objects.filter(cliente_id=cliente_id).delete()
+        try:
+            return Agendamento.objects.create(
+                cliente_id=cliente_id,
+                servico=servico,
+                funcionario_id=barbeiro,
+                data=data,
+                hora=hora,
+                observacoes=observacoes
+            )
+        except slots.SlotOcupado:
+            # A grade materializada recusou as células (ex.: sobreposições antigas na grade)
+            ocupacao = ocupacao_atual(data, horario_funcionamento, exceto_cliente=cliente_id)
+            raise ConflitoHorario(ocupacao.conflito(
+                para_minutos(hora), duracao_em_minutos(servico.duracao), barbeiro, servico.folga_minutos
+            ))
+
+
+def segurar(cliente_id, servico, data, hora, horario_funcionamento, funcionario_id=None):
+    """
+    Reserva temporariamente um horário para o cliente por
+    settings.PRE_RESERVA_MINUTOS, substituindo a pré-reserva anterior dele.
+
+    Usa o mesmo bloqueio e a mesma verificação de conflito de reservar(), então
+    levanta ConflitoHorario nas mesmas situações.
+    """
+    _bloquear_dia(data)
+
+    with transaction.atomic():
+        DiaAgenda.objects.select_for_update().get(data=data)
+
+        barbeiro = _escolher_cadeira(data, hora, servico, horario_funcionamento, funcionario_id, cliente_id)
+        PreReserva.objects.filter(cliente_id=cliente_id).delete()
+        return PreReserva.objects.create(
+            cliente_id=cliente_id,
+            servico=servico,
+            funcionario_id=barbeiro,
+            data=data,
+            hora=hora,
+            expira_em=timezone.now() + timedelta(minutes=settings.PRE_RESERVA_MINUTOS)
+        )
+
+
+def liberar(cliente_id):
+    """Desfaz a pré-reserva do cliente, se houver"""
+    return PreReserva.objects.filter(cliente_id=cliente_id).delete()[0]
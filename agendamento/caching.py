@@ -0,0 +1,127 @@
+import time as _time
+from datetime import datetime
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+# Versão global: muda quando horários de funcionamento ou serviços são editados
+CHAVE_VERSAO_GLOBAL = 'disponibilidade:versao:global'
+
+# Versão do catálogo (horários, serviços e barbeiros) guardado em memória por cada processo
+CHAVE_VERSAO_CATALOGO = 'catalogo:versao'
+
+
+def chave_versao_data(data):
+    """Chave da versão de disponibilidade de uma data"""
+    return f'disponibilidade:versao:{data.isoformat()}'
+
+
+def _versao_inicial():
+    # Baseada no relógio para não reaproveitar entradas antigas caso a chave de versão seja descartada
+    return int(_time.time() * 1000)
+
+
+def _incrementar(chave):
+    try:
+        cache.incr(chave)
+    except ValueError:
+        cache.add(chave, _versao_inicial(), None)
+
+
+def versoes(data):
+    """Retorna (versão da data, versão global) criando as que ainda não existem"""
+    chaves = [chave_versao_data(data), CHAVE_VERSAO_GLOBAL]
+    encontradas = cache.get_many(chaves)
+    for chave in chaves:
+        if chave not in encontradas:
+            cache.add(chave, _versao_inicial(), None)
+            encontradas[chave] = cache.get(chave)
+    return encontradas[chaves[0]], encontradas[chaves[1]]
+
+
+async def aversoes(data):
+    """Versão assíncrona de versoes()"""
+    chaves = [chave_versao_data(data), CHAVE_VERSAO_GLOBAL]
+    encontradas = await cache.aget_many(chaves)
+    for chave in chaves:
+        if chave not in encontradas:
+            await cache.aadd(chave, _versao_inicial(), None)
+            encontradas[chave] = await cache.aget(chave)
+    return encontradas[chaves[0]], encontradas[chaves[1]]
+
+
+def versao_catalogo():
+    """Versão atual do catálogo, criada se ainda não existir"""
+    versao = cache.get(CHAVE_VERSAO_CATALOGO)
+    if versao is None:
+        cache.add(CHAVE_VERSAO_CATALOGO, _versao_inicial(), None)
+        versao = cache.get(CHAVE_VERSAO_CATALOGO)
+    return versao
+
+
+async def aversao_catalogo():
+    """Versão assíncrona de versao_catalogo()"""
+    versao = await cache.aget(CHAVE_VERSAO_CATALOGO)
+    if versao is None:
+        await cache.aadd(CHAVE_VERSAO_CATALOGO, _versao_inicial(), None)
+        versao = await cache.aget(CHAVE_VERSAO_CATALOGO)
+    return versao
+
+
+def invalidar_catalogo():
+    """Avisa todos os processos que o catálogo em memória deve ser recarregado"""
+    _incrementar(CHAVE_VERSAO_CATALOGO)
+
+
+def invalidar_data(data):
+    """Invalida a disponibilidade em cache de uma data"""
+    _incrementar(chave_versao_data(data))
+
+
+def invalidar_tudo():
+    """Invalida a disponibilidade em cache de todas as datas"""
+    _incrementar(CHAVE_VERSAO_GLOBAL)
+
+
+def _timeout(resultado):
+    """
+    Tempo em cache de uma disponibilidade: não passa da expiração da primeira
+    pré-reserva considerada, já que expirar não dispara invalidação.
+    """
+    expiracoes = [
+        datetime.fromisoformat(ocupado['expira_em'])
+        for ocupado in resultado.get('horarios_ocupados', ())
+        if ocupado.get('expira_em')
+    ]
+    if not expiracoes:
+        return settings.DISPONIBILIDADE_CACHE_TIMEOUT
+    restante = (min(expiracoes) - timezone.now()).total_seconds()
+    return max(1, min(int(restante) + 1, settings.DISPONIBILIDADE_CACHE_TIMEOUT))
+
+
+def _chave_disponibilidade(data, nome, versao_data, versao_global):
+    return f'disponibilidade:{data.isoformat()}:{nome}:{versao_data}:{versao_global}'
+
+
+def disponibilidade_em_cache(data, nome, calcular):
+    """
+    Retorna a disponibilidade `nome` da data a partir do cache, calculando e
+    armazenando com `calcular()` quando não houver entrada na versão atual.
+    """
+    chave = _chave_disponibilidade(data, nome, *versoes(data))
+    resultado = cache.get(chave)
+    if resultado is None:
+        resultado = calcular()
+        cache.set(chave, resultado, _timeout(resultado))
+    return resultado
+
+
+async def adisponibilidade_em_cache(data, nome, acalcular):
+    """Versão assíncrona de disponibilidade_em_cache(); `acalcular` é uma corrotina"""
+    chave = _chave_disponibilidade(data, nome, *await aversoes(data))
+    resultado = await cache.aget(chave)
+    if resultado is None:
+        resultado = await acalcular()
+        await cache.aset(chave, resultado, _timeout(resultado))
+    return resultado
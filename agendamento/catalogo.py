@@ -0,0 +1,130 @@
+import threading
+import time as _time
+from collections import defaultdict
+
+from django.conf import settings
+
+from agendamento import caching
+from funcionarios.models import Funcionario, HorarioFuncionamento, HorarioFuncionario
+from servicos.models import Servico
+
+
+class Catalogo:
+    """
+    Retrato em memória dos cadastros que quase nunca mudam e são lidos em toda
+    consulta de disponibilidade e reserva. As instâncias são compartilhadas
+    entre requisições: use-as apenas para leitura.
+    """
+
+    def __init__(self, versao, horarios, servicos, barbeiros, horarios_barbeiros):
+        self.versao = versao
+        self.horarios = {horario.dia_semana: horario for horario in horarios}
+        self.servicos = {servico.id: servico for servico in servicos}
+        self.barbeiros = list(barbeiros)
+        self.horarios_barbeiros = defaultdict(dict)
+        for horario in horarios_barbeiros:
+            self.horarios_barbeiros[horario.dia_semana][horario.funcionario_id] = horario
+
+    def horario_do_dia(self, data):
+        """Horário de funcionamento ativo da data, ou None se a barbearia não abre"""
+        horario = self.horarios.get(data.weekday())
+        return horario if horario is not None and horario.ativo else None
+
+    def horarios_ativos(self):
+        """Mapeia dia da semana -> HorarioFuncionamento dos dias em que a barbearia abre"""
+        return {dia: horario for dia, horario in self.horarios.items() if horario.ativo}
+
+    def servico(self, servico_id):
+        """Serviço pelo id; levanta Servico.DoesNotExist como Servico.objects.get()"""
+        try:
+            return self.servicos[int(servico_id)]
+        except (KeyError, TypeError, ValueError):
+            raise Servico.DoesNotExist(f'Serviço {servico_id} não encontrado')
+
+    def barbeiros_ids(self):
+        return [barbeiro.id for barbeiro in self.barbeiros]
+
+
+def _consultas():
+    return (
+        HorarioFuncionamento.objects.all(),
+        Servico.objects.order_by('id'),
+        Funcionario.objects.filter(status=True, atende=True).order_by('id'),
+        HorarioFuncionario.objects.filter(funcionario__status=True, funcionario__atende=True),
+    )
+
+
+_catalogo = None
+_verificado_em = 0.0
+_geracao = 0
+_lock = threading.Lock()
+
+
+def _guardar(novo, geracao):
+    global _catalogo, _verificado_em
+    with _lock:
+        # Um descarte durante a carga torna o que foi lido suspeito: não guarda
+        if geracao == _geracao:
+            _catalogo = novo
+            _verificado_em = _time.monotonic()
+
+
+def _recente():
+    """Catálogo em memória, se a versão foi conferida há menos de CATALOGO_VERIFICACAO_SEGUNDOS"""
+    atual = _catalogo
+    if atual is not None and _time.monotonic() - _verificado_em < settings.CATALOGO_VERIFICACAO_SEGUNDOS:
+        return atual
+    return None
+
+
+def catalogo():
+    """
+    Catálogo do processo, recarregado do banco só quando a versão compartilhada
+    (no cache) mudou. Entre conferências da versão, nem o cache é consultado.
+    """
+    atual = _recente()
+    if atual is not None:
+        return atual
+
+    geracao = _geracao
+    versao = caching.versao_catalogo()
+    atual = _catalogo
+    if atual is None or atual.versao != versao:
+        atual = Catalogo(versao, *(list(consulta) for consulta in _consultas()))
+    _guardar(atual, geracao)
+    return atual
+
+
+async def acatalogo():
+    """Versão assíncrona de catalogo()"""
+    atual = _recente()
+    if atual is not None:
+        return atual
+
+    geracao = _geracao
+    versao = await caching.aversao_catalogo()
+    atual = _catalogo
+    if atual is None or atual.versao != versao:
+        consultas = []
+        for consulta in _consultas():
+            consultas.append([objeto async for objeto in consulta])
+        atual = Catalogo(versao, *consultas)
+    _guardar(atual, geracao)
+    return atual
+
+
+def descartar():
+    """Descarta o catálogo deste processo; a próxima leitura vai ao banco"""
+    global _catalogo, _geracao
+    with _lock:
+        _catalogo = None
+        _geracao += 1
+
+
+def invalidar():
+    """
+    Descarta o catálogo deste processo e avisa os demais pela versão
+    compartilhada. Dentro de uma transação, chame em transaction.on_commit.
+    """
+    caching.invalidar_catalogo()
+    descartar()
@@ -0,0 +1,122 @@
+from agendamento.availability import inicios_livres, para_hora
+from agendamento.booking import aocupacao_atual, ocupacao_atual
+from agendamento.catalogo import acatalogo, catalogo
+from agendamento.models import PreReserva
+
+# Resposta quando a barbearia não funciona no dia pedido
+SEM_FUNCIONAMENTO = {
+    'error': 'A barbearia não funciona neste dia da semana.',
+    'horarios_disponiveis': []
+}
+
+
+def horario_do_dia(data):
+    """Horário de funcionamento ativo da data, ou None se a barbearia não abre"""
+    return catalogo().horario_do_dia(data)
+
+
+async def ahorario_do_dia(data):
+    """Versão assíncrona de horario_do_dia()"""
+    return (await acatalogo()).horario_do_dia(data)
+
+
+def _horarios(minutos):
+    horarios = []
+    for inicio in minutos:
+        hora = para_hora(inicio).strftime('%H:%M')
+        horarios.append({'hora': hora, 'display': hora})
+    return horarios
+
+
+def _horarios_ocupados(ocupacao):
+    """Intervalos ocupados do dia (inclusive a folga de limpeza) para exibição"""
+    horarios_ocupados = []
+    for _, fim, agendamento in ocupacao.intervalos:
+        ocupado = {
+            'inicio': agendamento.hora.strftime('%H:%M'),
+            'fim': para_hora(fim % 1440).strftime('%H:%M'),
+            'duracao': str(agendamento.servico.duracao),
+            'servico': agendamento.servico.nome,
+            'pre_reserva': isinstance(agendamento, PreReserva)
+        }
+        if ocupado['pre_reserva']:
+            ocupado['expira_em'] = agendamento.expira_em.isoformat()
+        horarios_ocupados.append(ocupado)
+    return horarios_ocupados
+
+
+def livres(ocupacao, horario_funcionamento, servico=None, funcionario_id=None):
+    """
+    Inícios livres (em minutos) na ocupação do dia. Com `servico`, considera a
+    duração e a folga dele; sem serviço, lista os horários da grade do dia em
+    que ao menos um intervalo inteiro está livre.
+    """
+    if servico is not None:
+        return inicios_livres(ocupacao, servico, horario_funcionamento, funcionario_id)
+    passo = horario_funcionamento.intervalo_minutos
+    return ocupacao.horarios_livres(passo, passo, barbeiro=funcionario_id, encaixe=horario_funcionamento.encaixe)
+
+
+def montar_horarios_disponiveis(servico, horario_funcionamento, ocupacao, funcionario_id=None):
+    """Monta a resposta de disponibilidade a partir da ocupação já carregada do dia"""
+    return {
+        'horarios_ocupados': _horarios_ocupados(ocupacao),
+        'horarios_disponiveis': _horarios(livres(ocupacao, horario_funcionamento, servico, funcionario_id)),
+        'duracao_servico': str(servico.duracao),
+        'horario_funcionamento': {
+            'inicio': horario_funcionamento.hora_inicio.strftime('%H:%M'),
+            'fim': horario_funcionamento.hora_fim.strftime('%H:%M')
+        }
+    }
+
+
+def montar_horarios_funcionario(horario_funcionamento, ocupacao, servico=None, funcionario_id=None):
+    """Resposta da API dos funcionários: os horários livres do dia e o que está ocupado"""
+    return {
+        'horarios': _horarios(livres(ocupacao, horario_funcionamento, servico, funcionario_id)),
+        'horarios_ocupados': _horarios_ocupados(ocupacao),
+    }
+
+
+def calcular_horarios_disponiveis(data, servico_id, funcionario_id=None):
+    """Calcula a disponibilidade de um serviço em uma data (sem cache)"""
+    cadastro = catalogo()
+    servico = cadastro.servico(servico_id)
+    horario_funcionamento = cadastro.horario_do_dia(data)
+    if horario_funcionamento is None:
+        return SEM_FUNCIONAMENTO
+    ocupacao = ocupacao_atual(data, horario_funcionamento)
+    return montar_horarios_disponiveis(servico, horario_funcionamento, ocupacao, funcionario_id)
+
+
+async def acalcular_horarios_disponiveis(data, servico_id, funcionario_id=None):
+    """Versão assíncrona de calcular_horarios_disponiveis()"""
+    cadastro = await acatalogo()
+    servico = cadastro.servico(servico_id)
+    horario_funcionamento = cadastro.horario_do_dia(data)
+    if horario_funcionamento is None:
+        return SEM_FUNCIONAMENTO
+    ocupacao = await aocupacao_atual(data, horario_funcionamento)
+    return montar_horarios_disponiveis(servico, horario_funcionamento, ocupacao, funcionario_id)
+
+
+def calcular_horarios_funcionario(data, servico_id=None, funcionario_id=None):
+    """Horários livres de uma data para a API dos funcionários (sem cache)"""
+    cadastro = catalogo()
+    servico = cadastro.servico(servico_id) if servico_id is not None else None
+    horario_funcionamento = cadastro.horario_do_dia(data)
+    if horario_funcionamento is None:
+        return {'horarios': []}
+    ocupacao = ocupacao_atual(data, horario_funcionamento)
+    return montar_horarios_funcionario(horario_funcionamento, ocupacao, servico, funcionario_id)
+
+
+async def acalcular_horarios_funcionario(data, servico_id=None, funcionario_id=None):
+    """Versão assíncrona de calcular_horarios_funcionario()"""
+    cadastro = await acatalogo()
+    servico = cadastro.servico(servico_id) if servico_id is not None else None
+    horario_funcionamento = cadastro.horario_do_dia(data)
+    if horario_funcionamento is None:
+        return {'horarios': []}
+    ocupacao = await aocupacao_atual(data, horario_funcionamento)
+    return montar_horarios_funcionario(horario_funcionamento, ocupacao, servico, funcionario_id)
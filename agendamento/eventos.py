@@ -0,0 +1,221 @@
+import asyncio
+import queue
+import threading
+import time as _time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+
+
+def topico_disponibilidade(data):
+    """Tópico com as alterações de disponibilidade de uma data"""
+    return f'disponibilidade:{data.isoformat()}'
+
+
+class Assinatura:
+    """Assinatura consumida por código síncrono (views sob WSGI)"""
+
+    def __init__(self, broker, topico):
+        self.broker = broker
+        self.topico = topico
+        self.fila = queue.SimpleQueue()
+
+    def entregar(self, mensagem):
+        self.fila.put(mensagem)
+
+    def receber(self, timeout=None):
+        """Próxima mensagem; levanta queue.Empty se nada chegar em `timeout` segundos"""
+        return self.fila.get(timeout=timeout)
+
+    def descartar_pendentes(self):
+        """Descarta mensagens acumuladas (ex.: várias reservas seguidas no mesmo dia)"""
+        while not self.fila.empty():
+            self.fila.get_nowait()
+
+    def cancelar(self):
+        self.broker.cancelar(self)
+
+
+class AssinaturaAsync(Assinatura):
+    """Assinatura consumida por corrotinas (views sob ASGI), criada dentro do event loop"""
+
+    def __init__(self, broker, topico):
+        self.broker = broker
+        self.topico = topico
+        self.loop = asyncio.get_running_loop()
+        self.fila = asyncio.Queue()
+
+    def entregar(self, mensagem):
+        # Os sinais do ORM publicam a partir de outras threads
+        self.loop.call_soon_threadsafe(self.fila.put_nowait, mensagem)
+
+    async def receber(self, timeout=None):
+        """Próxima mensagem; levanta asyncio.TimeoutError se nada chegar em `timeout` segundos"""
+        return await asyncio.wait_for(self.fila.get(), timeout)
+
+    def descartar_pendentes(self):
+        while not self.fila.empty():
+            self.fila.get_nowait()
+
+
+class BrokerLocal:
+    """
+    Pub/sub em memória, restrito ao processo atual.
+
+    Serve para desenvolvimento e para implantações com um único processo.
+    Com vários workers, cada um só enxerga as próprias publicações: use o
+    BrokerCache ou outra classe com a mesma interface (publicar, assinar,
+    aassinar, cancelar) apoiada em um broker externo.
+    """
+
+    def __init__(self):
+        self._assinaturas = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def publicar(self, topico, mensagem):
+        with self._lock:
+            assinaturas = list(self._assinaturas.get(topico, ()))
+        for assinatura in assinaturas:
+            assinatura.entregar(mensagem)
+
+    def _registrar(self, assinatura):
+        with self._lock:
+            self._assinaturas[assinatura.topico].add(assinatura)
+        return assinatura
+
+    def assinar(self, topico):
+        return self._registrar(Assinatura(self, topico))
+
+    def aassinar(self, topico):
+        return self._registrar(AssinaturaAsync(self, topico))
+
+    def cancelar(self, assinatura):
+        with self._lock:
+            assinaturas = self._assinaturas.get(assinatura.topico)
+            if assinaturas is not None:
+                assinaturas.discard(assinatura)
+                if not assinaturas:
+                    del self._assinaturas[assinatura.topico]
+
+
+class AssinaturaCache:
+    """Assinatura do BrokerCache: confere o contador do tópico a cada EVENTOS_INTERVALO segundos"""
+
+    def __init__(self, broker, topico):
+        self.broker = broker
+        self.topico = topico
+        # Lido na assinatura: publicações a partir daqui não se perdem
+        self.versao = broker.versao(topico)
+
+    def receber(self, timeout=None):
+        """Última mensagem do tópico; levanta queue.Empty se nada chegar em `timeout` segundos"""
+        limite = None if timeout is None else _time.monotonic() + timeout
+        while True:
+            versao = self.broker.versao(self.topico)
+            if versao != self.versao:
+                self.versao = versao
+                return self.broker.mensagem(self.topico)
+            restante = None if limite is None else limite - _time.monotonic()
+            if restante is not None and restante <= 0:
+                raise queue.Empty
+            _time.sleep(settings.EVENTOS_INTERVALO if restante is None else min(settings.EVENTOS_INTERVALO, restante))
+
+    def descartar_pendentes(self):
+        # Publicações seguidas já se resumem a uma única mudança de versão
+        pass
+
+    def cancelar(self):
+        self.broker.cancelar(self)
+
+
+class AssinaturaCacheAsync(AssinaturaCache):
+    """Assinatura do BrokerCache consumida por corrotinas"""
+
+    async def receber(self, timeout=None):
+        """Última mensagem do tópico; levanta asyncio.TimeoutError se nada chegar em `timeout` segundos"""
+        limite = None if timeout is None else _time.monotonic() + timeout
+        while True:
+            versao = await self.broker.aversao(self.topico)
+            if versao != self.versao:
+                self.versao = versao
+                return await self.broker.amensagem(self.topico)
+            restante = None if limite is None else limite - _time.monotonic()
+            if restante is not None and restante <= 0:
+                raise asyncio.TimeoutError
+            await asyncio.sleep(settings.EVENTOS_INTERVALO if restante is None else min(settings.EVENTOS_INTERVALO, restante))
+
+
+class BrokerCache:
+    """
+    Pub/sub entre processos apoiado no cache EVENTOS_CACHE.
+
+    Publicar incrementa um contador do tópico e guarda a mensagem; cada
+    assinatura confere o contador a cada EVENTOS_INTERVALO segundos. Várias
+    publicações entre duas conferências chegam como uma só (a última), o que
+    basta para avisar que a disponibilidade mudou. Com vários workers, o
+    cache precisa ser compartilhado (Redis/Memcached). Tópicos sem publicação
+    há EVENTOS_TTL segundos somem do cache.
+    """
+
+    @property
+    def cache(self):
+        # Resolvido a cada uso: as instâncias de cache do Django são por thread
+        return caches[settings.EVENTOS_CACHE]
+
+    def _chave(self, topico):
+        return f'eventos:{topico}'
+
+    def publicar(self, topico, mensagem):
+        chave = self._chave(topico)
+        ttl = settings.EVENTOS_TTL
+        self.cache.set(f'{chave}:mensagem', mensagem, ttl)
+        try:
+            self.cache.incr(chave)
+        except ValueError:
+            if not self.cache.add(chave, 1, ttl):
+                self.cache.incr(chave)
+        # incr mantém a expiração anterior: cada publicação renova o prazo do tópico
+        self.cache.touch(chave, ttl)
+
+    def versao(self, topico):
+        return self.cache.get(self._chave(topico), 0)
+
+    async def aversao(self, topico):
+        return await self.cache.aget(self._chave(topico), 0)
+
+    def mensagem(self, topico):
+        return self.cache.get(f'{self._chave(topico)}:mensagem')
+
+    async def amensagem(self, topico):
+        return await self.cache.aget(f'{self._chave(topico)}:mensagem')
+
+    def assinar(self, topico):
+        return AssinaturaCache(self, topico)
+
+    def aassinar(self, topico):
+        return AssinaturaCacheAsync(self, topico)
+
+    def cancelar(self, assinatura):
+        # Nada fica registrado no broker: a assinatura só lê o cache
+        pass
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def broker():
+    """Broker configurado em settings.EVENTOS_BROKER, criado uma vez por processo"""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(settings.EVENTOS_BROKER)()
+    return _broker
+
+
+def publicar_disponibilidade(data, evento):
+    """Avisa os assinantes da data que a disponibilidade mudou"""
+    broker().publicar(topico_disponibilidade(data), {'data': data.isoformat(), 'evento': evento})
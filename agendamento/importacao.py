@@ -0,0 +1,351 @@
+import csv
+import json
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+
+from agendamento import catalogo, resumo, slots
+from agendamento.availability import duracao_em_minutos, para_minutos
+from agendamento.barbeiros import ocupacao_do_dia
+from agendamento.caching import invalidar_tudo
+from agendamento.models import Agendamento
+from clientes.autenticacao import normalizar_telefone
+from clientes.models import Cliente
+from funcionarios.dashboard import invalidar_estatisticas_gerais
+from funcionarios.models import Funcionario
+from main.paginas import invalidar_paginas
+from servicos.models import Servico
+
+TAMANHO_LOTE = 1000
+# Dias cuja ocupação a importação de agendamentos mantém em memória entre lotes
+DIAS_EM_MEMORIA = 62
+
+
+class LinhaInvalida(ValueError):
+    pass
+
+
+def _texto(registro, campo):
+    """Campo como texto sem espaços nas pontas; JSON pode trazer números (ex.: telefone)"""
+    valor = registro.get(campo)
+    return '' if valor is None else str(valor).strip()
+
+
+def ler_registros(caminho, formato=None):
+    """
+    Lê um arquivo CSV, NDJSON ou JSON (lista de objetos) e gera (número da linha, dicionário).
+
+    CSV e NDJSON são lidos linha a linha; JSON é carregado inteiro em memória.
+    """
+    formato = formato or caminho.rsplit('.', 1)[-1].lower()
+    with open(caminho, encoding='utf-8', newline='') as arquivo:
+        if formato == 'csv':
+            for numero, registro in enumerate(csv.DictReader(arquivo), start=2):
+                yield numero, registro
+        elif formato == 'ndjson':
+            for numero, linha in enumerate(arquivo, start=1):
+                if linha.strip():
+                    try:
+                        yield numero, json.loads(linha)
+                    except json.JSONDecodeError:
+                        # Rejeitada pela importação, como qualquer outra linha inválida
+                        yield numero, None
+        elif formato == 'json':
+            for numero, registro in enumerate(json.load(arquivo), start=1):
+                yield numero, registro
+        else:
+            raise ValueError(f'Formato não suportado: {formato}')
+
+
+class Importacao(ABC):
+    """Valida registros e grava em lotes com bulk_create, cada lote em uma transação"""
+
+    modelo = None
+
+    def __init__(self, tamanho_lote=TAMANHO_LOTE):
+        self.tamanho_lote = tamanho_lote
+        self.importados = 0
+        self.rejeitados = []
+
+    @abstractmethod
+    def converter(self, registro):
+        """Converte um registro em instância do modelo ou levanta LinhaInvalida"""
+
+    def executar(self, registros):
+        pendentes = []
+        for numero, registro in registros:
+            try:
+                if not isinstance(registro, dict):
+                    raise LinhaInvalida('Registro inválido: esperado um objeto com os campos')
+                pendentes.append(self.converter(registro))
+            except (LinhaInvalida, KeyError, ValueError, InvalidOperation) as e:
+                motivo = f'campo obrigatório ausente: {e}' if isinstance(e, KeyError) else str(e)
+                self.rejeitados.append((numero, motivo))
+                continue
+            if len(pendentes) >= self.tamanho_lote:
+                self.gravar(pendentes)
+                pendentes = []
+        if pendentes:
+            self.gravar(pendentes)
+        self.finalizar()
+
+    def gravar(self, objetos):
+        with transaction.atomic():
+            self.modelo.objects.bulk_create(objetos, batch_size=self.tamanho_lote)
+        self.importados += len(objetos)
+
+    def finalizar(self):
+        """bulk_create não dispara sinais: invalida os caches derivados"""
+        transaction.on_commit(invalidar_estatisticas_gerais)
+
+
+class ImportacaoClientes(Importacao):
+    """
+    Campos: nome, telefone, email e senha_hash (hash no formato do Django) ou
+    senha (texto puro, hasheada aqui — bem mais lento). Sem senha, o cliente
+    fica com senha inutilizável até redefini-la.
+    """
+
+    modelo = Cliente
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Um único SELECT em vez de um exists() por registro
+        self.emails = set(Cliente.objects.exclude(email=None).values_list('email', flat=True))
+        self.senha_inutilizavel = make_password(None)
+
+    def converter(self, registro):
+        nome = _texto(registro, 'nome')
+        email = _texto(registro, 'email').lower() or None
+        telefone = _texto(registro, 'telefone')
+
+        if len(nome) < 2:
+            raise LinhaInvalida('Nome deve ter pelo menos 2 caracteres')
+        if not telefone:
+            raise LinhaInvalida('Telefone inválido')
+        if email:
+            if '@' not in email:
+                raise LinhaInvalida('Email inválido')
+            if email in self.emails:
+                raise LinhaInvalida('Email já cadastrado')
+            self.emails.add(email)
+
+        if registro.get('senha_hash'):
+            senha = _texto(registro, 'senha_hash')
+        elif registro.get('senha'):
+            senha = make_password(str(registro['senha']))
+        else:
+            senha = self.senha_inutilizavel
+
+        # bulk_create não passa pelo save(): a coluna normalizada vai preenchida aqui
+        return Cliente(
+            nome=nome, email=email, telefone=telefone,
+            telefone_normalizado=normalizar_telefone(telefone), senha=senha
+        )
+
+
+def _duracao(valor):
+    """Aceita minutos ('45') ou hh:mm[:ss] ('0:45:00')"""
+    valor = str(valor).strip()
+    if ':' not in valor:
+        return timedelta(minutes=int(valor))
+    partes = [int(parte) for parte in valor.split(':')]
+    horas, minutos, segundos = (partes + [0])[:3]
+    return timedelta(hours=horas, minutes=minutos, seconds=segundos)
+
+
+class ImportacaoServicos(Importacao):
+    """
+    Campos: nome, descricao, duracao (minutos ou hh:mm:ss), preco e,
+    opcionalmente, intervalo_minutos e folga_minutos
+    """
+
+    modelo = Servico
+
+    def converter(self, registro):
+        nome = _texto(registro, 'nome')
+        if not nome:
+            raise LinhaInvalida('Nome do serviço é obrigatório')
+        duracao = _duracao(registro['duracao'])
+        if duracao <= timedelta(0):
+            raise LinhaInvalida('Duração deve ser positiva')
+        intervalo = int(registro['intervalo_minutos']) if registro.get('intervalo_minutos') else None
+        if intervalo is not None and intervalo < 1:
+            raise LinhaInvalida('Intervalo deve ser positivo')
+        folga = int(registro.get('folga_minutos') or 0)
+        if folga < 0:
+            raise LinhaInvalida('Folga não pode ser negativa')
+        return Servico(
+            nome=nome,
+            descricao=_texto(registro, 'descricao') or None,
+            duracao=duracao,
+            preco=Decimal(str(registro['preco'])),
+            intervalo_minutos=intervalo,
+            folga_minutos=folga
+        )
+
+    def finalizar(self):
+        super().finalizar()
+        transaction.on_commit(invalidar_tudo)
+        transaction.on_commit(catalogo.invalidar)
+        transaction.on_commit(invalidar_paginas)
+
+
+class ImportacaoAgendamentos(Importacao):
+    """
+    Campos: cliente_id ou cliente_email, servico_id ou servico (nome), data
+    (AAAA-MM-DD), hora (HH:MM), observacoes e, opcionalmente, funcionario_id
+    ou funcionario_email do barbeiro.
+
+    Aplica as mesmas regras do reservar() — dia de funcionamento, horário
+    dentro do expediente do barbeiro e nenhuma sobreposição — exceto a de data
+    passada, já que o objetivo é importar histórico. A verificação usa a mesma
+    OcupacaoCadeiras da agenda, montada com os agendamentos do banco (lidos uma
+    vez por data) e marcada com cada linha aceita do arquivo. Só a ocupação dos
+    DIAS_EM_MEMORIA dias usados mais recentemente fica guardada entre lotes; um
+    dia descartado é remontado do banco, onde o lote já gravou suas linhas. Sem
+    barbeiro no registro, o agendamento vai para o primeiro barbeiro livre, como na agenda.
+
+    Não bloqueia os dias importados: rode fora do horário de atendimento.
+    """
+
+    modelo = Agendamento
+
+    def __init__(self, *args, dias_em_memoria=DIAS_EM_MEMORIA, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.dias_em_memoria = dias_em_memoria
+        self.servicos = {servico.id: servico for servico in Servico.objects.all()}
+        self.servicos_por_nome = {servico.nome.lower(): servico for servico in self.servicos.values()}
+        self.cadastro = catalogo.catalogo()
+        self.clientes_ids = None
+        self.clientes_por_email = None
+        self.funcionarios_por_email = dict(
+            Funcionario.objects.exclude(email=None).values_list('email', 'id')
+        )
+        self.funcionarios_ids = set(self.funcionarios_por_email.values()) | set(
+            Funcionario.objects.filter(email=None).values_list('id', flat=True)
+        )
+        # data -> OcupacaoCadeiras, da usada há mais tempo para a mais recente
+        self.ocupacoes = OrderedDict()
+        self.primeira_data = None
+        self.ultima_data = None
+
+    def cliente_id(self, registro):
+        if registro.get('cliente_id'):
+            if self.clientes_ids is None:
+                self.clientes_ids = set(Cliente.objects.values_list('id', flat=True))
+            cliente_id = int(registro['cliente_id'])
+            if cliente_id not in self.clientes_ids:
+                raise LinhaInvalida(f'Cliente {cliente_id} não encontrado')
+            return cliente_id
+
+        if self.clientes_por_email is None:
+            self.clientes_por_email = dict(
+                Cliente.objects.exclude(email=None).values_list('email', 'id')
+            )
+        email = _texto(registro, 'cliente_email').lower()
+        if email not in self.clientes_por_email:
+            raise LinhaInvalida(f'Cliente {email or "(vazio)"} não encontrado')
+        return self.clientes_por_email[email]
+
+    def servico(self, registro):
+        if registro.get('servico_id'):
+            servico = self.servicos.get(int(registro['servico_id']))
+        else:
+            servico = self.servicos_por_nome.get(_texto(registro, 'servico').lower())
+        if not servico:
+            raise LinhaInvalida('Serviço não encontrado')
+        return servico
+
+    def funcionario_id(self, registro):
+        if registro.get('funcionario_id'):
+            funcionario_id = int(registro['funcionario_id'])
+            if funcionario_id not in self.funcionarios_ids:
+                raise LinhaInvalida(f'Funcionário {funcionario_id} não encontrado')
+            return funcionario_id
+        email = _texto(registro, 'funcionario_email').lower()
+        if not email:
+            return None
+        if email not in self.funcionarios_por_email:
+            raise LinhaInvalida(f'Funcionário {email} não encontrado')
+        return self.funcionarios_por_email[email]
+
+    def ocupacao(self, data, horario_funcionamento):
+        """Ocupação das cadeiras do dia: agendamentos do banco e linhas já aceitas"""
+        ocupacao = self.ocupacoes.get(data)
+        if ocupacao is None:
+            ocupacao = ocupacao_do_dia(
+                data, horario_funcionamento, Agendamento.objects.filter(data=data).select_related('servico')
+            )
+            self.ocupacoes[data] = ocupacao
+        else:
+            self.ocupacoes.move_to_end(data)
+        return ocupacao
+
+    def converter(self, registro):
+        cliente_id = self.cliente_id(registro)
+        servico = self.servico(registro)
+        funcionario_id = self.funcionario_id(registro)
+        data = datetime.strptime(str(registro['data']).strip(), '%Y-%m-%d').date()
+        hora = datetime.strptime(str(registro['hora']).strip()[:5], '%H:%M').time()
+
+        horario_funcionamento = self.cadastro.horario_do_dia(data)
+        if not horario_funcionamento:
+            raise LinhaInvalida('A barbearia não funciona neste dia da semana')
+
+        inicio = para_minutos(hora)
+        duracao = duracao_em_minutos(servico.duracao)
+        if inicio < para_minutos(horario_funcionamento.hora_inicio):
+            raise LinhaInvalida('Horário antes da abertura')
+        if inicio + duracao > para_minutos(horario_funcionamento.hora_fim):
+            raise LinhaInvalida('Serviço termina depois do fechamento')
+
+        # Mesma escolha de cadeira do reservar(): a do barbeiro pedido ou a primeira livre
+        ocupacao = self.ocupacao(data, horario_funcionamento)
+        livres = ocupacao.cadeiras_livres(inicio, duracao, servico.folga_minutos)
+        if funcionario_id is not None:
+            livres = [barbeiro for barbeiro in livres if barbeiro == funcionario_id]
+        if not livres:
+            if ocupacao.conflito(inicio, duracao, funcionario_id, servico.folga_minutos) is None:
+                raise LinhaInvalida('O barbeiro não atende neste horário')
+            raise LinhaInvalida('Horário conflita com um agendamento existente')
+
+        agendamento = Agendamento(
+            cliente_id=cliente_id,
+            servico=servico,
+            preco=servico.preco,
+            funcionario_id=livres[0],
+            data=data,
+            hora=hora,
+            observacoes=_texto(registro, 'observacoes') or None
+        )
+        ocupacao.marcar(agendamento)
+        self.primeira_data = min(self.primeira_data or data, data)
+        self.ultima_data = max(self.ultima_data or data, data)
+        return agendamento
+
+    def gravar(self, objetos):
+        super().gravar(objetos)
+        # As linhas aceitas já estão no banco: um dia descartado é remontado de lá
+        while len(self.ocupacoes) > self.dias_em_memoria:
+            self.ocupacoes.popitem(last=False)
+
+    def finalizar(self):
+        super().finalizar()
+        transaction.on_commit(invalidar_tudo)
+        if self.primeira_data:
+            resumo.reconstruir(self.primeira_data, self.ultima_data)
+            if slots.ativo():
+                # A grade desses dias não viu os agendamentos importados
+                slots.regenerar(inicio=self.primeira_data, fim=self.ultima_data)
+
+
+IMPORTACOES = {
+    'clientes': ImportacaoClientes,
+    'servicos': ImportacaoServicos,
+    'agendamentos': ImportacaoAgendamentos,
+}
@@ -0,0 +1,156 @@
+import random
+import statistics
+import time as _time
+from datetime import date, time, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from agendamento import resumo, slots
+from agendamento.caching import invalidar_tudo
+from agendamento.models import Agendamento
+from clientes.autenticacao import consulta_de_login
+from clientes.models import Cliente
+from funcionarios.dashboard import invalidar_estatisticas_gerais
+from servicos.models import Servico
+
+MARCA = 'benchmark'
+
+
+class Command(BaseCommand):
+    help = (
+        'Popula o banco com agendamentos fictícios e mede as consultas mais usadas, '
+        'com e sem os índices de Agendamento. Use apenas em um banco de desenvolvimento.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--agendamentos', type=int, default=1_000_000,
+                            help='Quantidade total de agendamentos desejada (padrão: 1.000.000)')
+        parser.add_argument('--clientes', type=int, default=20_000,
+                            help='Quantidade de clientes fictícios (padrão: 20.000)')
+        parser.add_argument('--lote', type=int, default=5_000,
+                            help='Tamanho do lote do bulk_create (padrão: 5.000)')
+        parser.add_argument('--repeticoes', type=int, default=20,
+                            help='Execuções de cada consulta por medição (padrão: 20)')
+        parser.add_argument('--sem-planos', action='store_true',
+                            help='Não imprime os planos de execução (EXPLAIN)')
+
+    def handle(self, *args, **options):
+        self.popular(options['agendamentos'], options['clientes'], options['lote'])
+
+        consultas = self.consultas()
+        indices = Agendamento._meta.indexes
+
+        self.stdout.write(self.style.MIGRATE_HEADING('Sem índices compostos'))
+        with connection.schema_editor() as editor:
+            for indice in indices:
+                editor.remove_index(Agendamento, indice)
+        try:
+            antes = self.medir(consultas, options['repeticoes'], not options['sem_planos'])
+        finally:
+            with connection.schema_editor() as editor:
+                for indice in indices:
+                    editor.add_index(Agendamento, indice)
+
+        self.stdout.write(self.style.MIGRATE_HEADING('Com índices compostos'))
+        depois = self.medir(consultas, options['repeticoes'], not options['sem_planos'])
+
+        self.stdout.write(self.style.MIGRATE_HEADING('Resumo (mediana em ms)'))
+        for nome in consultas:
+            self.stdout.write(
+                f'  {nome:<32} {antes[nome]:>10.2f} -> {depois[nome]:>10.2f}'
+                f'  ({antes[nome] / max(depois[nome], 0.001):.1f}x)'
+            )
+
+    def popular(self, total_agendamentos, total_clientes, lote):
+        existentes = Agendamento.objects.count()
+        faltando = total_agendamentos - existentes
+        if faltando <= 0:
+            self.stdout.write(f'{existentes} agendamentos já existem, nada a popular.')
+            return
+
+        servicos = list(Servico.objects.all())
+        if not servicos:
+            servicos = Servico.objects.bulk_create([
+                Servico(nome=f'Serviço {i}', duracao=timedelta(minutes=30 + 15 * i), preco=30 + 10 * i)
+                for i in range(4)
+            ])
+
+        clientes_ids = list(Cliente.objects.values_list('id', flat=True)[:total_clientes])
+        if len(clientes_ids) < total_clientes:
+            senha = make_password(MARCA)
+            novos = total_clientes - len(clientes_ids)
+            for inicio in range(0, novos, lote):
+                Cliente.objects.bulk_create([
+                    Cliente(
+                        nome=f'Cliente {inicio + i}',
+                        telefone=f'119{inicio + i:08d}',
+                        telefone_normalizado=f'119{inicio + i:08d}',
+                        email=f'{MARCA}{inicio + i}@exemplo.com',
+                        senha=senha
+                    )
+                    for i in range(min(lote, novos - inicio))
+                ], ignore_conflicts=True)
+            clientes_ids = list(Cliente.objects.values_list('id', flat=True)[:total_clientes])
+
+        self.stdout.write(f'Inserindo {faltando} agendamentos em lotes de {lote}...')
+        primeiro_dia = date.today() - timedelta(days=3 * 365)
+        horarios = [time(8 + minutos // 60, minutos % 60) for minutos in range(0, 600, 30)]
+        aleatorio = random.Random(42)
+        comeco = _time.perf_counter()
+        for inicio in range(0, faltando, lote):
+            with transaction.atomic():
+                Agendamento.objects.bulk_create([
+                    Agendamento(
+                        cliente_id=aleatorio.choice(clientes_ids),
+                        servico=servico,
+                        data=primeiro_dia + timedelta(days=aleatorio.randrange(4 * 365)),
+                        hora=aleatorio.choice(horarios),
+                        observacoes=MARCA,
+                        # save() não roda no bulk_create: o preço vai explícito
+                        preco=servico.preco
+                    )
+                    for servico in (aleatorio.choice(servicos) for _ in range(min(lote, faltando - inicio)))
+                ])
+        duracao = _time.perf_counter() - comeco
+        self.stdout.write(f'  {faltando} linhas em {duracao:.1f}s ({faltando / duracao:.0f} linhas/s)')
+
+        # bulk_create não dispara sinais: refaz o resumo, a grade e os caches derivados
+        ultimo_dia = primeiro_dia + timedelta(days=4 * 365 - 1)
+        self.stdout.write('Reconstruindo o resumo diário e a grade de horários...')
+        resumo.reconstruir(primeiro_dia, ultimo_dia)
+        if slots.ativo():
+            slots.regenerar(inicio=primeiro_dia, fim=ultimo_dia)
+        invalidar_tudo()
+        invalidar_estatisticas_gerais()
+
+    def consultas(self):
+        hoje = date.today()
+        cliente = Cliente.objects.order_by('id').first()
+        telefone = cliente.telefone if cliente else ''
+        return {
+            'disponibilidade do dia': lambda: Agendamento.objects.filter(data=hoje).select_related('servico'),
+            'meus agendamentos': lambda: Agendamento.objects.filter(cliente=cliente).order_by('data', 'hora'),
+            'próximos agendamentos': lambda: Agendamento.objects.filter(
+                data__gte=hoje
+            ).select_related('cliente', 'servico').order_by('data', 'hora')[:10],
+            'login por telefone': lambda: consulta_de_login(Cliente, telefone),
+        }
+
+    def medir(self, consultas, repeticoes, mostrar_planos):
+        medianas = {}
+        for nome, consulta in consultas.items():
+            if mostrar_planos:
+                self.stdout.write(f'  {nome}:')
+                for linha in consulta().explain().splitlines():
+                    self.stdout.write(f'      {linha}')
+
+            tempos = []
+            for _ in range(repeticoes):
+                comeco = _time.perf_counter()
+                list(consulta())
+                tempos.append((_time.perf_counter() - comeco) * 1000)
+            medianas[nome] = statistics.median(tempos)
+            self.stdout.write(f'  {nome:<32} mediana {medianas[nome]:.2f} ms')
+        return medianas
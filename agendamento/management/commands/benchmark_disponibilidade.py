@@ -0,0 +1,155 @@
+import random
+import statistics
+import time as _time
+from datetime import time, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from agendamento.availability import OcupacaoCadeiras, OcupacaoSlots, para_hora, para_minutos
+from agendamento.models import Agendamento
+from funcionarios.models import HorarioFuncionamento
+from servicos.models import Servico
+
+ABERTURA = time(8)
+FECHAMENTO = time(20)
+
+
+class Command(BaseCommand):
+    help = (
+        'Microbenchmark da disponibilidade em dias lotados, sem banco: compara a '
+        'verificação ingênua de sobreposição (cada horário contra cada agendamento) '
+        'com as somas acumuladas por cadeira e com a grade de células.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=200,
+                            help='Dias lotados gerados (padrão: 200)')
+        parser.add_argument('--barbeiros', type=int, default=4,
+                            help='Cadeiras em paralelo; 0 para cadeira única (padrão: 4)')
+        parser.add_argument('--passo', type=int, default=5,
+                            help='Intervalo entre os horários testados, em minutos (padrão: 5)')
+        parser.add_argument('--repeticoes', type=int, default=5,
+                            help='Medições de cada implementação (padrão: 5)')
+        parser.add_argument('--semente', type=int, default=42)
+
+    def handle(self, *args, **options):
+        if options['dias'] < 1 or options['passo'] < 1 or options['repeticoes'] < 1:
+            raise CommandError('--dias, --passo e --repeticoes devem ser positivos')
+
+        aleatorio = random.Random(options['semente'])
+        servicos = [
+            Servico(id=i, nome=f'Serviço {i}', duracao=timedelta(minutes=minutos), folga_minutos=folga)
+            for i, (minutos, folga) in enumerate([(20, 0), (30, 5), (45, 10), (60, 0)], start=1)
+        ]
+        horario = HorarioFuncionamento(
+            dia_semana=0, hora_inicio=ABERTURA, hora_fim=FECHAMENTO, intervalo_minutos=options['passo']
+        )
+        barbeiros = list(range(1, options['barbeiros'] + 1))
+        dias = [self.dia_lotado(aleatorio, servicos, barbeiros) for _ in range(options['dias'])]
+        # A grade já vem pronta do banco: as células são montadas fora da medição
+        grades = {id(dia): self.celulas(dia, barbeiros) for dia in dias}
+        total = sum(len(dia) for dia in dias)
+        self.stdout.write(
+            f'{len(dias)} dias, {total} agendamentos ({total / len(dias):.0f} por dia), '
+            f'{max(len(barbeiros), 1)} cadeira(s), passo de {options["passo"]} min'
+        )
+
+        implementacoes = {
+            'varredura ingênua': lambda: [
+                self.ingenuo(dia, servico, barbeiros, options['passo']) for dia in dias for servico in servicos
+            ],
+            'somas acumuladas': lambda: [
+                self.acumulado(dia, servico, horario, barbeiros) for dia in dias for servico in servicos
+            ],
+            'grade de células': lambda: [
+                self.grade(grades[id(dia)], servico, horario) for dia in dias for servico in servicos
+            ],
+        }
+
+        resultados = {nome: funcao() for nome, funcao in implementacoes.items()}
+        referencia = resultados['varredura ingênua']
+        for nome, resultado in resultados.items():
+            if resultado != referencia:
+                raise CommandError(f'{nome} diverge da varredura ingênua')
+
+        medianas = {}
+        for nome, funcao in implementacoes.items():
+            tempos = []
+            for _ in range(options['repeticoes']):
+                comeco = _time.perf_counter()
+                funcao()
+                tempos.append((_time.perf_counter() - comeco) * 1000)
+            medianas[nome] = statistics.median(tempos)
+
+        consultas = len(dias) * len(servicos)
+        base = medianas['varredura ingênua']
+        self.stdout.write(self.style.MIGRATE_HEADING(f'Mediana de {consultas} consultas de disponibilidade'))
+        for nome, mediana in medianas.items():
+            self.stdout.write(
+                f'  {nome:<20} {mediana:>10.2f} ms  {mediana * 1000 / consultas:>8.1f} µs/consulta'
+                f'  ({base / max(mediana, 0.001):.1f}x)'
+            )
+
+    def dia_lotado(self, aleatorio, servicos, barbeiros):
+        """Agendamentos colados, com sobras pequenas, em cada cadeira do dia"""
+        agendamentos = []
+        for barbeiro in barbeiros or [None]:
+            minuto = para_minutos(ABERTURA)
+            while True:
+                minuto += aleatorio.choice([0, 0, 0, 5, 10, 15])
+                servico = aleatorio.choice(servicos)
+                fim = minuto + int(servico.duracao.total_seconds() // 60)
+                if fim > para_minutos(FECHAMENTO):
+                    break
+                agendamentos.append(Agendamento(
+                    id=len(agendamentos) + 1, servico=servico, funcionario_id=barbeiro, hora=para_hora(minuto)
+                ))
+                minuto = fim + servico.folga_minutos
+        return agendamentos
+
+    def ingenuo(self, agendamentos, servico, barbeiros, passo):
+        duracao = int(servico.duracao.total_seconds() // 60)
+        abertura, fechamento = para_minutos(ABERTURA), para_minutos(FECHAMENTO)
+        intervalos = [
+            (
+                para_minutos(agendamento.hora),
+                para_minutos(agendamento.hora) + int(agendamento.servico.duracao.total_seconds() // 60)
+                + agendamento.servico.folga_minutos,
+                agendamento.funcionario_id,
+            )
+            for agendamento in agendamentos
+        ]
+        livres = []
+        for inicio in range(abertura, fechamento - duracao + 1, passo):
+            fim = min(inicio + duracao + servico.folga_minutos, fechamento)
+            for cadeira in barbeiros or [None]:
+                if all(b <= inicio or a >= fim for a, b, dono in intervalos if dono is None or dono == cadeira):
+                    livres.append(inicio)
+                    break
+        return livres
+
+    def acumulado(self, agendamentos, servico, horario, barbeiros):
+        ocupacao = OcupacaoCadeiras.montar(horario, agendamentos, barbeiros)
+        return ocupacao.horarios_livres(
+            int(servico.duracao.total_seconds() // 60), horario.intervalo_minutos, folga=servico.folga_minutos
+        )
+
+    def celulas(self, agendamentos, barbeiros, granularidade=5):
+        """(cadeira, minuto, agendamento ou None) de cada célula do dia, como na tabela Slot"""
+        celulas = {}
+        for cadeira in barbeiros or [None]:
+            for minuto in range(para_minutos(ABERTURA), para_minutos(FECHAMENTO), granularidade):
+                celulas[cadeira, minuto] = None
+        for agendamento in agendamentos:
+            inicio = para_minutos(agendamento.hora)
+            fim = inicio + int(agendamento.servico.duracao.total_seconds() // 60) + agendamento.servico.folga_minutos
+            for minuto in range(inicio // granularidade * granularidade, fim, granularidade):
+                if (agendamento.funcionario_id, minuto) in celulas:
+                    celulas[agendamento.funcionario_id, minuto] = agendamento
+        return [(cadeira, minuto, agendamento) for (cadeira, minuto), agendamento in celulas.items()]
+
+    def grade(self, celulas, servico, horario, granularidade=5):
+        ocupacao = OcupacaoSlots(ABERTURA, FECHAMENTO, granularidade, celulas)
+        return ocupacao.horarios_livres(
+            int(servico.duracao.total_seconds() // 60), horario.intervalo_minutos, folga=servico.folga_minutos
+        )
@@ -0,0 +1,101 @@
+import threading
+import time as _time
+from datetime import date, time, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from agendamento.booking import ConflitoHorario, reservar
+from agendamento.catalogo import catalogo
+from agendamento.models import Agendamento, DiaAgenda
+from clientes.models import Cliente
+from servicos.models import Servico
+
+MARCA = 'benchmark-reservas'
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede a vazão de reservas concorrentes: várias threads, cada uma com a sua '
+        'conexão, disputando os horários de um mesmo dia daqui a alguns anos. O '
+        'cliente, o serviço e os agendamentos criados são apagados no fim.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8,
+                            help='Threads reservando ao mesmo tempo (padrão: 8)')
+        parser.add_argument('--tentativas', type=int, default=50,
+                            help='Tentativas de reserva por thread (padrão: 50)')
+
+    def handle(self, *args, **options):
+        if options['threads'] < 1 or options['tentativas'] < 1:
+            raise CommandError('--threads e --tentativas devem ser positivos')
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            raise CommandError('SQLite em memória não suporta conexões concorrentes')
+
+        data, horario = self.dia_livre()
+        cliente = Cliente.objects.create(nome='Cliente Benchmark', email=f'{MARCA}@exemplo.com', senha='!')
+        servico = Servico.objects.create(nome=MARCA, duracao=timedelta(minutes=45), preco=0)
+        try:
+            reservas, conflitos, erros, duracao = self.disputar(
+                cliente, servico, data, horario, options['threads'], options['tentativas']
+            )
+        finally:
+            Agendamento.objects.filter(cliente=cliente).delete()
+            DiaAgenda.objects.filter(data=data).delete()
+            servico.delete()
+            cliente.delete()
+
+        tentativas = options['threads'] * options['tentativas']
+        self.stdout.write(self.style.SUCCESS(
+            f'{tentativas} tentativas em {options["threads"]} threads em {duracao:.2f}s '
+            f'({tentativas / duracao:.0f} reservas/s): {reservas} reservas, {conflitos} conflitos.'
+        ))
+        for erro in erros[:5]:
+            self.stdout.write(self.style.ERROR(f'  {erro!r}'))
+
+    def dia_livre(self):
+        """Primeiro dia de funcionamento sem agendamentos a partir de daqui a cinco anos"""
+        cadastro = catalogo()
+        data = date.today() + timedelta(days=5 * 365)
+        for _ in range(366):
+            horario = cadastro.horario_do_dia(data)
+            if horario is not None and not Agendamento.objects.filter(data=data).exists():
+                return data, horario
+            data += timedelta(days=1)
+        raise CommandError('Nenhum dia de funcionamento livre encontrado: cadastre os horários de funcionamento')
+
+    def disputar(self, cliente, servico, data, horario, threads, tentativas):
+        inicio = horario.hora_inicio.hour * 60 + horario.hora_inicio.minute
+        fim = horario.hora_fim.hour * 60 + horario.hora_fim.minute
+        horas = [time(minutos // 60, minutos % 60) for minutos in range(inicio, fim - 45 + 1, 15)]
+        largada = threading.Barrier(threads)
+        resultados = {'reservas': 0, 'conflitos': 0, 'erros': []}
+        trava = threading.Lock()
+
+        def concorrente(deslocamento):
+            try:
+                largada.wait()
+                for tentativa in range(tentativas):
+                    hora = horas[(deslocamento + tentativa * 3) % len(horas)]
+                    try:
+                        reservar(cliente.id, servico, data, hora, horario)
+                        chave = 'reservas'
+                    except ConflitoHorario:
+                        chave = 'conflitos'
+                    with trava:
+                        resultados[chave] += 1
+            except Exception as e:
+                with trava:
+                    resultados['erros'].append(e)
+            finally:
+                connection.close()
+
+        grupo = [threading.Thread(target=concorrente, args=(i,)) for i in range(threads)]
+        comeco = _time.perf_counter()
+        for thread in grupo:
+            thread.start()
+        for thread in grupo:
+            thread.join()
+        duracao = _time.perf_counter() - comeco
+        return resultados['reservas'], resultados['conflitos'], resultados['erros'], duracao
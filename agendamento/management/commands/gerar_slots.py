@@ -0,0 +1,40 @@
+import time as _time
+from datetime import date, datetime, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from agendamento import slots
+
+
+class Command(BaseCommand):
+    help = (
+        'Gera a grade de horários materializada (tabela Slot) das próximas semanas. '
+        'Rode diariamente e depois de mudar a granularidade (AGENDA_SLOT_MINUTOS); '
+        'alterações de horários, barbeiros ou serviços refazem sozinhas os dias já gerados.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--inicio', help='Data inicial (AAAA-MM-DD). Padrão: hoje')
+        parser.add_argument('--semanas', type=int, default=8,
+                            help='Quantidade de semanas geradas a partir do início (padrão: 8)')
+
+    def handle(self, *args, **options):
+        if not settings.AGENDA_SLOTS:
+            self.stderr.write(self.style.WARNING(
+                'AGENDA_SLOTS está desativado: a grade será gerada, mas não será usada.'
+            ))
+        if options['semanas'] < 1:
+            raise CommandError('--semanas deve ser maior que zero.')
+        try:
+            inicio = datetime.strptime(options['inicio'], '%Y-%m-%d').date() if options['inicio'] else date.today()
+        except ValueError:
+            raise CommandError('Datas devem estar no formato AAAA-MM-DD.')
+        fim = inicio + timedelta(weeks=options['semanas']) - timedelta(days=1)
+
+        comeco = _time.perf_counter()
+        total = slots.gerar(inicio, fim)
+        duracao = _time.perf_counter() - comeco
+        self.stdout.write(self.style.SUCCESS(
+            f'{total} células de {settings.AGENDA_SLOT_MINUTOS} minutos geradas entre {inicio} e {fim} em {duracao:.1f}s.'
+        ))
@@ -0,0 +1,45 @@
+import time as _time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from agendamento import importacao
+
+
+class Command(BaseCommand):
+    help = (
+        'Importa clientes, serviços ou agendamentos de um arquivo CSV, NDJSON ou JSON, '
+        'validando cada linha e gravando em lotes com bulk_create.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('tipo', choices=list(importacao.IMPORTACOES))
+        parser.add_argument('arquivo')
+        parser.add_argument('--formato', choices=['csv', 'ndjson', 'json'],
+                            help='Formato do arquivo. Padrão: extensão do arquivo')
+        parser.add_argument('--lote', type=int, default=importacao.TAMANHO_LOTE,
+                            help=f'Registros por transação (padrão: {importacao.TAMANHO_LOTE})')
+        parser.add_argument('--max-erros', type=int, default=20,
+                            help='Quantidade de linhas rejeitadas listadas no relatório (padrão: 20)')
+
+    def handle(self, *args, **options):
+        if options['lote'] < 1:
+            raise CommandError('--lote deve ser maior que zero.')
+
+        importador = importacao.IMPORTACOES[options['tipo']](options['lote'])
+        comeco = _time.perf_counter()
+        try:
+            importador.executar(importacao.ler_registros(options['arquivo'], options['formato']))
+        except (OSError, ValueError) as e:
+            raise CommandError(f'Erro ao ler {options["arquivo"]}: {e}')
+        duracao = _time.perf_counter() - comeco
+
+        processados = importador.importados + len(importador.rejeitados)
+        self.stdout.write(self.style.SUCCESS(
+            f'{importador.importados} {options["tipo"]} importados, '
+            f'{len(importador.rejeitados)} rejeitados em {duracao:.1f}s '
+            f'({processados / max(duracao, 0.001):.0f} linhas/s).'
+        ))
+        for numero, motivo in importador.rejeitados[:options['max_erros']]:
+            self.stdout.write(self.style.WARNING(f'  linha {numero}: {motivo}'))
+        if len(importador.rejeitados) > options['max_erros']:
+            self.stdout.write(f'  ... e mais {len(importador.rejeitados) - options["max_erros"]} linhas rejeitadas.')
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from agendamento.booking import limpar_pre_reservas_expiradas
+
+
+class Command(BaseCommand):
+    help = (
+        'Remove as pré-reservas expiradas. Agende a cada minuto (ex.: cron) para que as '
+        'páginas de agenda abertas sejam avisadas assim que um horário seguro for liberado.'
+    )
+
+    def handle(self, *args, **options):
+        removidas = limpar_pre_reservas_expiradas()
+        self.stdout.write(self.style.SUCCESS(f'{removidas} pré-reservas expiradas removidas.'))
@@ -0,0 +1,42 @@
+import time as _time
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+
+from agendamento import resumo
+from agendamento.models import Agendamento
+
+
+class Command(BaseCommand):
+    help = 'Recalcula a tabela ResumoDiario a partir dos agendamentos, em lotes de dias.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--inicio', help='Data inicial (AAAA-MM-DD). Padrão: primeiro agendamento')
+        parser.add_argument('--fim', help='Data final (AAAA-MM-DD). Padrão: último agendamento')
+        parser.add_argument('--dias-por-lote', type=int, default=31,
+                            help='Quantidade de dias recalculados por transação (padrão: 31)')
+
+    def handle(self, *args, **options):
+        limites = Agendamento.objects.aggregate(inicio=Min('data'), fim=Max('data'))
+        try:
+            inicio = self.data(options['inicio']) or limites['inicio']
+            fim = self.data(options['fim']) or limites['fim']
+        except ValueError:
+            raise CommandError('Datas devem estar no formato AAAA-MM-DD.')
+
+        if not inicio or not fim:
+            self.stdout.write('Nenhum agendamento encontrado.')
+            return
+        if options['dias_por_lote'] < 1:
+            raise CommandError('--dias-por-lote deve ser maior que zero.')
+
+        comeco = _time.perf_counter()
+        gravadas = resumo.reconstruir(inicio, fim, options['dias_por_lote'])
+        duracao = _time.perf_counter() - comeco
+        self.stdout.write(self.style.SUCCESS(
+            f'{gravadas} linhas de resumo gravadas entre {inicio} e {fim} em {duracao:.1f}s.'
+        ))
+
+    def data(self, valor):
+        return datetime.strptime(valor, '%Y-%m-%d').date() if valor else None
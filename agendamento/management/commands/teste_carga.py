@@ -0,0 +1,96 @@
+import statistics
+import time as _time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+def percentil(valores, p):
+    """Percentil `p` (0-100) de uma lista já ordenada"""
+    if not valores:
+        return 0.0
+    indice = min(len(valores) - 1, max(0, round(p / 100 * len(valores)) - 1))
+    return valores[indice]
+
+
+class Command(BaseCommand):
+    help = (
+        'Teste de carga HTTP: dispara requisições concorrentes contra uma ou mais URLs e '
+        'mostra requisições/s, p50 e p99. Para comparar WSGI e ASGI, suba o mesmo banco '
+        'nos dois servidores e passe as duas URLs, por exemplo:\n'
+        '  gunicorn core.wsgi -w 4 -b :8000\n'
+        '  ASYNC_VIEWS=True uvicorn core.asgi:application --workers 4 --port 8001\n'
+        '  python manage.py teste_carga '
+        '--url "http://127.0.0.1:8000/horarios-disponiveis/?data=2025-10-20&servico_id=1" '
+        '--url "http://127.0.0.1:8001/horarios-disponiveis/?data=2025-10-20&servico_id=1"'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', action='append', required=True,
+                            help='URL a testar; repita a opção para comparar servidores')
+        parser.add_argument('--requisicoes', type=int, default=2_000,
+                            help='Total de requisições por URL (padrão: 2.000)')
+        parser.add_argument('--concorrencia', type=int, default=50,
+                            help='Requisições simultâneas (padrão: 50)')
+        parser.add_argument('--aquecimento', type=int, default=50,
+                            help='Requisições descartadas antes da medição (padrão: 50)')
+        parser.add_argument('--cookie', default='',
+                            help='Cabeçalho Cookie enviado (ex.: sessionid=... para APIs autenticadas)')
+        parser.add_argument('--timeout', type=float, default=10.0,
+                            help='Timeout de cada requisição em segundos (padrão: 10)')
+
+    def handle(self, *args, **options):
+        if options['requisicoes'] < 1 or options['concorrencia'] < 1:
+            raise CommandError('--requisicoes e --concorrencia devem ser positivos')
+
+        resultados = []
+        for url in options['url']:
+            self.stdout.write(self.style.MIGRATE_HEADING(url))
+            self.executar(url, options['aquecimento'], options, exibir=False)
+            resultados.append((url, self.executar(url, options['requisicoes'], options)))
+
+        self.stdout.write(self.style.MIGRATE_HEADING('Resumo'))
+        self.stdout.write(f'  {"req/s":>10} {"p50 (ms)":>10} {"p99 (ms)":>10} {"erros":>7}  url')
+        for url, (por_segundo, p50, p99, erros) in resultados:
+            self.stdout.write(f'  {por_segundo:>10.1f} {p50:>10.2f} {p99:>10.2f} {erros:>7}  {url}')
+
+    def requisitar(self, url, cookie, timeout):
+        """Retorna (latência em ms, sucesso) de uma requisição GET"""
+        requisicao = Request(url, headers={'Cookie': cookie} if cookie else {})
+        inicio = _time.perf_counter()
+        try:
+            with urlopen(requisicao, timeout=timeout) as resposta:
+                resposta.read()
+                sucesso = resposta.status < 400
+        except HTTPError as e:
+            e.read()
+            sucesso = False
+        except (URLError, OSError):
+            sucesso = False
+        return (_time.perf_counter() - inicio) * 1000, sucesso
+
+    def executar(self, url, total, options, exibir=True):
+        if total < 1:
+            return 0.0, 0.0, 0.0, 0
+
+        inicio = _time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concorrencia']) as executor:
+            respostas = list(executor.map(
+                lambda _: self.requisitar(url, options['cookie'], options['timeout']),
+                range(total)
+            ))
+        duracao = _time.perf_counter() - inicio
+
+        latencias = sorted(latencia for latencia, _ in respostas)
+        erros = sum(1 for _, sucesso in respostas if not sucesso)
+        por_segundo = total / duracao
+        p50 = statistics.median(latencias)
+        p99 = percentil(latencias, 99)
+        if exibir:
+            self.stdout.write(
+                f'  {total} requisições em {duracao:.2f}s: {por_segundo:.1f} req/s, '
+                f'p50 {p50:.2f} ms, p99 {p99:.2f} ms, {erros} erros'
+            )
+        return por_segundo, p50, p99, erros
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.6 on 2026-10-18 15:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agendamento', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DiaAgenda',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.DateField(unique=True)),
+            ],
+            options={
+                'verbose_name': 'Dia da Agenda',
+                'verbose_name_plural': 'Dias da Agenda',
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.6 on 2026-10-18 15:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agendamento', '0002_diaagenda'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='agendamento',
+            index=models.Index(fields=['data', 'hora'], name='agendamento_data_hora_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='agendamento',
+            index=models.Index(fields=['cliente', 'data', 'hora'], name='agendamento_cliente_data_idx'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.6 on 2026-10-18 15:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agendamento', '0004_resumodiario'),
+        ('funcionarios', '0004_horariofuncionario'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='agendamento',
+            name='funcionario',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='funcionarios.funcionario'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.6 on 2026-10-18 16:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agendamento', '0005_agendamento_funcionario'),
+        ('clientes', '0002_cliente_telefone_index'),
+        ('funcionarios', '0004_horariofuncionario'),
+        ('servicos', '0002_planos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PreReserva',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.DateField()),
+                ('hora', models.TimeField()),
+                ('expira_em', models.DateTimeField()),
+                ('cliente', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='clientes.cliente')),
+                ('funcionario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='funcionarios.funcionario')),
+                ('servico', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='servicos.servico')),
+            ],
+            options={
+                'verbose_name': 'Pré-reserva',
+                'verbose_name_plural': 'Pré-reservas',
+                'indexes': [models.Index(fields=['data', 'expira_em'], name='prereserva_data_expira_idx'), models.Index(fields=['expira_em'], name='prereserva_expira_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.6 on 2026-10-18 17:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agendamento', '0006_prereserva'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Slot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.DateField()),
+                ('cadeira', models.PositiveIntegerField()),
+                ('minuto', models.PositiveSmallIntegerField()),
+                ('agendamento', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='slots', to='agendamento.agendamento')),
+            ],
+            options={
+                'verbose_name': 'Slot',
+                'verbose_name_plural': 'Slots',
+                'constraints': [models.UniqueConstraint(fields=('data', 'cadeira', 'minuto'), name='slot_data_cadeira_minuto_unico')],
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.6 on 2026-10-18 21:10
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def copiar_precos(apps, schema_editor):
+    # Sem histórico de reajustes, os agendamentos existentes ficam com o preço atual
+    Agendamento = apps.get_model('agendamento', 'Agendamento')
+    Servico = apps.get_model('servicos', 'Servico')
+    Agendamento.objects.filter(preco=None).update(
+        preco=Subquery(Servico.objects.filter(pk=OuterRef('servico_id')).values('preco')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agendamento', '0007_slot'),
+        ('servicos', '0004_imagem_larguras'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='agendamento',
+            name='preco',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=8, null=True),
+        ),
+        migrations.RunPython(copiar_precos, migrations.RunPython.noop),
+    ]
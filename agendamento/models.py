@@ -1,20 +1,130 @@
 from django.db import models
 from clientes.models import Cliente
 from servicos.models import Servico
+from funcionarios.models import Funcionario
 
 # Create your models here.
 class Agendamento(models.Model):
     cliente = models.ForeignKey(Cliente, on_delete=models.CASCADE)
     servico = models.ForeignKey(Servico, on_delete=models.CASCADE)
+    # Barbeiro responsável; vazio em agendamentos antigos, que ocupam todas as cadeiras
+    funcionario = models.ForeignKey(Funcionario, on_delete=models.SET_NULL, blank=True, null=True)
     data = models.DateField()
     hora = models.TimeField()
     observacoes = models.TextField(blank=True, null=True)
+    # Preço do serviço no momento do agendamento: reajustes não mudam a receita já registrada
+    preco = models.DecimalField(max_digits=8, decimal_places=2, blank=True, null=True)
     criado_em = models.DateTimeField(auto_now_add=True)
     
     class Meta:
         verbose_name = "Agendamento"
         verbose_name_plural = "Agendamentos"
         ordering = ['data', 'hora']
+        indexes = [
+            # Disponibilidade do dia e próximos agendamentos (data=..., data__gte=... ordenados por hora)
+            models.Index(fields=['data', 'hora'], name='agendamento_data_hora_idx'),
+            # Agendamentos de um cliente ordenados por data e hora
+            models.Index(fields=['cliente', 'data', 'hora'], name='agendamento_cliente_data_idx'),
+        ]
 
+    @property
+    def preco_cobrado(self):
+        """Preço gravado no agendamento; linhas gravadas com bulk_create sem preço usam o atual do serviço"""
+        return self.servico.preco if self.preco is None else self.preco
 
+    def save(self, *args, **kwargs):
+        if self.preco is None:
+            self.preco = self.servico.preco
+        super().save(*args, **kwargs)
 
+
+class DiaAgenda(models.Model):
+    """Linha de bloqueio por dia, usada para serializar reservas de uma mesma data"""
+    data = models.DateField(unique=True)
+
+    class Meta:
+        verbose_name = "Dia da Agenda"
+        verbose_name_plural = "Dias da Agenda"
+
+    def __str__(self):
+        return self.data.strftime('%d/%m/%Y')
+
+
+class ResumoDiario(models.Model):
+    """Totais de agendamentos por dia e serviço, mantidos incrementalmente para relatórios"""
+    data = models.DateField()
+    servico = models.ForeignKey(Servico, on_delete=models.CASCADE)
+    quantidade = models.IntegerField(default=0)
+    receita = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    minutos = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Resumo Diário"
+        verbose_name_plural = "Resumos Diários"
+        ordering = ['data', 'servico']
+        constraints = [
+            models.UniqueConstraint(fields=['data', 'servico'], name='resumo_diario_data_servico_unico'),
+        ]
+
+    def __str__(self):
+        return f"{self.data.strftime('%d/%m/%Y')} - {self.servico}: {self.quantidade}"
+
+
+class PreReserva(models.Model):
+    """
+    Reserva temporária de um horário enquanto o cliente conclui o agendamento.
+
+    Ocupa a agenda como um agendamento até `expira_em`; depois disso é ignorada
+    e removida pela limpeza (comando limpar_pre_reservas ou nas próximas reservas do dia).
+    """
+    cliente = models.ForeignKey(Cliente, on_delete=models.CASCADE)
+    servico = models.ForeignKey(Servico, on_delete=models.CASCADE)
+    funcionario = models.ForeignKey(Funcionario, on_delete=models.CASCADE, blank=True, null=True)
+    data = models.DateField()
+    hora = models.TimeField()
+    expira_em = models.DateTimeField()
+
+    class Meta:
+        verbose_name = "Pré-reserva"
+        verbose_name_plural = "Pré-reservas"
+        indexes = [
+            # Pré-reservas ativas de um dia (data=..., expira_em__gt=agora)
+            models.Index(fields=['data', 'expira_em'], name='prereserva_data_expira_idx'),
+            # Limpeza das expiradas
+            models.Index(fields=['expira_em'], name='prereserva_expira_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.cliente} - {self.data.strftime('%d/%m/%Y')} {self.hora.strftime('%H:%M')}"
+
+
+class Slot(models.Model):
+    """
+    Célula da grade de horários de uma cadeira, materializada com antecedência
+    pelo comando gerar_slots quando settings.AGENDA_SLOTS está ativo.
+
+    Só existem células dentro do expediente de cada cadeira; uma célula livre
+    tem `agendamento` vazio.
+    """
+    # Cadeira única (barbearia sem barbeiros cadastrados)
+    CADEIRA_UNICA = 0
+
+    data = models.DateField()
+    # Id do barbeiro dono da cadeira, ou CADEIRA_UNICA
+    cadeira = models.PositiveIntegerField()
+    # Início da célula, em minutos desde a meia-noite
+    minuto = models.PositiveSmallIntegerField()
+    agendamento = models.ForeignKey(
+        Agendamento, on_delete=models.SET_NULL, blank=True, null=True, related_name='slots'
+    )
+
+    class Meta:
+        verbose_name = "Slot"
+        verbose_name_plural = "Slots"
+        constraints = [
+            # Também serve de índice para a leitura da grade de um dia
+            models.UniqueConstraint(fields=['data', 'cadeira', 'minuto'], name='slot_data_cadeira_minuto_unico'),
+        ]
+
+    def __str__(self):
+        return f"{self.data.strftime('%d/%m/%Y')} {self.minuto // 60:02d}:{self.minuto % 60:02d} (cadeira {self.cadeira})"
@@ -0,0 +1,79 @@
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import Coalesce
+
+from agendamento.availability import duracao_em_minutos
+from agendamento.models import Agendamento, ResumoDiario
+from servicos.models import Servico
+
+
+def registrar(data, servico, sinal=1, preco=None):
+    """
+    Soma (sinal=1) ou subtrai (sinal=-1) um agendamento do resumo do dia.
+    `preco` é o preço gravado no agendamento (padrão: o atual do serviço):
+    ao subtrair, precisa ser o mesmo que foi somado, ou a receita fica errada.
+    Os minutos seguem a duração atual do serviço; depois de mudar a duração,
+    rode `manage.py reconstruir_resumo` para os dias com agendamentos dele.
+    """
+    preco = servico.preco if preco is None else preco
+    valores = {
+        'quantidade': F('quantidade') + sinal,
+        'receita': F('receita') + sinal * preco,
+        'minutos': F('minutos') + sinal * duracao_em_minutos(servico.duracao),
+    }
+    resumo = ResumoDiario.objects.filter(data=data, servico=servico)
+    if resumo.update(**valores) or sinal < 0:
+        return
+
+    # Primeiro agendamento do dia para o serviço
+    try:
+        with transaction.atomic():
+            ResumoDiario.objects.create(
+                data=data,
+                servico=servico,
+                quantidade=1,
+                receita=preco,
+                minutos=duracao_em_minutos(servico.duracao)
+            )
+    except IntegrityError:
+        # Outra transação criou a linha nesse meio tempo
+        resumo.update(**valores)
+
+
+def reconstruir(inicio, fim, dias_por_lote=31):
+    """
+    Recalcula o resumo entre `inicio` e `fim` a partir dos agendamentos, em
+    lotes de `dias_por_lote` dias. Cada lote roda em sua própria transação e
+    faz uma única agregação agrupada por data e serviço.
+
+    Retorna a quantidade de linhas de resumo gravadas.
+    """
+    servicos = {servico.id: servico for servico in Servico.objects.all()}
+    gravadas = 0
+    lote_inicio = inicio
+    while lote_inicio <= fim:
+        lote_fim = min(lote_inicio + timedelta(days=dias_por_lote - 1), fim)
+        totais = (
+            Agendamento.objects
+            .filter(data__range=(lote_inicio, lote_fim))
+            .order_by()
+            .values('data', 'servico')
+            .annotate(quantidade=Count('id'), receita=Sum(Coalesce('preco', 'servico__preco')))
+        )
+        with transaction.atomic():
+            ResumoDiario.objects.filter(data__range=(lote_inicio, lote_fim)).delete()
+            resumos = ResumoDiario.objects.bulk_create([
+                ResumoDiario(
+                    data=total['data'],
+                    servico_id=total['servico'],
+                    quantidade=total['quantidade'],
+                    receita=total['receita'] or 0,
+                    minutos=total['quantidade'] * duracao_em_minutos(servicos[total['servico']].duracao)
+                )
+                for total in totais
+            ])
+        gravadas += len(resumos)
+        lote_inicio = lote_fim + timedelta(days=1)
+    return gravadas
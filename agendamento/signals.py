@@ -0,0 +1,161 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from agendamento import catalogo, resumo, slots
+from agendamento.caching import invalidar_data, invalidar_tudo
+from agendamento.eventos import publicar_disponibilidade
+from agendamento.models import Agendamento, PreReserva
+from funcionarios.models import Funcionario, HorarioFuncionamento, HorarioFuncionario
+from servicos.models import Servico
+
+
+@receiver(pre_save, sender=Agendamento)
+def guardar_estado_anterior(sender, instance, **kwargs):
+    """Guarda data, serviço e preço originais para atualizar também o dia antigo ao remarcar"""
+    instance._anterior = None
+    if instance.pk:
+        instance._anterior = (
+            sender.objects.filter(pk=instance.pk).values_list('data', 'servico_id', 'preco').first()
+        )
+        # Trocou de serviço: passa a valer o preço do novo
+        if instance._anterior and instance._anterior[1] != instance.servico_id and instance.preco == instance._anterior[2]:
+            instance.preco = instance.servico.preco
+
+
+def _alterar_disponibilidade(data, evento):
+    invalidar_data(data)
+    # Publica depois de invalidar, para os assinantes recalcularem com dados novos
+    publicar_disponibilidade(data, evento)
+
+
+@receiver(post_save, sender=Agendamento)
+@receiver(post_delete, sender=Agendamento)
+def invalidar_disponibilidade_agendamento(sender, instance, **kwargs):
+    # Invalida só após o commit, para ninguém recalcular o cache com dados ainda não confirmados
+    if 'created' not in kwargs:
+        evento = 'removido'
+    else:
+        evento = 'criado' if kwargs['created'] else 'alterado'
+    anterior = getattr(instance, '_anterior', None)
+    datas = {instance.data, anterior[0] if anterior else None} - {None}
+    for data in datas:
+        transaction.on_commit(lambda data=data: _alterar_disponibilidade(data, evento))
+
+
+@receiver(post_save, sender=Agendamento)
+def ocupar_grade(sender, instance, raw=False, **kwargs):
+    # Na mesma transação do agendamento: se as células não estiverem livres, nada é gravado.
+    # A exclusão libera as células sozinha (Slot.agendamento é SET_NULL).
+    if slots.ativo() and not raw:
+        slots.ocupar(instance)
+
+
+@receiver(post_save, sender=PreReserva)
+@receiver(post_delete, sender=PreReserva)
+def invalidar_disponibilidade_pre_reserva(sender, instance, **kwargs):
+    transaction.on_commit(lambda: _alterar_disponibilidade(instance.data, 'pre_reserva'))
+
+
+@receiver(post_save, sender=Agendamento)
+def atualizar_resumo_ao_salvar(sender, instance, created, **kwargs):
+    anterior = getattr(instance, '_anterior', None)
+    if not created:
+        if not anterior or anterior == (instance.data, instance.servico_id, instance.preco):
+            return
+        resumo.registrar(anterior[0], Servico.objects.get(pk=anterior[1]), -1, anterior[2])
+    resumo.registrar(instance.data, instance.servico, preco=instance.preco)
+
+
+@receiver(post_delete, sender=Agendamento)
+def atualizar_resumo_ao_excluir(sender, instance, **kwargs):
+    resumo.registrar(instance.data, instance.servico, -1, instance.preco)
+
+
+@receiver(post_save, sender=HorarioFuncionamento)
+@receiver(post_delete, sender=HorarioFuncionamento)
+@receiver(post_save, sender=HorarioFuncionario)
+@receiver(post_delete, sender=HorarioFuncionario)
+@receiver(post_save, sender=Funcionario)
+@receiver(post_delete, sender=Funcionario)
+@receiver(post_save, sender=Servico)
+@receiver(post_delete, sender=Servico)
+def invalidar_disponibilidade_catalogo(sender, instance, **kwargs):
+    # Só após o commit: descartar antes deixaria outra requisição recarregar (e
+    # guardar com a versão antiga) o que ainda pode ser desfeito por um rollback
+    transaction.on_commit(catalogo.invalidar)
+    transaction.on_commit(invalidar_tudo)
+
+
+# Campos que mudam a grade materializada: expedientes, duração, passo e quem atende
+CAMPOS_GRADE = {
+    HorarioFuncionamento: ('dia_semana', 'hora_inicio', 'hora_fim', 'ativo', 'intervalo_minutos'),
+    HorarioFuncionario: ('funcionario_id', 'dia_semana', 'hora_inicio', 'hora_fim', 'ativo'),
+    Funcionario: ('status', 'atende'),
+    Servico: ('duracao', 'folga_minutos', 'intervalo_minutos'),
+}
+
+
+def _campos_grade(instance):
+    return tuple(getattr(instance, campo) for campo in CAMPOS_GRADE[type(instance)])
+
+
+def _regenerar_grade(**filtros):
+    # Após o commit, com o catálogo já recarregado deste processo
+    transaction.on_commit(lambda: slots.regenerar(**filtros))
+
+
+@receiver(pre_save, sender=HorarioFuncionamento)
+@receiver(pre_save, sender=HorarioFuncionario)
+@receiver(pre_save, sender=Funcionario)
+@receiver(pre_save, sender=Servico)
+def guardar_campos_grade(sender, instance, raw=False, **kwargs):
+    instance._campos_grade = None
+    if slots.ativo() and not raw and instance.pk:
+        instance._campos_grade = (
+            sender.objects.filter(pk=instance.pk).values_list(*CAMPOS_GRADE[sender]).first()
+        )
+
+
+@receiver(post_save, sender=HorarioFuncionamento)
+@receiver(post_save, sender=HorarioFuncionario)
+@receiver(post_save, sender=Funcionario)
+@receiver(post_save, sender=Servico)
+def regenerar_grade_ao_salvar(sender, instance, created, raw=False, **kwargs):
+    """
+    Refaz a grade só quando um campo de CAMPOS_GRADE mudou, e só nas datas
+    afetadas: editar a descrição ou o preço de um serviço não toca a grade.
+    """
+    if not slots.ativo() or raw:
+        return
+    anterior = getattr(instance, '_campos_grade', None)
+    atual = _campos_grade(instance)
+    if anterior == atual:
+        return
+    if sender is Servico:
+        # Serviço novo ainda não tem agendamentos na grade
+        if not created:
+            _regenerar_grade(servico_id=instance.pk)
+    elif sender is Funcionario:
+        # Um cadastro novo só muda a grade se já entra atendendo
+        if anterior is not None or (instance.status and instance.atende):
+            _regenerar_grade()
+    else:
+        dias = {instance.dia_semana}
+        if anterior is not None:
+            dias.add(anterior[CAMPOS_GRADE[sender].index('dia_semana')])
+        _regenerar_grade(dias_semana=dias)
+
+
+@receiver(post_delete, sender=HorarioFuncionamento)
+@receiver(post_delete, sender=HorarioFuncionario)
+@receiver(post_delete, sender=Funcionario)
+def regenerar_grade_ao_excluir(sender, instance, **kwargs):
+    # Os agendamentos de um serviço excluído vão junto, liberando as células sozinhos
+    if not slots.ativo():
+        return
+    if sender is Funcionario:
+        if instance.status and instance.atende:
+            _regenerar_grade()
+    else:
+        _regenerar_grade(dias_semana={instance.dia_semana})
@@ -0,0 +1,188 @@
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Max
+
+from agendamento.availability import OcupacaoCadeiras, OcupacaoSlots, ocupacao_em_minutos, para_minutos
+from agendamento.catalogo import catalogo
+from agendamento.models import Agendamento, DiaAgenda, Slot
+
+
+class SlotOcupado(IntegrityError):
+    """O agendamento não encontrou todas as suas células livres na grade"""
+
+
+def ativo():
+    return settings.AGENDA_SLOTS
+
+
+def _cadeira(funcionario_id):
+    return Slot.CADEIRA_UNICA if funcionario_id is None else funcionario_id
+
+
+def _faixa(agendamento, granularidade):
+    """Minutos [a, b) das células tocadas pelo agendamento, incluindo a folga do serviço"""
+    inicio = para_minutos(agendamento.hora)
+    fim = inicio + ocupacao_em_minutos(agendamento.servico)
+    return inicio // granularidade * granularidade, -(-fim // granularidade) * granularidade
+
+
+def gerar_dia(data, horario_funcionamento, barbeiros, horarios_barbeiros, granularidade):
+    """
+    Recria a grade de uma data: as células do expediente de cada cadeira,
+    já marcadas com os agendamentos existentes. Retorna o número de células.
+    """
+    DiaAgenda.objects.get_or_create(data=data)
+    with transaction.atomic():
+        DiaAgenda.objects.select_for_update().get(data=data)
+        Slot.objects.filter(data=data).delete()
+        if horario_funcionamento is None:
+            return 0
+
+        # Expediente de cada cadeira, recortado pelo horário do barbeiro
+        cadeiras = OcupacaoCadeiras.montar(horario_funcionamento, (), barbeiros, horarios_barbeiros).cadeiras
+        celulas = {}
+        for funcionario_id, ocupacao in cadeiras.items():
+            cadeira = _cadeira(funcionario_id)
+            primeiro = -(-ocupacao.abertura // granularidade) * granularidade
+            for minuto in range(primeiro, ocupacao.fechamento - granularidade + 1, granularidade):
+                celulas[cadeira, minuto] = Slot(data=data, cadeira=cadeira, minuto=minuto)
+
+        agendamentos = Agendamento.objects.filter(data=data).select_related('servico').order_by('hora', 'id')
+        for agendamento in agendamentos:
+            if agendamento.funcionario_id in cadeiras:
+                alvo = [_cadeira(agendamento.funcionario_id)]
+            elif agendamento.funcionario_id is None:
+                # Sem barbeiro: ocupa todas as cadeiras, como na agenda
+                alvo = [_cadeira(funcionario_id) for funcionario_id in cadeiras]
+            else:
+                continue
+            a, b = _faixa(agendamento, granularidade)
+            for cadeira in alvo:
+                for minuto in range(a, b, granularidade):
+                    slot = celulas.get((cadeira, minuto))
+                    if slot is not None and slot.agendamento_id is None:
+                        slot.agendamento = agendamento
+
+        Slot.objects.bulk_create(celulas.values(), batch_size=1000)
+        return len(celulas)
+
+
+def _datas(inicio, fim):
+    data = inicio
+    while data <= fim:
+        yield data
+        data += timedelta(days=1)
+
+
+def gerar_datas(datas):
+    """Gera a grade de cada uma das datas; retorna o total de células"""
+    cadastro = catalogo()
+    horarios_semana = cadastro.horarios_ativos()
+    barbeiros = cadastro.barbeiros_ids()
+    horarios_barbeiros = cadastro.horarios_barbeiros
+
+    return sum(
+        gerar_dia(
+            data,
+            horarios_semana.get(data.weekday()),
+            barbeiros,
+            horarios_barbeiros[data.weekday()],
+            settings.AGENDA_SLOT_MINUTOS
+        )
+        for data in datas
+    )
+
+
+def gerar(inicio, fim):
+    """Gera a grade de cada data de [inicio, fim]; retorna o total de células"""
+    return gerar_datas(_datas(inicio, fim))
+
+
+def regenerar(dias_semana=None, servico_id=None, inicio=None, fim=None):
+    """
+    Gera de novo a grade já existente (de hoje até o último dia gerado) depois
+    de uma mudança nos expedientes, barbeiros ou serviços. Só refaz as datas
+    desses dias da semana, ou com agendamentos do serviço; por padrão, todas.
+    `inicio` e `fim` recortam o período. Retorna o total de células.
+    """
+    ultima = Slot.objects.filter(data__gte=date.today()).aggregate(ultima=Max('data'))['ultima']
+    inicio = max(inicio or date.today(), date.today())
+    fim = min(fim or ultima, ultima) if ultima else None
+    if fim is None or inicio > fim:
+        return 0
+    if servico_id is not None:
+        datas = (
+            Agendamento.objects.filter(servico_id=servico_id, data__range=(inicio, fim))
+            .values_list('data', flat=True).distinct().order_by('data')
+        )
+    else:
+        datas = _datas(inicio, fim)
+    if dias_semana is not None:
+        datas = [data for data in datas if data.weekday() in dias_semana]
+    return gerar_datas(list(datas))
+
+
+def descartar(inicio=None, fim=None):
+    """
+    Apaga a grade (por padrão, de hoje em diante). Os dias sem grade voltam a
+    ter a disponibilidade calculada dos agendamentos até a próxima geração.
+    """
+    slots = Slot.objects.filter(data__gte=inicio or date.today())
+    if fim is not None:
+        slots = slots.filter(data__lte=fim)
+    slots.delete()
+
+
+def ocupar(agendamento):
+    """
+    Marca na grade as células do agendamento (liberando as antigas, ao remarcar).
+
+    A marcação só acontece em células ainda livres, em um único UPDATE: se
+    alguma estiver ocupada, levanta SlotOcupado — como faria uma restrição
+    de unicidade — e a transação do agendamento é desfeita.
+    """
+    Slot.objects.filter(agendamento=agendamento).update(agendamento=None)
+
+    dia = Slot.objects.filter(data=agendamento.data)
+    a, b = _faixa(agendamento, settings.AGENDA_SLOT_MINUTOS)
+    if agendamento.funcionario_id is not None:
+        dia = dia.filter(cadeira=agendamento.funcionario_id)
+    # Conta só as células existentes: a folga pode passar do fim do expediente
+    # (que a validação do horário já garante para o serviço em si)
+    alvo = dia.filter(minuto__gte=a, minuto__lt=b)
+    esperadas = alvo.count()
+
+    if alvo.filter(agendamento=None).update(agendamento=agendamento) < esperadas:
+        raise SlotOcupado(f'Horário ocupado na grade: {agendamento.data} {agendamento.hora}')
+
+
+def _celulas_do_dia(data):
+    return Slot.objects.filter(data=data).select_related('agendamento__servico').order_by()
+
+
+def _montar(horario_funcionamento, slots, extras):
+    if not slots:
+        return None
+    celulas = [
+        (None if slot.cadeira == Slot.CADEIRA_UNICA else slot.cadeira, slot.minuto, slot.agendamento)
+        for slot in slots
+    ]
+    return OcupacaoSlots(
+        horario_funcionamento.hora_inicio,
+        horario_funcionamento.hora_fim,
+        settings.AGENDA_SLOT_MINUTOS,
+        celulas,
+        extras
+    )
+
+
+def grade_do_dia(data, horario_funcionamento, extras=()):
+    """Ocupação do dia lida da grade em uma consulta, ou None se a data não tem grade"""
+    return _montar(horario_funcionamento, list(_celulas_do_dia(data)), extras)
+
+
+async def agrade_do_dia(data, horario_funcionamento, extras=()):
+    """Versão assíncrona de grade_do_dia()"""
+    return _montar(horario_funcionamento, [slot async for slot in _celulas_do_dia(data)], extras)
@@ -1,3 +1,825 @@
-from django.test import TestCase
+import asyncio
+import json
+import os
+import queue
+import random
+import tempfile
+import threading
+import time as _time
+from datetime import date, time, timedelta
+from importlib import import_module
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from agendamento import caching, catalogo, importacao, resumo, slots, views
+from agendamento.availability import para_hora, para_minutos
+from agendamento.barbeiros import ocupacao_do_dia
+from agendamento.booking import ConflitoHorario, liberar, reservar, segurar
+from agendamento.disponibilidade import calcular_horarios_disponiveis, calcular_horarios_funcionario
+from agendamento.eventos import BrokerCache, topico_disponibilidade
+from agendamento.importacao import ImportacaoAgendamentos, ImportacaoClientes, ImportacaoServicos, ler_registros
+from agendamento.models import Agendamento, PreReserva, ResumoDiario, Slot
+from clientes.models import Cliente
+from funcionarios.models import Funcionario, HorarioFuncionamento, HorarioFuncionario
+from servicos.models import Servico
+
+
+class ReservaTests(TestCase):
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.cliente = Cliente.objects.create(nome='Cliente', telefone='11999990000', senha='x')
+            self.servico = Servico.objects.create(nome='Corte', duracao=timedelta(minutes=45), preco=30)
+            self.horario = HorarioFuncionamento.objects.create(
+                dia_semana=0, hora_inicio=time(8), hora_fim=time(18)
+            )
+        self.data = date(2030, 1, 7)  # segunda-feira
+
+    def test_reserva_sem_conflito(self):
+        agendamento = reservar(self.cliente.id, self.servico, self.data, time(9), self.horario)
+        self.assertEqual(Agendamento.objects.get().pk, agendamento.pk)
+
+    def test_reserva_com_sobreposicao_e_recusada(self):
+        reservar(self.cliente.id, self.servico, self.data, time(9), self.horario)
+        with self.assertRaises(ConflitoHorario) as contexto:
+            reservar(self.cliente.id, self.servico, self.data, time(9, 30), self.horario)
+        self.assertEqual(contexto.exception.fim, 9 * 60 + 45)
+        self.assertEqual(Agendamento.objects.count(), 1)
+
+    def test_reserva_encostada_no_fim_e_aceita(self):
+        reservar(self.cliente.id, self.servico, self.data, time(9), self.horario)
+        reservar(self.cliente.id, self.servico, self.data, time(9, 45), self.horario)
+        self.assertEqual(Agendamento.objects.count(), 2)
+
+    def test_barbeiros_atendem_em_paralelo(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            barbeiros = [
+                Funcionario.objects.create(nome=f'Barbeiro {i}', senha='x', status=True, atende=True)
+                for i in range(2)
+            ]
+        primeiro = reservar(self.cliente.id, self.servico, self.data, time(9), self.horario)
+        segundo = reservar(self.cliente.id, self.servico, self.data, time(9), self.horario)
+        self.assertEqual({primeiro.funcionario_id, segundo.funcionario_id}, {b.id for b in barbeiros})
+        with self.assertRaises(ConflitoHorario):
+            reservar(self.cliente.id, self.servico, self.data, time(9, 15), self.horario)
+
+    def test_horario_do_barbeiro_limita_a_cadeira(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            barbeiro = Funcionario.objects.create(nome='Barbeiro', senha='x', status=True, atende=True)
+            HorarioFuncionario.objects.create(
+                funcionario=barbeiro, dia_semana=0, hora_inicio=time(13), hora_fim=time(18)
+            )
+        with self.assertRaises(ConflitoHorario) as contexto:
+            reservar(self.cliente.id, self.servico, self.data, time(9), self.horario, funcionario_id=barbeiro.id)
+        self.assertIsNone(contexto.exception.agendamento)
+        agendamento = reservar(self.cliente.id, self.servico, self.data, time(14), self.horario)
+        self.assertEqual(agendamento.funcionario_id, barbeiro.id)
+
+
+class PreReservaTests(TestCase):
+    """O horário segurado fica fora do alcance dos outros clientes até expirar"""
+
+    def setUp(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.cliente = Cliente.objects.create(nome='Cliente', telefone='11999990000', senha='x')
+            self.outro = Cliente.objects.create(nome='Outro', telefone='11999990001', senha='x')
+            self.servico = Servico.objects.create(nome='Corte', duracao=timedelta(minutes=45), preco=30)
+            self.horario = HorarioFuncionamento.objects.create(dia_semana=0, hora_inicio=time(8), hora_fim=time(18))
+            self.barbeiros = [
+                Funcionario.objects.create(nome=f'Barbeiro {i}', senha='x', status=True, atende=True)
+                for i in range(2)
+            ]
+        self.data = date(2030, 1, 7)
+
+    def test_outro_cliente_nao_pega_a_cadeira_segurada(self):
+        segurada = segurar(self.cliente.id, self.servico, self.data, time(9), self.horario)
+        with self.assertRaises(ConflitoHorario) as contexto:
+            reservar(self.outro.id, self.servico, self.data, time(9), self.horario, funcionario_id=segurada.funcionario_id)
+        self.assertTrue(contexto.exception.pre_reserva)
+        # A outra cadeira continua livre
+        agendamento = reservar(self.outro.id, self.servico, self.data, time(9), self.horario)
+        self.assertNotEqual(agendamento.funcionario_id, segurada.funcionario_id)
+
+    def test_reserva_do_dono_converte_a_pre_reserva(self):
+        segurar(self.cliente.id, self.servico, self.data, time(9), self.horario)
+        # Segurar outro horário substitui o anterior
+        segurada = segurar(self.cliente.id, self.servico, self.data, time(10), self.horario,
+                           funcionario_id=self.barbeiros[1].id)
+        self.assertEqual(PreReserva.objects.get().pk, segurada.pk)
+
+        agendamento = reservar(self.cliente.id, self.servico, self.data, time(10), self.horario)
+        self.assertEqual(agendamento.funcionario_id, self.barbeiros[1].id)
+        self.assertFalse(PreReserva.objects.exists())
+
+    def test_pre_reserva_expirada_nao_ocupa(self):
+        segurada = segurar(self.cliente.id, self.servico, self.data, time(9), self.horario)
+        PreReserva.objects.update(expira_em=timezone.now() - timedelta(seconds=1))
+        agendamento = reservar(self.outro.id, self.servico, self.data, time(9), self.horario,
+                               funcionario_id=segurada.funcionario_id)
+        self.assertEqual(agendamento.funcionario_id, segurada.funcionario_id)
+        self.assertFalse(PreReserva.objects.exists())
+
+    def test_disponibilidade_mostra_a_pre_reserva_ate_expirar(self):
+        segurar(self.outro.id, self.servico, self.data, time(9), self.horario, funcionario_id=self.barbeiros[0].id)
+        segurar(self.cliente.id, self.servico, self.data, time(9), self.horario, funcionario_id=self.barbeiros[1].id)
+        resultado = calcular_horarios_disponiveis(self.data, self.servico.id)
+        self.assertNotIn('09:00', [horario['hora'] for horario in resultado['horarios_disponiveis']])
+        self.assertTrue(all(ocupado.get('expira_em') for ocupado in resultado['horarios_ocupados']))
+
+        liberar(self.cliente.id)
+        resultado = calcular_horarios_disponiveis(self.data, self.servico.id)
+        self.assertIn('09:00', [horario['hora'] for horario in resultado['horarios_disponiveis']])
+
+
+class CacheDisponibilidadeTests(TestCase):
+    """Cada data tem a sua versão no cache: agendar num dia não descarta os outros"""
+
+    def setUp(self):
+        cache.clear()
+        self.cliente = Cliente.objects.create(nome='Cliente', telefone='11999990000', senha='x')
+        self.servico = Servico.objects.create(nome='Corte', duracao=timedelta(minutes=45), preco=30)
+        self.horario = HorarioFuncionamento.objects.create(dia_semana=0, hora_inicio=time(8), hora_fim=time(18))
+        self.segunda = date(2030, 1, 7)
+        self.terca = date(2030, 1, 8)
+        self.calculos = []
+
+    def consultar(self, data):
+        def calcular():
+            self.calculos.append(data)
+            return {'horarios_ocupados': []}
+        return caching.disponibilidade_em_cache(data, 'geral', calcular)
+
+    def consultar_as_duas(self):
+        self.calculos.clear()
+        self.consultar(self.segunda)
+        self.consultar(self.terca)
+        return self.calculos
+
+    def test_segunda_consulta_sai_do_cache(self):
+        self.assertEqual(self.consultar_as_duas(), [self.segunda, self.terca])
+        self.assertEqual(self.consultar_as_duas(), [])
+
+    def test_agendamento_invalida_so_a_propria_data(self):
+        self.consultar_as_duas()
+        with self.captureOnCommitCallbacks(execute=True):
+            agendamento = Agendamento.objects.create(
+                cliente=self.cliente, servico=self.servico, data=self.segunda, hora=time(9)
+            )
+        self.assertEqual(self.consultar_as_duas(), [self.segunda])
+
+        # Remarcar invalida o dia antigo e o novo
+        with self.captureOnCommitCallbacks(execute=True):
+            agendamento.data = self.terca
+            agendamento.save()
+        self.assertEqual(self.consultar_as_duas(), [self.segunda, self.terca])
+
+    def test_invalidacao_espera_o_commit(self):
+        self.consultar_as_duas()
+        with self.captureOnCommitCallbacks() as callbacks:
+            Agendamento.objects.create(cliente=self.cliente, servico=self.servico, data=self.segunda, hora=time(9))
+            self.assertEqual(self.consultar_as_duas(), [])
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.consultar_as_duas(), [self.segunda])
+
+    def test_horario_de_funcionamento_invalida_todas_as_datas(self):
+        self.consultar_as_duas()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.horario.hora_fim = time(20)
+            self.horario.save()
+        self.assertEqual(self.consultar_as_duas(), [self.segunda, self.terca])
+
+    def test_versao_descartada_nao_reaproveita_entradas_antigas(self):
+        self.consultar_as_duas()
+        cache.delete(caching.chave_versao_data(self.segunda))
+        with mock.patch('agendamento.caching._time.time', return_value=_time.time() + 1):
+            self.assertEqual(self.consultar_as_duas(), [self.segunda])
+
+    def test_timeout_limitado_pela_pre_reserva(self):
+        expira_em = timezone.now() + timedelta(seconds=90)
+        resultado = {'horarios_ocupados': [{'expira_em': expira_em.isoformat()}]}
+        self.assertLessEqual(caching._timeout(resultado), 91)
+        self.assertEqual(caching._timeout({'horarios_ocupados': []}), settings.DISPONIBILIDADE_CACHE_TIMEOUT)
+
+
+class ViewsAssincronasTests(TestCase):
+    """As views assíncronas (ASGI) respondem igual às síncronas"""
+
+    def setUp(self):
+        cache.clear()
+        self.cliente = Cliente.objects.create(nome='Cliente', telefone='11999990000', senha='x')
+        self.outro = Cliente.objects.create(nome='Outro', telefone='11999990001', senha='x')
+        self.servico = Servico.objects.create(nome='Corte', duracao=timedelta(minutes=45), preco=30)
+        HorarioFuncionamento.objects.create(dia_semana=0, hora_inicio=time(8), hora_fim=time(18))
+        Funcionario.objects.create(nome='Barbeiro', senha='x', status=True, atende=True)
+        self.data = date(2030, 1, 7)
+        self.agendamento = Agendamento.objects.create(
+            cliente=self.cliente, servico=self.servico, data=self.data, hora=time(9)
+        )
+        self.fabrica = RequestFactory()
+
+    async def sessao(self, **valores):
+        sessao = import_module(settings.SESSION_ENGINE).SessionStore()
+        for chave, valor in valores.items():
+            await sessao.aset(chave, valor)
+        return sessao
+
+    async def test_horarios_disponiveis_igual_a_versao_sincrona(self):
+        parametros = {'data': self.data.isoformat(), 'servico_id': self.servico.id}
+        esperado = json.loads((await sync_to_async(views.horarios_disponiveis)(
+            self.fabrica.get('/horarios-disponiveis/', parametros)
+        )).content)
+        await cache.aclear()
+        resposta = await views.ahorarios_disponiveis(self.fabrica.get('/horarios-disponiveis/', parametros))
+        self.assertEqual(json.loads(resposta.content), esperado)
+        horas = [horario['hora'] for horario in esperado['horarios_disponiveis']]
+        self.assertIn('08:00', horas)
+        self.assertNotIn('09:00', horas)
+
+    async def test_horarios_disponiveis_valida_os_parametros(self):
+        resposta = await views.ahorarios_disponiveis(self.fabrica.get('/horarios-disponiveis/', {'data': '2030-01-07'}))
+        self.assertEqual(resposta.status_code, 400)
+        resposta = await views.ahorarios_disponiveis(self.fabrica.get('/horarios-disponiveis/', {
+            'data': '07/01/2030', 'servico_id': self.servico.id,
+        }))
+        self.assertEqual(resposta.status_code, 400)
+        resposta = await views.ahorarios_disponiveis(self.fabrica.post('/horarios-disponiveis/'))
+        self.assertEqual(resposta.status_code, 405)
+
+    async def test_deletar_so_o_proprio_agendamento(self):
+        url = f'/deletar-agendamento/{self.agendamento.id}/'
+        pedido = self.fabrica.post(url)
+        pedido.session = await self.sessao(cliente_id=self.outro.id)
+        with self.assertLogs('agendamento.views', 'WARNING'):
+            resposta = await views.adeletar_agendamento(pedido, self.agendamento.id)
+        self.assertEqual(resposta.status_code, 404)
+
+        pedido = self.fabrica.post(url)
+        pedido.session = await self.sessao(cliente_id=self.cliente.id)
+        with self.captureOnCommitCallbacks(execute=True), self.assertLogs('agendamento.views', 'INFO'):
+            resposta = await views.adeletar_agendamento(pedido, self.agendamento.id)
+        self.assertEqual(resposta.status_code, 200)
+        self.assertFalse(await Agendamento.objects.filter(pk=self.agendamento.pk).aexists())
+
+
+class ResumoDiarioTests(TestCase):
+    """A receita do resumo usa o preço gravado no agendamento, não o atual do serviço"""
+
+    def setUp(self):
+        self.cliente = Cliente.objects.create(nome='Cliente', telefone='11999990000', senha='x')
+        self.servico = Servico.objects.create(nome='Corte', duracao=timedelta(minutes=45), preco=30)
+        self.data = date(2030, 1, 7)
+
+    def resumo(self):
+        return ResumoDiario.objects.filter(data=self.data).values_list('quantidade', 'receita').first()
+
+    def test_reajuste_entre_agendar_e_cancelar(self):
+        agendamento = Agendamento.objects.create(cliente=self.cliente, servico=self.servico, data=self.data, hora=time(9))
+        self.servico.preco = 50
+        self.servico.save()
+        Agendamento.objects.create(cliente=self.cliente, servico=self.servico, data=self.data, hora=time(10))
+        self.assertEqual(self.resumo(), (2, Decimal('80')))
+
+        agendamento.delete()
+        self.assertEqual(self.resumo(), (1, Decimal('50')))
+        resumo.reconstruir(self.data, self.data)
+        self.assertEqual(self.resumo(), (1, Decimal('50')))
+
+    def test_troca_de_servico_usa_o_preco_do_novo(self):
+        barba = Servico.objects.create(nome='Barba', duracao=timedelta(minutes=20), preco=20)
+        agendamento = Agendamento.objects.create(cliente=self.cliente, servico=self.servico, data=self.data, hora=time(9))
+        self.servico.preco = 50
+        self.servico.save()
+        agendamento.servico = barba
+        agendamento.save()
+        self.assertEqual(agendamento.preco, 20)
+        self.assertEqual(
+            dict(ResumoDiario.objects.values_list('servico_id', 'receita')),
+            {self.servico.id: Decimal('0'), barba.id: Decimal('20')}
+        )
+
+
+class _Desfazer(Exception):
+    pass
+
+
+class DisponibilidadePropriedadesTests(TestCase):
+    """
+    Dias aleatórios (com semente fixa) conferidos contra uma verificação
+    ingênua de sobreposição: a agenda do cliente, a API dos funcionários e a
+    reserva precisam concordar sobre quais horários estão livres.
+    """
+
+    DIAS = 8
+
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.cliente = Cliente.objects.create(nome='Cliente', telefone='11999990000', senha='x')
+            self.servicos = [
+                Servico.objects.create(nome='Barba', duracao=timedelta(minutes=20), preco=20, intervalo_minutos=10),
+                Servico.objects.create(nome='Corte', duracao=timedelta(minutes=30), preco=30),
+                Servico.objects.create(nome='Corte e barba', duracao=timedelta(minutes=45), preco=45, folga_minutos=10),
+                Servico.objects.create(nome='Química', duracao=timedelta(minutes=75), preco=90, folga_minutos=15),
+            ]
+            self.horario = HorarioFuncionamento.objects.create(
+                dia_semana=0, hora_inicio=time(8), hora_fim=time(18), intervalo_minutos=15
+            )
+        self.data = date(2030, 1, 7)  # segunda-feira
+        self.expedientes = {None: (8 * 60, 18 * 60)}
+
+    def adicionar_barbeiros(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            barbeiros = [
+                Funcionario.objects.create(nome=f'Barbeiro {i}', senha='x', status=True, atende=True)
+                for i in range(2)
+            ]
+            HorarioFuncionario.objects.create(
+                funcionario=barbeiros[1], dia_semana=0, hora_inicio=time(11), hora_fim=time(16)
+            )
+        self.expedientes = {barbeiros[0].id: (8 * 60, 18 * 60), barbeiros[1].id: (11 * 60, 16 * 60)}
+
+    def popular(self, aleatorio):
+        Agendamento.objects.all().delete()
+        barbeiros = [barbeiro for barbeiro in self.expedientes if barbeiro is not None]
+        for _ in range(aleatorio.randint(5, 30)):
+            inicio = aleatorio.randrange(8 * 60, 18 * 60, 5)
+            try:
+                reservar(
+                    self.cliente.id, aleatorio.choice(self.servicos), self.data, para_hora(inicio), self.horario,
+                    funcionario_id=aleatorio.choice(barbeiros + [None])
+                )
+            except ConflitoHorario:
+                pass
+
+    def ocupados(self):
+        return [
+            (
+                para_minutos(agendamento.hora),
+                para_minutos(agendamento.hora) + int(agendamento.servico.duracao.total_seconds() // 60)
+                + agendamento.servico.folga_minutos,
+                agendamento.funcionario_id,
+            )
+            for agendamento in Agendamento.objects.select_related('servico')
+        ]
+
+    def esperado(self, ocupados, duracao, folga, passo, barbeiro):
+        """Verificação ingênua: algum expediente comporta o serviço sem sobrepor nada?"""
+        cadeiras = [barbeiro] if barbeiro is not None else list(self.expedientes)
+        inicios = set(range(8 * 60, 18 * 60, passo))
+        if self.horario.encaixe:
+            inicios |= {
+                fim for _, fim, dono in ocupados
+                if 8 * 60 <= fim < 18 * 60 and (dono is None or dono in cadeiras)
+            }
+
+        def cabe(inicio, cadeira):
+            abertura, fechamento = self.expedientes[cadeira]
+            if inicio < abertura or inicio + duracao > fechamento:
+                return False
+            fim = min(inicio + duracao + folga, fechamento)
+            return all(b <= inicio or a >= fim for a, b, dono in ocupados if dono is None or dono == cadeira)
+
+        return [
+            para_hora(inicio).strftime('%H:%M')
+            for inicio in sorted(inicios) if any(cabe(inicio, cadeira) for cadeira in cadeiras)
+        ]
+
+    def aceita(self, servico, hora, barbeiro):
+        """Tenta reservar e desfaz: indica se a reserva aceitaria o horário"""
+        try:
+            with transaction.atomic():
+                reservar(self.cliente.id, servico, self.data, hora, self.horario, funcionario_id=barbeiro)
+                raise _Desfazer
+        except _Desfazer:
+            return True
+        except ConflitoHorario:
+            return False
+
+    def conferir(self, semente):
+        aleatorio = random.Random(semente)
+        for dia in range(self.DIAS):
+            self.horario.encaixe = dia % 2 == 1
+            with self.captureOnCommitCallbacks(execute=True):
+                self.horario.save()
+            self.popular(aleatorio)
+            ocupados = self.ocupados()
+            for barbeiro in self.expedientes:
+                for servico in self.servicos:
+                    contexto = (semente, dia, servico.nome, barbeiro)
+                    duracao = int(servico.duracao.total_seconds() // 60)
+                    passo = servico.intervalo_minutos or self.horario.intervalo_minutos
+                    agenda = [
+                        horario['hora'] for horario in
+                        calcular_horarios_disponiveis(self.data, servico.id, barbeiro)['horarios_disponiveis']
+                    ]
+                    api = [
+                        horario['hora'] for horario in
+                        calcular_horarios_funcionario(self.data, servico.id, barbeiro)['horarios']
+                    ]
+                    self.assertEqual(agenda, api, contexto)
+                    self.assertEqual(agenda, self.esperado(ocupados, duracao, servico.folga_minutos, passo, barbeiro), contexto)
+
+                    # A reserva aceita os horários oferecidos e segue as mesmas regras fora da grade
+                    for hora in aleatorio.sample(agenda, min(2, len(agenda))):
+                        self.assertTrue(self.aceita(servico, time.fromisoformat(hora), barbeiro), contexto + (hora,))
+                    livres = self.esperado(ocupados, duracao, servico.folga_minutos, 5, barbeiro)
+                    for inicio in aleatorio.sample(range(8 * 60, 18 * 60, 5), 3):
+                        hora = para_hora(inicio)
+                        self.assertEqual(
+                            self.aceita(servico, hora, barbeiro), hora.strftime('%H:%M') in livres, contexto + (hora,)
+                        )
+
+                passo = self.horario.intervalo_minutos
+                sem_servico = [
+                    horario['hora'] for horario in calcular_horarios_funcionario(self.data, None, barbeiro)['horarios']
+                ]
+                self.assertEqual(sem_servico, self.esperado(ocupados, passo, 0, passo, barbeiro), (semente, dia, barbeiro))
+
+    def test_cadeira_unica(self):
+        self.conferir(1)
+
+    def test_barbeiros_em_paralelo(self):
+        self.adicionar_barbeiros()
+        self.conferir(2)
+
+
+@override_settings(AGENDA_SLOTS=True)
+class DisponibilidadeGradeTests(DisponibilidadePropriedadesTests):
+    """As mesmas propriedades com a ocupação lida da grade materializada (OcupacaoSlots)"""
+
+    def conferir(self, semente):
+        slots.gerar(self.data, self.data)
+        self.assertIsNotNone(slots.grade_do_dia(self.data, self.horario))
+        super().conferir(semente)
+
+
+@override_settings(AGENDA_SLOTS=True)
+class RegeneracaoGradeTests(TestCase):
+    """Mudanças no catálogo refazem só os dias afetados da grade, e só quando mexem nela"""
+
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.servico = Servico.objects.create(nome='Corte', duracao=timedelta(minutes=30), preco=30)
+            self.cliente = Cliente.objects.create(nome='Cliente', telefone='11999990000', senha='x')
+            for dia in range(7):
+                HorarioFuncionamento.objects.create(dia_semana=dia, hora_inicio=time(8), hora_fim=time(12))
+        self.hoje = date.today()
+        slots.gerar(self.hoje, self.hoje + timedelta(days=13))
+
+    def ids_por_data(self):
+        return {
+            data: set(Slot.objects.filter(data=data).values_list('id', flat=True))
+            for data in Slot.objects.values_list('data', flat=True).distinct()
+        }
+
+    def salvar(self, objeto, **campos):
+        for campo, valor in campos.items():
+            setattr(objeto, campo, valor)
+        with self.captureOnCommitCallbacks(execute=True):
+            objeto.save()
+
+    def test_mudanca_de_expediente_refaz_so_aquele_dia_da_semana(self):
+        antes = self.ids_por_data()
+        horario = HorarioFuncionamento.objects.get(dia_semana=self.hoje.weekday())
+        self.salvar(horario, hora_fim=time(11))
+        depois = self.ids_por_data()
+        for data, ids in depois.items():
+            if data.weekday() == self.hoje.weekday():
+                self.assertFalse(ids & antes[data], data)
+                ultimo = Slot.objects.filter(data=data).order_by('-minuto').first().minuto
+                self.assertEqual(ultimo, 11 * 60 - settings.AGENDA_SLOT_MINUTOS)
+            else:
+                self.assertEqual(ids, antes[data], data)
+
+    def test_campos_que_nao_tocam_a_grade_nao_a_refazem(self):
+        antes = self.ids_por_data()
+        self.salvar(self.servico, descricao='Corte na tesoura', preco=45)
+        with self.captureOnCommitCallbacks(execute=True):
+            Funcionario.objects.create(nome='Recepção', senha='x')
+        self.assertEqual(self.ids_por_data(), antes)
+
+    def test_mudanca_de_duracao_remarca_os_agendamentos_do_servico(self):
+        data = self.hoje + timedelta(days=1)
+        agendamento = Agendamento.objects.create(cliente=self.cliente, servico=self.servico, data=data, hora=time(9))
+        self.assertEqual(Slot.objects.filter(agendamento=agendamento).count(), 30 // settings.AGENDA_SLOT_MINUTOS)
+        self.salvar(self.servico, duracao=timedelta(minutes=60))
+        self.assertEqual(Slot.objects.filter(agendamento=agendamento).count(), 60 // settings.AGENDA_SLOT_MINUTOS)
+
+    def test_barbeiro_que_passa_a_atender_ganha_cadeira(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            barbeiro = Funcionario.objects.create(nome='Barbeiro', senha='x', status=True)
+        self.assertFalse(Slot.objects.filter(cadeira=barbeiro.id).exists())
+        self.salvar(barbeiro, atende=True)
+        self.assertEqual(
+            set(Slot.objects.filter(cadeira=barbeiro.id).values_list('data', flat=True)),
+            set(Slot.objects.values_list('data', flat=True))
+        )
+
+
+class ImportacaoTests(TestCase):
+    """Linhas malformadas são rejeitadas uma a uma, sem interromper a importação"""
+
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.servico = Servico.objects.create(nome='Corte', duracao=timedelta(minutes=45), preco=30)
+            self.cliente = Cliente.objects.create(nome='Cliente', email='cliente@exemplo.com', telefone='1', senha='x')
+            HorarioFuncionamento.objects.create(dia_semana=0, hora_inicio=time(8), hora_fim=time(18))
+        self.data = '2030-01-07'  # segunda-feira
+
+    def importar(self, classe, registros):
+        importador = classe()
+        importador.executar(enumerate(registros, start=1))
+        return importador
+
+    def test_clientes_com_campos_numericos_e_linhas_malformadas(self):
+        importador = self.importar(ImportacaoClientes, [
+            {'nome': 'Ana Souza', 'telefone': 11987654321, 'email': 'ana@exemplo.com'},
+            {'nome': 12345, 'telefone': 11912345678},
+            ['não', 'é', 'objeto'],
+            {'nome': 'Sem telefone', 'telefone': None},
+            {'nome': 'Bruno', 'telefone': '(11) 90000-0000', 'email': 42},
+        ])
+        self.assertEqual(importador.importados, 2)
+        self.assertEqual([numero for numero, _ in importador.rejeitados], [3, 4, 5])
+        ana = Cliente.objects.get(email='ana@exemplo.com')
+        self.assertEqual((ana.telefone, ana.telefone_normalizado), ('11987654321', '11987654321'))
+
+    def test_ndjson_com_linha_quebrada(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.ndjson', delete=False, encoding='utf-8') as arquivo:
+            arquivo.write('{"nome": "Ana Souza", "telefone": 11987654321}\n{"nome": "Bruno", \n\n')
+            arquivo.write('{"nome": "Carla Lima", "telefone": "11900000000"}\n')
+        self.addCleanup(os.remove, arquivo.name)
+        importador = ImportacaoClientes()
+        importador.executar(ler_registros(arquivo.name))
+        self.assertEqual(importador.importados, 2)
+        self.assertEqual([numero for numero, _ in importador.rejeitados], [2])
+
+    def test_servicos_com_valores_invalidos(self):
+        importador = self.importar(ImportacaoServicos, [
+            {'nome': 'Barba', 'duracao': 20, 'preco': 25},
+            {'nome': 'Sem duração', 'duracao': None, 'preco': 25},
+            {'nome': 'Preço ruim', 'duracao': '30', 'preco': 'caro'},
+            {'nome': None, 'duracao': 30, 'preco': 10},
+        ])
+        self.assertEqual(importador.importados, 1)
+        self.assertEqual([numero for numero, _ in importador.rejeitados], [2, 3, 4])
+
+    def test_agendamentos_seguem_o_expediente_e_as_cadeiras_da_agenda(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            manha, tarde = [
+                Funcionario.objects.create(nome=nome, email=f'{nome.lower()}@exemplo.com', senha='x', status=True, atende=True)
+                for nome in ('Manha', 'Tarde')
+            ]
+            HorarioFuncionario.objects.create(funcionario=tarde, dia_semana=0, hora_inicio=time(13), hora_fim=time(18))
+            recepcao = Funcionario.objects.create(nome='Recepção', email='recepcao@exemplo.com', senha='x', status=True)
+        linha = {'cliente_email': 'cliente@exemplo.com', 'servico': 'corte', 'data': self.data}
+
+        importador = self.importar(ImportacaoAgendamentos, [
+            {**linha, 'hora': '09:00', 'funcionario_email': 'tarde@exemplo.com'},
+            {**linha, 'hora': '09:00', 'funcionario_email': 'recepcao@exemplo.com'},
+            {**linha, 'hora': '14:00'},
+            {**linha, 'hora': '14:00'},
+            {**linha, 'hora': '14:15'},
+            {**linha, 'hora': 900, 'servico_id': 'x'},
+        ])
+        self.assertEqual(importador.importados, 2)
+        self.assertEqual([numero for numero, _ in importador.rejeitados], [1, 2, 5, 6])
+        self.assertIn('não atende', importador.rejeitados[0][1])
+        self.assertEqual(
+            sorted(Agendamento.objects.values_list('funcionario_id', flat=True)), [manha.id, tarde.id]
+        )
+        self.assertNotIn(recepcao.id, Agendamento.objects.values_list('funcionario_id', flat=True))
+
+    def test_linhas_aceitas_marcam_a_ocupacao_sem_remontar(self):
+        linhas = [
+            {'cliente_email': 'cliente@exemplo.com', 'servico': 'corte', 'data': self.data, 'hora': f'{hora:02d}:00'}
+            for hora in range(8, 17)
+        ]
+        with mock.patch('agendamento.importacao.ocupacao_do_dia', wraps=importacao.ocupacao_do_dia) as montar:
+            importador = self.importar(ImportacaoAgendamentos, linhas + linhas[:2])
+        self.assertEqual(montar.call_count, 1)
+        self.assertEqual(importador.importados, 9)
+        self.assertEqual([numero for numero, _ in importador.rejeitados], [10, 11])
+
+    def test_dias_descartados_entre_lotes_sao_remontados_do_banco(self):
+        outro_dia = '2030-01-14'
+        linha = {'cliente_email': 'cliente@exemplo.com', 'servico': 'corte', 'hora': '09:00'}
+        importador = ImportacaoAgendamentos(tamanho_lote=1, dias_em_memoria=1)
+        importador.executar(enumerate([
+            {**linha, 'data': self.data},
+            {**linha, 'data': outro_dia},
+            {**linha, 'data': self.data, 'hora': '09:30'},
+            {**linha, 'data': outro_dia, 'hora': '09:15'},
+            {**linha, 'data': self.data, 'hora': '09:45'},
+        ], start=1))
+        self.assertEqual(importador.importados, 3)
+        self.assertEqual([numero for numero, _ in importador.rejeitados], [3, 4])
+        self.assertLessEqual(len(importador.ocupacoes), 1)
+
+    def test_marcar_equivale_a_montar_com_todos(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            barbeiros = [
+                Funcionario.objects.create(nome=f'Barbeiro {i}', senha='x', status=True, atende=True).id
+                for i in range(2)
+            ]
+            HorarioFuncionario.objects.create(funcionario_id=barbeiros[1], dia_semana=0, hora_inicio=time(11), hora_fim=time(16))
+        horario = HorarioFuncionamento.objects.get(dia_semana=0)
+        data = date(2030, 1, 7)
+        aleatorio = random.Random(3)
+        servicos = [self.servico, Servico(nome='Barba', duracao=timedelta(minutes=20), preco=20, folga_minutos=10)]
+        agendamentos = [
+            Agendamento(servico=aleatorio.choice(servicos), data=data,
+                        hora=para_hora(aleatorio.randrange(8 * 60, 18 * 60, 5)),
+                        funcionario_id=aleatorio.choice(barbeiros + [None]))
+            for _ in range(25)
+        ]
+        incremental = ocupacao_do_dia(data, horario, agendamentos[:5])
+        for agendamento in agendamentos[5:]:
+            incremental.marcar(agendamento)
+        completa = ocupacao_do_dia(data, horario, agendamentos)
+        for barbeiro in barbeiros + [None]:
+            self.assertEqual(
+                incremental.horarios_livres(30, 5, barbeiro, folga=10, encaixe=True),
+                completa.horarios_livres(30, 5, barbeiro, folga=10, encaixe=True)
+            )
+        def conflito(ocupacao, inicio):
+            intervalo = ocupacao.conflito(inicio, 45)
+            return intervalo and intervalo[:2]
+
+        for inicio in range(8 * 60, 18 * 60, 5):
+            self.assertEqual(incremental.cadeiras_livres(inicio, 45), completa.cadeiras_livres(inicio, 45))
+            self.assertEqual(conflito(incremental, inicio), conflito(completa, inicio))
+        self.assertEqual([i[:2] for i in incremental.intervalos], [i[:2] for i in completa.intervalos])
+
+
+class ReservaConcorrenteTests(TransactionTestCase):
+    """Várias threads disputando os mesmos horários não podem gerar agendamentos sobrepostos"""
+
+    THREADS = 8
+    TENTATIVAS_POR_THREAD = 10
+
+    def setUp(self):
+        self.cliente = Cliente.objects.create(nome='Cliente', telefone='11999990000', senha='x')
+        self.servico = Servico.objects.create(nome='Corte', duracao=timedelta(minutes=45), preco=30)
+        self.horario = HorarioFuncionamento.objects.create(
+            dia_semana=0, hora_inicio=time(8), hora_fim=time(18)
+        )
+        self.data = date(2030, 1, 7)
+
+    def test_sem_agendamentos_duplicados(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest('SQLite em memória não suporta conexões concorrentes')
+
+        horarios = [time(8 + minutos // 60, minutos % 60) for minutos in range(0, 600, 15)]
+        inicio = threading.Barrier(self.THREADS)
+        resultados = {'reservas': 0, 'conflitos': 0, 'erros': []}
+        trava = threading.Lock()
+
+        def cliente_concorrente(deslocamento):
+            try:
+                inicio.wait()
+                for tentativa in range(self.TENTATIVAS_POR_THREAD):
+                    hora = horarios[(deslocamento + tentativa * 3) % len(horarios)]
+                    try:
+                        reservar(self.cliente.id, self.servico, self.data, hora, self.horario)
+                        chave = 'reservas'
+                    except ConflitoHorario:
+                        chave = 'conflitos'
+                    with trava:
+                        resultados[chave] += 1
+            except Exception as e:
+                with trava:
+                    resultados['erros'].append(e)
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=cliente_concorrente, args=(i,)) for i in range(self.THREADS)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(resultados['erros'], [])
+        tentativas = self.THREADS * self.TENTATIVAS_POR_THREAD
+        self.assertEqual(resultados['reservas'] + resultados['conflitos'], tentativas)
+
+        # Nenhum par de agendamentos do dia pode se sobrepor
+        intervalos = sorted(
+            (ag.hora.hour * 60 + ag.hora.minute, 45) for ag in Agendamento.objects.filter(data=self.data)
+        )
+        self.assertEqual(len(intervalos), resultados['reservas'])
+        for (inicio_a, duracao_a), (inicio_b, _) in zip(intervalos, intervalos[1:]):
+            self.assertLessEqual(inicio_a + duracao_a, inicio_b)
+
+
+@override_settings(EVENTOS_INTERVALO=0.01)
+class CatalogoTests(TestCase):
+    """Catálogo em memória: recarrega quando outro processo muda a versão, e só após o commit"""
+
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.servico = Servico.objects.create(nome='Corte', duracao=timedelta(minutes=30), preco=30)
+
+    def test_outro_processo_invalida_pela_versao_compartilhada(self):
+        atual = catalogo.catalogo()
+        # Mudança gravada por outro processo: este só fica sabendo pela versão no cache
+        Servico.objects.filter(pk=self.servico.pk).update(preco=45)
+        caching.invalidar_catalogo()
+        with self.assertNumQueries(0):
+            self.assertIs(catalogo.catalogo(), atual)
+
+        with override_settings(CATALOGO_VERIFICACAO_SEGUNDOS=0):
+            novo = catalogo.catalogo()
+        self.assertIsNot(novo, atual)
+        self.assertEqual(novo.versao, caching.versao_catalogo())
+        self.assertEqual(novo.servico(self.servico.pk).preco, 45)
+
+    def test_rollback_nao_descarta_nem_muda_a_versao(self):
+        atual = catalogo.catalogo()
+        versao = caching.versao_catalogo()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            try:
+                with transaction.atomic():
+                    self.servico.preco = 45
+                    self.servico.save()
+                    # Ninguém recarrega (e guarda) o que ainda pode ser desfeito
+                    self.assertIs(catalogo.catalogo(), atual)
+                    raise _Desfazer
+            except _Desfazer:
+                pass
+        self.assertEqual(callbacks, [])
+        self.assertEqual(caching.versao_catalogo(), versao)
+        with override_settings(CATALOGO_VERIFICACAO_SEGUNDOS=0):
+            self.assertIs(catalogo.catalogo(), atual)
+        self.assertEqual(atual.servico(self.servico.pk).preco, 30)
+
+    def test_commit_descarta_e_muda_a_versao(self):
+        atual = catalogo.catalogo()
+        versao = caching.versao_catalogo()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.servico.preco = 45
+            self.servico.save()
+            self.assertIs(catalogo.catalogo(), atual)
+        self.assertNotEqual(caching.versao_catalogo(), versao)
+        self.assertEqual(catalogo.catalogo().servico(self.servico.pk).preco, 45)
+
+
+class BrokerCacheTests(TestCase):
+    """O BrokerCache entrega publicações de outro processo (outra instância) pelo cache"""
+
+    def setUp(self):
+        cache.clear()
+        self.topico = topico_disponibilidade(date(2030, 1, 7))
+
+    def test_entrega_publicacao_de_outra_instancia(self):
+        assinatura = BrokerCache().assinar(self.topico)
+        with self.assertRaises(queue.Empty):
+            assinatura.receber(timeout=0)
+        BrokerCache().publicar(self.topico, {'evento': 'criado'})
+        self.assertEqual(assinatura.receber(timeout=1), {'evento': 'criado'})
+
+    def test_publicacoes_seguidas_chegam_como_uma(self):
+        broker = BrokerCache()
+        assinatura = broker.assinar(self.topico)
+        broker.publicar(self.topico, {'evento': 'criado'})
+        broker.publicar(self.topico, {'evento': 'removido'})
+        self.assertEqual(assinatura.receber(timeout=1), {'evento': 'removido'})
+        with self.assertRaises(queue.Empty):
+            assinatura.receber(timeout=0.05)
+
+    def test_assinatura_assincrona(self):
+        broker = BrokerCache()
+
+        async def receber():
+            assinatura = broker.aassinar(self.topico)
+            with self.assertRaises(asyncio.TimeoutError):
+                await assinatura.receber(timeout=0)
+            await sync_to_async(broker.publicar)(self.topico, {'evento': 'alterado'})
+            return await assinatura.receber(timeout=1)
+
+        self.assertEqual(async_to_sync(receber)(), {'evento': 'alterado'})
+
+    @override_settings(EVENTOS_TTL=60)
+    def test_topico_expira_sem_publicacoes(self):
+        broker = BrokerCache()
+        agora = _time.time()
+        with mock.patch('time.time', return_value=agora):
+            broker.publicar(self.topico, {'evento': 'criado'})
+        with mock.patch('time.time', return_value=agora + 50):
+            broker.publicar(self.topico, {'evento': 'removido'})
+        # A segunda publicação renovou o prazo do contador e da mensagem
+        with mock.patch('time.time', return_value=agora + 100):
+            self.assertEqual(broker.versao(self.topico), 2)
+            self.assertEqual(broker.mensagem(self.topico), {'evento': 'removido'})
+        with mock.patch('time.time', return_value=agora + 111):
+            self.assertEqual(broker.versao(self.topico), 0)
+            self.assertIsNone(broker.mensagem(self.topico))
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.shortcuts import render
 from django.views.generic import TemplateView, View
 from main.views import SessionLoginRequiredMixin
@@ -8,11 +9,25 @@ from django.utils.decorators import method_decorator
 from servicos.models import Servico
 from clientes.models import Cliente
 from agendamento.models import Agendamento
-from funcionarios.models import HorarioFuncionamento
 from django.contrib import messages
-from datetime import datetime, date, time
-from django.http import JsonResponse
+from datetime import datetime, date, time, timedelta
+from collections import defaultdict
+from django.http import JsonResponse, StreamingHttpResponse
+from django.core.serializers.json import DjangoJSONEncoder
 from django.views.decorators.http import require_http_methods
+from agendamento.availability import OcupacaoCadeiras, para_hora
+from agendamento.catalogo import catalogo
+from agendamento.caching import adisponibilidade_em_cache, disponibilidade_em_cache
+from agendamento.booking import ConflitoHorario, liberar, pre_reservas_ativas, reservar, segurar
+from agendamento.disponibilidade import acalcular_horarios_disponiveis, calcular_horarios_disponiveis, horario_do_dia, livres
+from agendamento.eventos import broker, topico_disponibilidade
+import asyncio
+import json
+import logging
+import queue
+import time as _time
+
+logger = logging.getLogger(__name__)
 
 # Create your views here.
 class MyAgendamentos(SessionLoginRequiredMixin, TemplateView):
@@ -25,7 +40,7 @@ class MyAgendamentos(SessionLoginRequiredMixin, TemplateView):
         if cliente_id:
             try:
                 cliente = Cliente.objects.get(id=cliente_id)
-                agendamentos = Agendamento.objects.filter(cliente=cliente).order_by('data', 'hora')
+                agendamentos = Agendamento.objects.filter(cliente=cliente).select_related('servico', 'funcionario').order_by('data', 'hora')
                 context['agendamentos'] = agendamentos
             except Cliente.DoesNotExist:
                 context['agendamentos'] = []
@@ -40,100 +55,45 @@ class AgendaView(SessionLoginRequiredMixin, TemplateView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['servicos'] = Servico.objects.all()
+        cadastro = catalogo()
+        context['servicos'] = list(cadastro.servicos.values())
+        context['barbeiros'] = sorted(cadastro.barbeiros, key=lambda barbeiro: barbeiro.nome)
+        context['sse_ativo'] = settings.SSE_ATIVO
         return context
     
     def post(self, request, *args, **kwargs):
         # Pega os dados do formulário
-        servico_id = request.POST.get('servico')
-        data_str = request.POST.get('data')
-        hora_str = request.POST.get('horario')
         observacoes = request.POST.get('observacoes', '')
+        funcionario_id = request.POST.get('funcionario') or None
         
         # Pega o cliente da sessão
         cliente_id = request.session.get('cliente_id')
         
         try:
-            # Validações básicas
-            if not servico_id or not data_str or not hora_str:
-                messages.error(request, 'Todos os campos obrigatórios devem ser preenchidos.')
-                return render(request, self.template_name, self.get_context_data())
-            
-            # Converte data e hora
-            data_agendamento = datetime.strptime(data_str, '%Y-%m-%d').date()
-            hora_agendamento = datetime.strptime(hora_str, '%H:%M').time()
-            
-            # Valida se a data não é no passado
-            if data_agendamento < date.today():
-                messages.error(request, 'Não é possível agendar para datas passadas.')
-                return render(request, self.template_name, self.get_context_data())
-            
-            # Pega o serviço para obter a duração
-            try:
-                servico = Servico.objects.get(id=servico_id)
-            except Servico.DoesNotExist:
-                messages.error(request, 'Serviço não encontrado.')
-                return render(request, self.template_name, self.get_context_data())
+            servico, data_agendamento, hora_agendamento, horario_funcionamento = validar_pedido(request.POST)
+        except PedidoInvalido as e:
+            messages.error(request, str(e))
+            return render(request, self.template_name, self.get_context_data())
+        
+        try:
+            # Calcula o horário de fim do serviço
+            hora_fim = datetime.combine(data_agendamento, hora_agendamento) + servico.duracao
             
-            # Valida se a barbearia funciona no dia da semana
-            dia_semana = data_agendamento.weekday()
+            # Cria o agendamento validando conflitos de forma atômica
             try:
-                horario_funcionamento = HorarioFuncionamento.objects.get(
-                    dia_semana=dia_semana, 
-                    ativo=True
+                reservar(
+                    cliente_id,
+                    servico,
+                    data_agendamento,
+                    hora_agendamento,
+                    horario_funcionamento,
+                    observacoes,
+                    int(funcionario_id) if funcionario_id else None
                 )
-            except HorarioFuncionamento.DoesNotExist:
-                messages.error(request, 'A barbearia não funciona neste dia da semana.')
-                return render(request, self.template_name, self.get_context_data())
-            
-            # Valida se o horário está dentro do funcionamento
-            if hora_agendamento < horario_funcionamento.hora_inicio:
-                messages.error(request, 
-                    f'A barbearia abre às {horario_funcionamento.hora_inicio.strftime("%H:%M")}. '
-                    f'Escolha um horário a partir desta hora.')
+            except ConflitoHorario as conflito:
+                messages.error(request, mensagem_conflito(conflito, funcionario_id, hora_agendamento, hora_fim))
                 return render(request, self.template_name, self.get_context_data())
             
-            # Calcula o horário de fim do serviço
-            hora_inicio = datetime.combine(data_agendamento, hora_agendamento)
-            hora_fim = hora_inicio + servico.duracao
-            
-            # Valida se o serviço termina antes do fechamento
-            if hora_fim.time() > horario_funcionamento.hora_fim:
-                messages.error(request, 
-                    f'A barbearia fecha às {horario_funcionamento.hora_fim.strftime("%H:%M")}. '
-                    f'Escolha um horário que permita terminar o serviço antes do fechamento.')
-                return render(request, self.template_name, self.get_context_data())
-            
-            # Valida se não há conflito de horário considerando a duração
-            # Pega todos os agendamentos do dia
-            agendamentos_dia = Agendamento.objects.filter(data=data_agendamento).select_related('servico')
-            
-            # Verifica conflitos com cada agendamento existente
-            for agendamento in agendamentos_dia:
-                agendamento_inicio = datetime.combine(data_agendamento, agendamento.hora)
-                agendamento_fim = agendamento_inicio + agendamento.servico.duracao
-                
-                # Verifica se há sobreposição de horários
-                # Dois intervalos se sobrepõem se:
-                # - O início de um está antes do fim do outro E
-                # - O fim de um está depois do início do outro
-                if hora_inicio < agendamento_fim and hora_fim > agendamento_inicio:
-                    messages.error(request, 
-                        f'Este horário conflita com um agendamento existente:\n'
-                        f'• Horário ocupado: {agendamento.hora.strftime("%H:%M")} - {agendamento_fim.time().strftime("%H:%M")}\n'
-                        f'• Seu horário: {hora_agendamento.strftime("%H:%M")} - {hora_fim.time().strftime("%H:%M")}\n'
-                        f'Escolha outro horário.')
-                    return render(request, self.template_name, self.get_context_data())
-            
-            # Cria o agendamento
-            Agendamento.objects.create(
-                cliente_id=cliente_id,
-                servico_id=servico_id,
-                data=data_agendamento,
-                hora=hora_agendamento,
-                observacoes=observacoes
-            )
-            
             messages.success(request, 'Agendamento realizado com sucesso!')
             return redirect('my-agendamento')
             
@@ -143,88 +103,368 @@ class AgendaView(SessionLoginRequiredMixin, TemplateView):
         except Exception as e:
             messages.error(request, f'Erro ao processar agendamento: {str(e)}')
             return render(request, self.template_name, self.get_context_data())
+
+class PedidoInvalido(ValueError):
+    pass
+
+def validar_pedido(dados):
+    """
+    Valida serviço, data e horário de um pedido de agendamento (formulário da
+    agenda ou pré-reserva) e retorna (servico, data, hora, horario_funcionamento).
+    Levanta PedidoInvalido com a mensagem para o cliente.
+    """
+    servico_id = dados.get('servico')
+    data_str = dados.get('data')
+    hora_str = dados.get('horario')
+    
+    # Validações básicas
+    if not servico_id or not data_str or not hora_str:
+        raise PedidoInvalido('Todos os campos obrigatórios devem ser preenchidos.')
+    
+    # Converte data e hora
+    try:
+        data_agendamento = datetime.strptime(data_str, '%Y-%m-%d').date()
+        hora_agendamento = datetime.strptime(hora_str, '%H:%M').time()
+    except ValueError:
+        raise PedidoInvalido('Data ou horário inválidos.')
+    
+    # Valida se a data não é no passado
+    if data_agendamento < date.today():
+        raise PedidoInvalido('Não é possível agendar para datas passadas.')
+    
+    # Pega o serviço para obter a duração
+    try:
+        servico = catalogo().servico(servico_id)
+    except Servico.DoesNotExist:
+        raise PedidoInvalido('Serviço não encontrado.')
+    
+    # Valida se a barbearia funciona no dia da semana
+    horario_funcionamento = horario_do_dia(data_agendamento)
+    if horario_funcionamento is None:
+        raise PedidoInvalido('A barbearia não funciona neste dia da semana.')
+    
+    # Valida se o horário está dentro do funcionamento
+    if hora_agendamento < horario_funcionamento.hora_inicio:
+        raise PedidoInvalido(
+            f'A barbearia abre às {horario_funcionamento.hora_inicio.strftime("%H:%M")}. '
+            f'Escolha um horário a partir desta hora.')
+    
+    # Valida se o serviço termina antes do fechamento
+    hora_fim = datetime.combine(data_agendamento, hora_agendamento) + servico.duracao
+    if hora_fim.time() > horario_funcionamento.hora_fim:
+        raise PedidoInvalido(
+            f'A barbearia fecha às {horario_funcionamento.hora_fim.strftime("%H:%M")}. '
+            f'Escolha um horário que permita terminar o serviço antes do fechamento.')
+    
+    return servico, data_agendamento, hora_agendamento, horario_funcionamento
+
+def mensagem_conflito(conflito, funcionario_id, hora_agendamento, hora_fim):
+    """Mensagem para o cliente a partir de um ConflitoHorario"""
+    if conflito.agendamento is None:
+        if funcionario_id:
+            return 'O barbeiro escolhido não atende neste horário. Escolha outro horário ou barbeiro.'
+        return 'Nenhum barbeiro atende neste horário. Escolha outro horário.'
+    if conflito.pre_reserva:
+        return (
+            f'O horário {conflito.agendamento.hora.strftime("%H:%M")} - {para_hora(conflito.fim % 1440).strftime("%H:%M")} '
+            f'está reservado temporariamente por outro cliente. Escolha outro horário ou tente novamente em alguns minutos.')
+    return (
+        f'Este horário conflita com um agendamento existente:\n'
+        f'• Horário ocupado: {conflito.agendamento.hora.strftime("%H:%M")} - {para_hora(conflito.fim % 1440).strftime("%H:%M")}\n'
+        f'• Seu horário: {hora_agendamento.strftime("%H:%M")} - {hora_fim.time().strftime("%H:%M")}\n'
+        f'Escolha outro horário.')
+
+@require_http_methods(["POST", "DELETE"])
+def pre_reserva(request):
+    """
+    Segura (POST) ou libera (DELETE) o horário escolhido na agenda enquanto o
+    cliente preenche o formulário. POST recebe os mesmos campos do formulário
+    da agenda; a pré-reserva expira em settings.PRE_RESERVA_MINUTOS.
+    """
+    cliente_id = request.session.get('cliente_id')
+    if not cliente_id:
+        return JsonResponse({'error': 'Usuário não autenticado'}, status=401)
+    
+    if request.method == 'DELETE':
+        liberar(cliente_id)
+        return JsonResponse({'success': 'Pré-reserva liberada'})
+    
+    try:
+        servico, data_agendamento, hora_agendamento, horario_funcionamento = validar_pedido(request.POST)
+    except PedidoInvalido as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    funcionario_id = request.POST.get('funcionario') or None
+    try:
+        funcionario_id = int(funcionario_id) if funcionario_id else None
+        reserva = segurar(
+            cliente_id,
+            servico,
+            data_agendamento,
+            hora_agendamento,
+            horario_funcionamento,
+            funcionario_id
+        )
+    except ValueError:
+        return JsonResponse({'error': 'Barbeiro inválido'}, status=400)
+    except ConflitoHorario as conflito:
+        hora_fim = datetime.combine(data_agendamento, hora_agendamento) + servico.duracao
+        return JsonResponse(
+            {'error': mensagem_conflito(conflito, funcionario_id, hora_agendamento, hora_fim)},
+            status=409
+        )
+    
+    return JsonResponse({
+        'success': 'Horário reservado',
+        'data': reserva.data.strftime('%Y-%m-%d'),
+        'hora': reserva.hora.strftime('%H:%M'),
+        'funcionario_id': reserva.funcionario_id,
+        'expira_em': reserva.expira_em.isoformat(),
+    })
         
+def _parametros_disponibilidade(request):
+    """Valida os parâmetros da consulta de disponibilidade: (data, servico_id, funcionario_id)"""
+    funcionario_id = request.GET.get('funcionario_id') or None
+    return (
+        datetime.strptime(request.GET['data'], '%Y-%m-%d').date(),
+        int(request.GET['servico_id']),
+        int(funcionario_id) if funcionario_id else None,
+    )
+
 def horarios_disponiveis(request):
     """View para retornar horários disponíveis em uma data específica"""
     if request.method == 'GET':
-        data_str = request.GET.get('data')
-        servico_id = request.GET.get('servico_id')
-        
-        if not data_str or not servico_id:
+        if not request.GET.get('data') or not request.GET.get('servico_id'):
             return JsonResponse({'error': 'Data e serviço são obrigatórios'}, status=400)
         
         try:
-            data_agendamento = datetime.strptime(data_str, '%Y-%m-%d').date()
-            servico = Servico.objects.get(id=servico_id)
-            dia_semana = data_agendamento.weekday()
+            data_agendamento, servico_id, funcionario_id = _parametros_disponibilidade(request)
+            resultado = disponibilidade_em_cache(
+                data_agendamento,
+                f'servico:{servico_id}:funcionario:{funcionario_id}',
+                lambda: calcular_horarios_disponiveis(data_agendamento, servico_id, funcionario_id)
+            )
+            return JsonResponse(resultado)
             
-            # Verifica se a barbearia funciona neste dia
-            try:
-                horario_funcionamento = HorarioFuncionamento.objects.get(
-                    dia_semana=dia_semana, 
-                    ativo=True
-                )
-            except HorarioFuncionamento.DoesNotExist:
-                return JsonResponse({
-                    'error': 'A barbearia não funciona neste dia da semana.',
-                    'horarios_disponiveis': []
-                })
+        except (ValueError, Servico.DoesNotExist) as e:
+            return JsonResponse({'error': str(e)}, status=400)
+    
+    return JsonResponse({'error': 'Método não permitido'}, status=405)
+
+async def ahorarios_disponiveis(request):
+    """Versão assíncrona (ASGI) de horarios_disponiveis"""
+    if request.method == 'GET':
+        if not request.GET.get('data') or not request.GET.get('servico_id'):
+            return JsonResponse({'error': 'Data e serviço são obrigatórios'}, status=400)
+        
+        try:
+            data_agendamento, servico_id, funcionario_id = _parametros_disponibilidade(request)
+            resultado = await adisponibilidade_em_cache(
+                data_agendamento,
+                f'servico:{servico_id}:funcionario:{funcionario_id}',
+                lambda: acalcular_horarios_disponiveis(data_agendamento, servico_id, funcionario_id)
+            )
+            return JsonResponse(resultado)
             
-            # Horários ocupados no dia
-            agendamentos_dia = Agendamento.objects.filter(data=data_agendamento).select_related('servico')
+        except (ValueError, Servico.DoesNotExist) as e:
+            return JsonResponse({'error': str(e)}, status=400)
+    
+    return JsonResponse({'error': 'Método não permitido'}, status=405)
+
+# Intervalo (s) entre comentários de keep-alive e duração máxima de uma conexão SSE;
+# ao fim o navegador reconecta sozinho, liberando o worker de tempos em tempos
+SSE_KEEPALIVE = 15
+SSE_DURACAO_MAXIMA = 5 * 60
+SSE_RECONEXAO_MS = 3000
+
+def _evento_horarios(resultado):
+    return f'event: horarios\ndata: {json.dumps(resultado, cls=DjangoJSONEncoder)}\n\n'
+
+def _stream_horarios(assinatura, resultado, calcular):
+    """Envia a disponibilidade atual e a reenvia a cada alteração publicada para a data"""
+    try:
+        yield f'retry: {SSE_RECONEXAO_MS}\n\n'
+        fim = _time.monotonic() + SSE_DURACAO_MAXIMA
+        while True:
+            yield _evento_horarios(resultado)
+            while True:
+                restante = fim - _time.monotonic()
+                if restante <= 0:
+                    return
+                try:
+                    assinatura.receber(timeout=min(SSE_KEEPALIVE, restante))
+                    break
+                except queue.Empty:
+                    yield ': keep-alive\n\n'
+            # Várias alterações seguidas geram um único recálculo
+            assinatura.descartar_pendentes()
+            resultado = calcular()
+    finally:
+        assinatura.cancelar()
+
+async def _astream_horarios(assinatura, resultado, acalcular):
+    """Versão assíncrona de _stream_horarios()"""
+    try:
+        yield f'retry: {SSE_RECONEXAO_MS}\n\n'
+        fim = _time.monotonic() + SSE_DURACAO_MAXIMA
+        while True:
+            yield _evento_horarios(resultado)
+            while True:
+                restante = fim - _time.monotonic()
+                if restante <= 0:
+                    return
+                try:
+                    await assinatura.receber(timeout=min(SSE_KEEPALIVE, restante))
+                    break
+                except asyncio.TimeoutError:
+                    yield ': keep-alive\n\n'
+            assinatura.descartar_pendentes()
+            resultado = await acalcular()
+    finally:
+        assinatura.cancelar()
+
+def _resposta_sse(conteudo):
+    resposta = StreamingHttpResponse(conteudo, content_type='text/event-stream')
+    resposta['Cache-Control'] = 'no-cache'
+    # Impede que proxies (ex.: nginx) segurem os eventos em buffer
+    resposta['X-Accel-Buffering'] = 'no'
+    return resposta
+
+def horarios_disponiveis_stream(request):
+    """
+    Stream (Server-Sent Events) da disponibilidade de um serviço em uma data.
+
+    Envia um evento `horarios`, no mesmo formato de horarios_disponiveis, ao
+    conectar e a cada agendamento criado, alterado ou removido na data. Só
+    atende com SSE_ATIVO; sem ele, a agenda consulta horarios_disponiveis.
+    """
+    if not settings.SSE_ATIVO:
+        return JsonResponse({'error': 'Atualização em tempo real indisponível'}, status=404)
+    if request.method != 'GET':
+        return JsonResponse({'error': 'Método não permitido'}, status=405)
+    if not request.GET.get('data') or not request.GET.get('servico_id'):
+        return JsonResponse({'error': 'Data e serviço são obrigatórios'}, status=400)
+    
+    try:
+        data_agendamento, servico_id, funcionario_id = _parametros_disponibilidade(request)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    def calcular():
+        return disponibilidade_em_cache(
+            data_agendamento,
+            f'servico:{servico_id}:funcionario:{funcionario_id}',
+            lambda: calcular_horarios_disponiveis(data_agendamento, servico_id, funcionario_id)
+        )
+    
+    # Assina antes do primeiro cálculo para não perder alterações feitas entre os dois
+    assinatura = broker().assinar(topico_disponibilidade(data_agendamento))
+    try:
+        resultado = calcular()
+    except Servico.DoesNotExist as e:
+        assinatura.cancelar()
+        return JsonResponse({'error': str(e)}, status=400)
+    return _resposta_sse(_stream_horarios(assinatura, resultado, calcular))
+
+async def ahorarios_disponiveis_stream(request):
+    """Versão assíncrona (ASGI) de horarios_disponiveis_stream"""
+    if not settings.SSE_ATIVO:
+        return JsonResponse({'error': 'Atualização em tempo real indisponível'}, status=404)
+    if request.method != 'GET':
+        return JsonResponse({'error': 'Método não permitido'}, status=405)
+    if not request.GET.get('data') or not request.GET.get('servico_id'):
+        return JsonResponse({'error': 'Data e serviço são obrigatórios'}, status=400)
+    
+    try:
+        data_agendamento, servico_id, funcionario_id = _parametros_disponibilidade(request)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    async def acalcular():
+        return await adisponibilidade_em_cache(
+            data_agendamento,
+            f'servico:{servico_id}:funcionario:{funcionario_id}',
+            lambda: acalcular_horarios_disponiveis(data_agendamento, servico_id, funcionario_id)
+        )
+    
+    assinatura = broker().aassinar(topico_disponibilidade(data_agendamento))
+    try:
+        resultado = await acalcular()
+    except Servico.DoesNotExist as e:
+        assinatura.cancelar()
+        return JsonResponse({'error': str(e)}, status=400)
+    return _resposta_sse(_astream_horarios(assinatura, resultado, acalcular))
+
+# Limite de dias por consulta de período, para não varrer a tabela inteira
+MAX_DIAS_PERIODO = 62
+
+def horarios_disponiveis_periodo(request):
+    """View para retornar os horários disponíveis de cada dia de um período"""
+    if request.method == 'GET':
+        inicio_str = request.GET.get('inicio')
+        fim_str = request.GET.get('fim')
+        servico_id = request.GET.get('servico_id')
+        funcionario_id = request.GET.get('funcionario_id') or None
+        
+        if not inicio_str or not fim_str or not servico_id:
+            return JsonResponse({'error': 'Início, fim e serviço são obrigatórios'}, status=400)
+        
+        try:
+            data_inicio = datetime.strptime(inicio_str, '%Y-%m-%d').date()
+            data_fim = datetime.strptime(fim_str, '%Y-%m-%d').date()
             
-            # Lista de horários ocupados com suas durações
-            horarios_ocupados = []
-            for agendamento in agendamentos_dia:
-                inicio = datetime.combine(data_agendamento, agendamento.hora)
-                fim = inicio + agendamento.servico.duracao
-                horarios_ocupados.append({
-                    'inicio': agendamento.hora.strftime('%H:%M'),
-                    'fim': fim.time().strftime('%H:%M'),
-                    'duracao': str(agendamento.servico.duracao),
-                    'servico': agendamento.servico.nome
-                })
+            if data_fim < data_inicio:
+                return JsonResponse({'error': 'A data final deve ser posterior à inicial'}, status=400)
+            if (data_fim - data_inicio).days >= MAX_DIAS_PERIODO:
+                return JsonResponse({'error': f'O período deve ter no máximo {MAX_DIAS_PERIODO} dias'}, status=400)
             
-            # Gera horários disponíveis dentro do funcionamento
-            horarios_disponiveis = []
-            inicio = horario_funcionamento.hora_inicio
-            fim = horario_funcionamento.hora_fim
+            cadastro = catalogo()
+            servico = cadastro.servico(servico_id)
+            funcionario_id = int(funcionario_id) if funcionario_id else None
             
-            # Converte para minutos para facilitar cálculos
-            inicio_minutos = inicio.hour * 60 + inicio.minute
-            fim_minutos = fim.hour * 60 + fim.minute
-            duracao_minutos = int(servico.duracao.total_seconds() / 60)
+            # Horários e barbeiros vêm do catálogo em memória; uma consulta para os agendamentos do período
+            horarios_semana = cadastro.horarios_ativos()
+            barbeiros = cadastro.barbeiros_ids()
+            horarios_barbeiros = cadastro.horarios_barbeiros
+            agendamentos_por_data = defaultdict(list)
+            agendamentos_periodo = Agendamento.objects.filter(
+                data__range=(data_inicio, data_fim)
+            ).select_related('servico')
+            for agendamento in agendamentos_periodo:
+                agendamentos_por_data[agendamento.data].append(agendamento)
+            for reserva in pre_reservas_ativas().filter(data__range=(data_inicio, data_fim)):
+                agendamentos_por_data[reserva.data].append(reserva)
             
-            # Gera horários de 30 em 30 minutos
-            for minutos in range(inicio_minutos, fim_minutos, 30):
-                # Verifica se o serviço cabe no horário
-                if minutos + duracao_minutos <= fim_minutos:
-                    # Verifica se não conflita com agendamentos existentes
-                    conflito = False
-                    for agendamento in agendamentos_dia:
-                        agendamento_inicio = agendamento.hora.hour * 60 + agendamento.hora.minute
-                        agendamento_fim = agendamento_inicio + int(agendamento.servico.duracao.total_seconds() / 60)
-                        
-                        # Verifica sobreposição
-                        if minutos < agendamento_fim and minutos + duracao_minutos > agendamento_inicio:
-                            conflito = True
-                            break
-                    
-                    if not conflito:
-                        hora = time(minutos // 60, minutos % 60)
-                        horarios_disponiveis.append({
+            dias = []
+            data_atual = data_inicio
+            while data_atual <= data_fim:
+                horario_funcionamento = horarios_semana.get(data_atual.weekday())
+                horarios = []
+                if horario_funcionamento:
+                    ocupacao = OcupacaoCadeiras.montar(
+                        horario_funcionamento,
+                        agendamentos_por_data[data_atual],
+                        barbeiros,
+                        horarios_barbeiros[data_atual.weekday()]
+                    )
+                    for minutos in livres(ocupacao, horario_funcionamento, servico, funcionario_id):
+                        hora = para_hora(minutos)
+                        horarios.append({
                             'hora': hora.strftime('%H:%M'),
                             'display': hora.strftime('%H:%M')
                         })
+                
+                dias.append({
+                    'data': data_atual.strftime('%Y-%m-%d'),
+                    'funciona': horario_funcionamento is not None,
+                    'total_disponiveis': len(horarios),
+                    'horarios_disponiveis': horarios,
+                })
+                data_atual += timedelta(days=1)
             
             return JsonResponse({
-                'horarios_ocupados': horarios_ocupados,
-                'horarios_disponiveis': horarios_disponiveis,
                 'duracao_servico': str(servico.duracao),
-                'horario_funcionamento': {
-                    'inicio': horario_funcionamento.hora_inicio.strftime('%H:%M'),
-                    'fim': horario_funcionamento.hora_fim.strftime('%H:%M')
-                }
+                'dias': dias
             })
             
         except (ValueError, Servico.DoesNotExist) as e:
@@ -238,36 +478,54 @@ class MeusAgendamentosView(View):
         if not cliente_id:
             return redirect("login")  # se não tiver logado, redireciona
 
-        cliente = Cliente.objects.get(id=cliente_id)
-        agendamentos = Agendamento.objects.filter(cliente=cliente)
+        agendamentos = Agendamento.objects.filter(cliente_id=cliente_id).select_related('servico', 'funcionario').order_by('data', 'hora')
 
         return render(request, "my-agendamento.html", {"agendamentos": agendamentos})
 
 @require_http_methods(["POST"])
 def deletar_agendamento(request, agendamento_id):
     """View para deletar um agendamento específico"""
-    print(f"Tentando deletar agendamento ID: {agendamento_id}")
-    
     cliente_id = request.session.get("cliente_id")
-    print(f"Cliente ID da sessão: {cliente_id}")
     
     if not cliente_id:
-        print("Erro: Usuário não autenticado")
+        logger.info('Exclusão do agendamento %s sem cliente na sessão', agendamento_id)
         return JsonResponse({'error': 'Usuário não autenticado'}, status=401)
     
     try:
         # Busca o agendamento e verifica se pertence ao cliente logado
         agendamento = Agendamento.objects.get(id=agendamento_id, cliente_id=cliente_id)
-        print(f"Agendamento encontrado: {agendamento}")
-        
         agendamento.delete()
-        print("Agendamento deletado com sucesso")
+        logger.info('Agendamento %s excluído pelo cliente %s', agendamento_id, cliente_id)
+        
+        return JsonResponse({'success': 'Agendamento deletado com sucesso'}, status=200)
+        
+    except Agendamento.DoesNotExist:
+        logger.warning('Agendamento %s não encontrado para o cliente %s', agendamento_id, cliente_id)
+        return JsonResponse({'error': 'Agendamento não encontrado'}, status=404)
+    except Exception as e:
+        logger.exception('Erro ao excluir o agendamento %s', agendamento_id)
+        return JsonResponse({'error': f'Erro ao deletar agendamento: {str(e)}'}, status=500)
+
+@require_http_methods(["POST"])
+async def adeletar_agendamento(request, agendamento_id):
+    """Versão assíncrona (ASGI) de deletar_agendamento"""
+    cliente_id = await request.session.aget("cliente_id")
+    
+    if not cliente_id:
+        logger.info('Exclusão do agendamento %s sem cliente na sessão', agendamento_id)
+        return JsonResponse({'error': 'Usuário não autenticado'}, status=401)
+    
+    try:
+        # Busca o agendamento e verifica se pertence ao cliente logado
+        agendamento = await Agendamento.objects.aget(id=agendamento_id, cliente_id=cliente_id)
+        await agendamento.adelete()
+        logger.info('Agendamento %s excluído pelo cliente %s', agendamento_id, cliente_id)
         
         return JsonResponse({'success': 'Agendamento deletado com sucesso'}, status=200)
         
     except Agendamento.DoesNotExist:
-        print(f"Erro: Agendamento {agendamento_id} não encontrado para cliente {cliente_id}")
+        logger.warning('Agendamento %s não encontrado para o cliente %s', agendamento_id, cliente_id)
         return JsonResponse({'error': 'Agendamento não encontrado'}, status=404)
     except Exception as e:
-        print(f"Erro inesperado: {str(e)}")
-        return JsonResponse({'error': f'Erro ao deletar agendamento: {str(e)}'}, status=500)
\ No newline at end of file
+        logger.exception('Erro ao excluir o agendamento %s', agendamento_id)
+        return JsonResponse({'error': f'Erro ao deletar agendamento: {str(e)}'}, status=500)
@@ -0,0 +1,98 @@
+import re
+
+from django.conf import settings
+from django.contrib.auth.hashers import ScryptPasswordHasher, check_password, make_password
+from django.db.models import Q
+
+
+def normalizar_email(valor):
+    """Emails são gravados e comparados em minúsculas, sem espaços nas pontas"""
+    return (valor or '').strip().lower() or None
+
+
+def normalizar_telefone(valor):
+    """Só os dígitos: '(11) 99999-0000' e '11999990000' são o mesmo telefone"""
+    return re.sub(r'\D', '', valor or '')
+
+
+def normalizar_contas(modelo):
+    """
+    Preenche telefone_normalizado e passa os emails para minúsculas em todas
+    as contas de `modelo` (usado pelas migrações). Contas cujos emails só
+    diferem na caixa não têm como ser juntadas aqui: nesse caso nada é gravado
+    e o erro lista as linhas em conflito para serem resolvidas à mão.
+    """
+    grupos = {}
+    for pk, email in modelo.objects.exclude(email=None).order_by('pk').values_list('pk', 'email'):
+        grupos.setdefault(normalizar_email(email), []).append((pk, email))
+    conflitos = [linhas for linhas in grupos.values() if len(linhas) > 1]
+    if conflitos:
+        detalhes = '; '.join(', '.join(f'pk={pk} email={email!r}' for pk, email in linhas)
+                             for linhas in conflitos)
+        raise RuntimeError(
+            f'{modelo._meta.label}: emails que só diferem na caixa, resolva antes de migrar: {detalhes}'
+        )
+
+    for conta in modelo.objects.only('pk', 'email', 'telefone').iterator():
+        modelo.objects.filter(pk=conta.pk).update(
+            email=normalizar_email(conta.email),
+            telefone_normalizado=normalizar_telefone(conta.telefone),
+        )
+
+
+class ScryptConfiguravel(ScryptPasswordHasher):
+    """
+    scrypt (hashlib) com os parâmetros de SENHA_SCRYPT_*. Mudar os parâmetros
+    não invalida nada: o hash é regravado no próximo login de cada conta.
+    """
+    work_factor = settings.SENHA_SCRYPT_N
+    block_size = settings.SENHA_SCRYPT_R
+    parallelism = settings.SENHA_SCRYPT_P
+
+
+def consulta_de_login(modelo, usuario):
+    """
+    Consulta única pelas colunas normalizadas e indexadas que o login faz para
+    achar a conta de `usuario` (email ou telefone); None se não houver o que buscar.
+    """
+    email = normalizar_email(usuario)
+    telefone = normalizar_telefone(usuario)
+    filtro = Q()
+    if email:
+        filtro |= Q(email=email)
+    if telefone:
+        filtro |= Q(telefone_normalizado=telefone)
+    if not filtro:
+        return None
+    return modelo.objects.filter(filtro).order_by('pk')[:2]
+
+
+def buscar_conta(modelo, usuario):
+    """
+    Conta (Cliente ou Funcionario) pelo email ou telefone digitado no login, em
+    uma única consulta. Se o texto casar com o email de uma conta e o telefone
+    de outra, vale o email.
+    """
+    consulta = consulta_de_login(modelo, usuario)
+    if consulta is None:
+        return None
+
+    email = normalizar_email(usuario)
+    contas = list(consulta)
+    for conta in contas:
+        if conta.email == email:
+            return conta
+    return contas[0] if contas else None
+
+
+def verificar_senha(conta, senha):
+    """
+    Confere a senha e, se o hash foi gerado com outro algoritmo ou parâmetros
+    (ex.: após trocar SENHA_HASHER), grava o hash novo sem o usuário perceber.
+    """
+    def regravar(senha_nova):
+        conta.senha = make_password(senha_nova)
+        # update() não dispara os sinais de save: só a senha mudou
+        type(conta).objects.filter(pk=conta.pk).update(senha=conta.senha)
+
+    return check_password(senha, conta.senha, setter=regravar)
@@ -0,0 +1,111 @@
+import random
+import statistics
+import time as _time
+
+from django.contrib.auth.hashers import check_password, get_hasher, make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from clientes.autenticacao import buscar_conta, normalizar_telefone
+from clientes.models import Cliente
+
+SENHA = 'benchmark-senha'
+ALGORITMOS = {'pbkdf2': 'pbkdf2_sha256', 'scrypt': 'scrypt', 'argon2': 'argon2'}
+
+
+class Desfazer(Exception):
+    pass
+
+
+def telefone(i):
+    return f'(11) 9{i:04d}-{i % 10_000:04d}'
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede logins por segundo em um núcleo: a busca da conta (duas consultas '
+        'antigas x uma consulta nas colunas normalizadas) e a conferência da senha '
+        'em cada algoritmo. As contas fictícias são criadas em uma transação desfeita no fim.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--contas', type=int, default=10_000,
+                            help='Clientes fictícios no banco durante a medição (padrão: 10.000)')
+        parser.add_argument('--logins', type=int, default=50,
+                            help='Logins medidos em cada algoritmo (padrão: 50)')
+        parser.add_argument('--algoritmo', choices=sorted(ALGORITMOS), action='append',
+                            help='Mede só este algoritmo (pode repetir). Padrão: todos os disponíveis')
+        parser.add_argument('--semente', type=int, default=42)
+
+    def handle(self, *args, **options):
+        if options['contas'] < 1 or options['logins'] < 1:
+            raise CommandError('--contas e --logins devem ser positivos')
+        try:
+            with transaction.atomic():
+                self.medir(options)
+                raise Desfazer
+        except Desfazer:
+            pass
+
+    def medir(self, options):
+        aleatorio = random.Random(options['semente'])
+        Cliente.objects.bulk_create([
+            Cliente(
+                nome=f'Benchmark {i}',
+                email=f'benchmark{i}@exemplo.com',
+                telefone=telefone(i),
+                telefone_normalizado=normalizar_telefone(telefone(i)),
+                senha='!'
+            )
+            for i in range(options['contas'])
+        ], batch_size=1000)
+        amostra = [aleatorio.randrange(options['contas']) for _ in range(options['logins'])]
+        # Metade dos logins por email, metade pelo telefone como foi cadastrado
+        usuarios = [
+            f'benchmark{i}@exemplo.com' if n % 2 == 0 else telefone(i)
+            for n, i in enumerate(amostra)
+        ]
+
+        buscas = {
+            'duas consultas': lambda usuario: (
+                Cliente.objects.filter(email=usuario).first() or Cliente.objects.filter(telefone=usuario).first()
+            ),
+            'consulta única': lambda usuario: buscar_conta(Cliente, usuario),
+        }
+        tempos_busca = {}
+        for nome, buscar in buscas.items():
+            tempos = []
+            for usuario in usuarios:
+                comeco = _time.perf_counter()
+                if buscar(usuario) is None:
+                    raise CommandError(f'{nome}: {usuario} não encontrado')
+                tempos.append((_time.perf_counter() - comeco) * 1000)
+            tempos_busca[nome] = statistics.median(tempos)
+
+        self.stdout.write(self.style.MIGRATE_HEADING(f'Busca da conta entre {options["contas"]} clientes (mediana)'))
+        for nome, mediana in tempos_busca.items():
+            self.stdout.write(f'  {nome:<16} {mediana:>8.3f} ms')
+
+        self.stdout.write(self.style.MIGRATE_HEADING('Conferência da senha (mediana) e logins/s por núcleo'))
+        busca = tempos_busca['consulta única']
+        for nome in options['algoritmo'] or sorted(ALGORITMOS):
+            try:
+                encoded = make_password(SENHA, hasher=ALGORITMOS[nome])
+            except ValueError as erro:
+                self.stdout.write(f'  {nome:<16} indisponível ({erro})')
+                continue
+            tempos = []
+            for _ in range(options['logins']):
+                comeco = _time.perf_counter()
+                if not check_password(SENHA, encoded):
+                    raise CommandError(f'{nome}: senha recusada')
+                tempos.append((_time.perf_counter() - comeco) * 1000)
+            mediana = statistics.median(tempos)
+            parametros = get_hasher(ALGORITMOS[nome]).safe_summary(encoded)
+            parametros = ', '.join(
+                f'{chave}={valor}' for chave, valor in parametros.items()
+                if chave not in ('algorithm', 'salt', 'hash')
+            )
+            self.stdout.write(
+                f'  {nome:<16} {mediana:>8.2f} ms  {1000 / (mediana + busca):>8.1f} logins/s  ({parametros})'
+            )
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 15:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clientes', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='cliente',
+            name='telefone',
+            field=models.CharField(db_index=True, max_length=20),
+        ),
+    ]
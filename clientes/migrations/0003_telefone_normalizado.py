@@ -0,0 +1,25 @@
+# Generated by Django 5.2.6 on 2026-10-18 19:40
+
+from django.db import migrations, models
+
+from clientes.autenticacao import normalizar_contas
+
+
+def normalizar(apps, schema_editor):
+    normalizar_contas(apps.get_model('clientes', 'Cliente'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clientes', '0002_cliente_telefone_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cliente',
+            name='telefone_normalizado',
+            field=models.CharField(blank=True, db_index=True, editable=False, help_text='Só os dígitos do telefone, usado no login', max_length=20),
+        ),
+        migrations.RunPython(normalizar, migrations.RunPython.noop),
+    ]
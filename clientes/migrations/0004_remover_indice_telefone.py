@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-18 23:10
+
+from django.db import migrations, models
+
+
+# O login busca por telefone_normalizado; o índice em telefone só pesava nas escritas
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clientes', '0003_telefone_normalizado'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='cliente',
+            name='telefone',
+            field=models.CharField(max_length=20),
+        ),
+    ]
@@ -1,12 +1,23 @@
 from django.db import models
 
+from clientes.autenticacao import normalizar_email, normalizar_telefone
+
 # Create your models here.
 class Cliente(models.Model):
     nome = models.CharField(max_length=100)
     telefone = models.CharField(max_length=20)
+    telefone_normalizado = models.CharField(
+        max_length=20, blank=True, db_index=True, editable=False,
+        help_text="Só os dígitos do telefone, usado no login"
+    )
     email = models.EmailField(unique=True, blank=True, null=True)
     data_cadastro = models.DateTimeField(auto_now_add=True)
     senha = models.CharField(max_length=255)
 
+    def save(self, *args, **kwargs):
+        self.email = normalizar_email(self.email)
+        self.telefone_normalizado = normalizar_telefone(self.telefone)
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return self.nome
\ No newline at end of file
@@ -1,3 +1,115 @@
-from django.test import TestCase
+from django.contrib.auth.hashers import identify_hasher, make_password
+from django.test import TestCase, override_settings
+from django.urls import reverse
 
-# Create your tests here.
+from clientes.autenticacao import buscar_conta, normalizar_contas, verificar_senha
+from clientes.models import Cliente
+from funcionarios.models import Funcionario
+
+PBKDF2 = 'django.contrib.auth.hashers.PBKDF2PasswordHasher'
+SCRYPT = 'clientes.autenticacao.ScryptConfiguravel'
+
+
+class BuscarContaTests(TestCase):
+    """Login por email ou telefone em qualquer formato, com uma única consulta"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cliente = Cliente.objects.create(
+            nome='Cliente', email=' Cliente@Exemplo.com ', telefone='(11) 99999-0000', senha='!'
+        )
+
+    def test_colunas_normalizadas_ao_salvar(self):
+        self.cliente.refresh_from_db()
+        self.assertEqual(self.cliente.email, 'cliente@exemplo.com')
+        self.assertEqual(self.cliente.telefone_normalizado, '11999990000')
+
+    def test_email_e_telefone_em_qualquer_formato(self):
+        for usuario in ('CLIENTE@exemplo.com', '11999990000', '11 99999 0000', '(11)99999-0000'):
+            with self.subTest(usuario=usuario), self.assertNumQueries(1):
+                self.assertEqual(buscar_conta(Cliente, usuario), self.cliente)
+
+    def test_email_vale_mais_que_telefone_de_outra_conta(self):
+        # Texto que é ao mesmo tempo o email de uma conta e o telefone de outra
+        Cliente.objects.create(nome='Telefone', email='telefone@exemplo.com', telefone='11988', senha='!')
+        dono = Cliente.objects.create(nome='Email', email='11988@exemplo.com', telefone='11977', senha='!')
+        self.assertEqual(buscar_conta(Cliente, '11988@exemplo.com'), dono)
+
+    def test_usuario_vazio_nao_consulta(self):
+        with self.assertNumQueries(0):
+            self.assertIsNone(buscar_conta(Cliente, '  '))
+        self.assertIsNone(buscar_conta(Cliente, 'ninguem@exemplo.com'))
+
+    def test_funcionario(self):
+        funcionario = Funcionario.objects.create(nome='Barbeiro', email='barbeiro@exemplo.com',
+                                                 telefone='(11) 98888-0000', senha='!')
+        self.assertEqual(buscar_conta(Funcionario, '11988880000'), funcionario)
+
+
+class NormalizarContasTests(TestCase):
+    """Migração que normaliza as contas gravadas antes de save() normalizar"""
+
+    def criar_sem_normalizar(self, email, telefone):
+        conta = Cliente.objects.create(nome='Cliente', telefone='0', senha='!')
+        Cliente.objects.filter(pk=conta.pk).update(email=email, telefone=telefone, telefone_normalizado='')
+        return conta
+
+    def test_normaliza_email_e_telefone(self):
+        conta = self.criar_sem_normalizar(' Cliente@Exemplo.com', '(11) 99999-0000')
+        normalizar_contas(Cliente)
+        conta.refresh_from_db()
+        self.assertEqual(conta.email, 'cliente@exemplo.com')
+        self.assertEqual(conta.telefone_normalizado, '11999990000')
+
+    def test_emails_que_so_diferem_na_caixa_param_a_migracao(self):
+        primeira = self.criar_sem_normalizar('A@x.com', '(11) 1')
+        segunda = self.criar_sem_normalizar('a@x.com', '(11) 2')
+        outra = self.criar_sem_normalizar('Outra@x.com', '(11) 3')
+        with self.assertRaisesMessage(RuntimeError, f"pk={primeira.pk} email='A@x.com', pk={segunda.pk} email='a@x.com'"):
+            normalizar_contas(Cliente)
+        # Nada é gravado pela metade
+        outra.refresh_from_db()
+        self.assertEqual((outra.email, outra.telefone_normalizado), ('Outra@x.com', ''))
+
+
+@override_settings(LIMITES_ATIVOS=False)
+class RegravarSenhaTests(TestCase):
+    """Hash antigo continua valendo e é regravado com o algoritmo atual no login"""
+
+    def setUp(self):
+        with self.settings(PASSWORD_HASHERS=[PBKDF2]):
+            senha = make_password('segredo123')
+        self.cliente = Cliente.objects.create(nome='Cliente', email='cliente@exemplo.com',
+                                              telefone='(11) 99999-0000', senha=senha)
+
+    @override_settings(PASSWORD_HASHERS=[SCRYPT, PBKDF2])
+    def test_login_regrava_o_hash_com_scrypt(self):
+        self.assertTrue(verificar_senha(self.cliente, 'segredo123'))
+        self.cliente.refresh_from_db()
+        self.assertEqual(identify_hasher(self.cliente.senha).algorithm, 'scrypt')
+        # O hash novo continua valendo
+        self.assertTrue(verificar_senha(self.cliente, 'segredo123'))
+
+    @override_settings(PASSWORD_HASHERS=[SCRYPT, PBKDF2])
+    def test_senha_errada_nao_regrava(self):
+        anterior = self.cliente.senha
+        self.assertFalse(verificar_senha(self.cliente, 'errada'))
+        self.cliente.refresh_from_db()
+        self.assertEqual(self.cliente.senha, anterior)
+
+    @override_settings(PASSWORD_HASHERS=[PBKDF2, SCRYPT])
+    def test_hash_atual_nao_e_regravado(self):
+        with self.assertNumQueries(0):
+            self.assertTrue(verificar_senha(self.cliente, 'segredo123'))
+
+    @override_settings(PASSWORD_HASHERS=[SCRYPT, PBKDF2])
+    def test_login_pela_view(self):
+        resposta = self.client.post(reverse('login'), {'usuario': '11 99999-0000', 'senha': 'segredo123'})
+        self.assertEqual(resposta.status_code, 302)
+        self.assertEqual(self.client.session['cliente_id'], self.cliente.id)
+        self.cliente.refresh_from_db()
+        self.assertTrue(self.cliente.senha.startswith('scrypt$'))
+
+        self.client.logout()
+        resposta = self.client.post(reverse('login'), {'usuario': 'cliente@exemplo.com', 'senha': 'errada'})
+        self.assertContains(resposta, 'Senha incorreta')
@@ -3,9 +3,9 @@ from django.shortcuts import render, redirect
 from django.views import View
 from django.views.generic import CreateView
 from django.contrib.auth.hashers import make_password
-from django.contrib.auth.hashers import check_password
 from django.views.decorators.csrf import csrf_protect
 from django.utils.decorators import method_decorator
+from clientes.autenticacao import buscar_conta, normalizar_email, verificar_senha
 from clientes.models import Cliente
 
 # Create your views here.
@@ -18,10 +18,10 @@ class LoginView(View):
         senha = request.POST.get("senha")
 
         # Busca pelo email ou telefone
-        cliente = Cliente.objects.filter(email=usuario).first() or Cliente.objects.filter(telefone=usuario).first()
+        cliente = buscar_conta(Cliente, usuario)
 
         if cliente:
-            if check_password(senha, cliente.senha):
+            if verificar_senha(cliente, senha):
                 # Salva id e nome na sessão
                 request.session["cliente_id"] = cliente.id
                 request.session["cliente_nome"] = cliente.nome
@@ -69,7 +69,7 @@ class CadastroView(CreateView):
             erros.append("Senhas não coincidem")
         
         # Verifica se email já existe
-        if Cliente.objects.filter(email=email).exists():
+        if Cliente.objects.filter(email=normalizar_email(email)).exists():
             erros.append("Email já cadastrado")
         
         if erros:
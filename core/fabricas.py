@@ -0,0 +1,157 @@
+import random
+import time as _time
+from contextlib import contextmanager
+from datetime import date, time, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.cache import caches
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from agendamento import catalogo, resumo
+from agendamento.availability import para_hora, para_minutos
+from agendamento.models import Agendamento
+from clientes.autenticacao import normalizar_telefone
+from clientes.models import Cliente
+from funcionarios.models import Funcionario, HorarioFuncionamento
+from servicos.models import Planos, Servico
+
+SENHA = 'senha-dos-testes'
+ABERTURA = time(8)
+FECHAMENTO = time(20)
+
+
+class Cenario:
+    """Objetos principais de uma barbearia populada por popular()"""
+
+    def __init__(self, cliente, funcionario, barbeiros, servicos, hoje):
+        self.cliente = cliente
+        self.funcionario = funcionario
+        self.barbeiros = barbeiros
+        self.servicos = servicos
+        self.hoje = hoje
+
+
+def telefone(i):
+    return f'(11) 9{i:04d}-{i % 10_000:04d}'
+
+
+def criar_cliente(i, senha):
+    return Cliente(
+        nome=f'Cliente {i}',
+        email=f'cliente{i}@exemplo.com',
+        telefone=telefone(i),
+        telefone_normalizado=normalizar_telefone(telefone(i)),
+        senha=senha
+    )
+
+
+def popular(clientes=300, barbeiros=4, dias=60, agendamentos_do_cliente=40, semente=42, hoje=None):
+    """
+    Barbearia com volume de uso real, gravada com bulk_create: horário de
+    segunda a sábado, barbeiros com a agenda cheia em metade dos dias (antes e
+    depois de hoje), centenas de clientes, planos e o resumo diário reconstruído.
+    O primeiro cliente tem `agendamentos_do_cliente` agendamentos.
+    """
+    aleatorio = random.Random(semente)
+    hoje = hoje or date.today()
+    senha = make_password(SENHA)
+
+    HorarioFuncionamento.objects.bulk_create([
+        HorarioFuncionamento(dia_semana=dia, hora_inicio=ABERTURA, hora_fim=FECHAMENTO, ativo=dia != 6)
+        for dia in range(7)
+    ])
+    Servico.objects.bulk_create([
+        Servico(
+            nome=nome, descricao=f'{nome} completo', duracao=timedelta(minutes=minutos),
+            preco=preco, folga_minutos=folga
+        )
+        for nome, minutos, preco, folga in [
+            ('Corte', 30, 40, 0), ('Barba', 20, 25, 5), ('Corte e barba', 50, 60, 10),
+            ('Pigmentação', 45, 50, 0), ('Sobrancelha', 15, 15, 0), ('Hidratação', 30, 35, 5),
+        ]
+    ])
+    Planos.objects.bulk_create([
+        Planos(nome=f'Plano {i}', descricao='Cortes ilimitados no mês', preco=90 + 30 * i) for i in range(3)
+    ])
+    Funcionario.objects.bulk_create([
+        Funcionario(nome=f'Barbeiro {i}', email=f'barbeiro{i}@exemplo.com', senha=senha, status=True, atende=True)
+        for i in range(barbeiros)
+    ])
+    funcionario = Funcionario.objects.create(
+        nome='Recepção', email='recepcao@exemplo.com', telefone='(11) 90000-0000', senha=senha, status=True
+    )
+    Cliente.objects.bulk_create([criar_cliente(i, senha) for i in range(clientes)])
+    # Relidos do banco: o MySQL não devolve as chaves geradas pelo bulk_create
+    servicos = list(Servico.objects.order_by('id'))
+    equipe = list(Funcionario.objects.filter(atende=True).order_by('id'))
+    cadastrados = list(Cliente.objects.order_by('id'))
+
+    agendamentos = []
+    for deslocamento in range(-dias // 2, dias // 2):
+        data = hoje + timedelta(days=deslocamento)
+        if data.weekday() == 6 or aleatorio.random() < 0.5:
+            continue
+        for barbeiro in equipe:
+            minuto = para_minutos(ABERTURA)
+            while True:
+                servico = aleatorio.choice(servicos)
+                fim = minuto + int(servico.duracao.total_seconds() // 60)
+                if fim > para_minutos(FECHAMENTO):
+                    break
+                agendamentos.append(Agendamento(
+                    cliente=aleatorio.choice(cadastrados), servico=servico, preco=servico.preco,
+                    funcionario=barbeiro, data=data, hora=para_hora(minuto)
+                ))
+                minuto = fim + servico.folga_minutos + aleatorio.choice([0, 0, 10, 30])
+
+    cliente = cadastrados[0]
+    for agendamento in aleatorio.sample(agendamentos, min(agendamentos_do_cliente, len(agendamentos))):
+        agendamento.cliente = cliente
+    Agendamento.objects.bulk_create(agendamentos, batch_size=1000)
+    resumo.reconstruir(hoje - timedelta(days=dias), hoje + timedelta(days=dias))
+
+    # bulk_create não dispara sinais: nada do que foi gravado pode estar em cache
+    descartar_caches()
+    return Cenario(cliente, funcionario, equipe, servicos, hoje)
+
+
+def descartar_caches():
+    # Todos os aliases: páginas, disponibilidade e os contadores de limites
+    for alias in caches:
+        caches[alias].clear()
+    catalogo.descartar()
+
+
+class LimitesMixin:
+    """Asserções de consultas SQL e tempo de resposta para os TestCase"""
+
+    # Folga generosa: o teste pega regressões de ordem de grandeza, não ruído
+    TEMPO_MAXIMO = 2.0
+
+    @contextmanager
+    def assertLimites(self, consultas, tempo=None):
+        """Falha se o bloco fizer mais de `consultas` consultas ou demorar mais de `tempo` segundos"""
+        tempo = self.TEMPO_MAXIMO if tempo is None else tempo
+        comeco = _time.perf_counter()
+        with CaptureQueriesContext(connection) as capturadas:
+            yield capturadas
+        duracao = _time.perf_counter() - comeco
+        if len(capturadas) > consultas:
+            self.fail(
+                f'{len(capturadas)} consultas, limite {consultas}:\n'
+                + '\n'.join(f'  {consulta["sql"]}' for consulta in capturadas.captured_queries)
+            )
+        self.assertLessEqual(duracao, tempo, f'{duracao:.2f}s, limite {tempo:.2f}s')
+
+    def entrar_como_cliente(self, cliente):
+        sessao = self.client.session
+        sessao['cliente_id'] = cliente.id
+        sessao['cliente_nome'] = cliente.nome
+        sessao.save()
+
+    def entrar_como_funcionario(self, funcionario):
+        sessao = self.client.session
+        sessao['funcionario_id'] = funcionario.id
+        sessao['funcionario_nome'] = funcionario.nome
+        sessao.save()
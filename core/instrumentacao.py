@@ -0,0 +1,184 @@
+import contextvars
+import logging
+import threading
+import time as _time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse, JsonResponse
+from django.utils.deprecation import MiddlewareMixin
+
+logger = logging.getLogger(__name__)
+
+# Limites (em segundos) do histograma de duração das requisições
+LIMITES_HISTOGRAMA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# Coleta da requisição em andamento. Um ContextVar acompanha a requisição
+# também nas threads do sync_to_async, onde rodam as consultas das views assíncronas
+_coleta = contextvars.ContextVar('instrumentacao_coleta', default=None)
+
+
+class Coleta:
+    """Consultas SQL de uma requisição: quantidade, tempo e repetições por SQL"""
+
+    def __init__(self):
+        self.consultas = 0
+        self.tempo_banco = 0.0
+        self.repeticoes = Counter()
+
+
+def _registrar_consulta(execute, sql, params, many, context):
+    coleta = _coleta.get()
+    if coleta is None:
+        return execute(sql, params, many, context)
+    comeco = _time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        coleta.tempo_banco += _time.perf_counter() - comeco
+        coleta.consultas += 1
+        # O SQL chega com os parâmetros separados: consultas iguais com ids diferentes têm o mesmo texto
+        coleta.repeticoes[sql] += 1
+
+
+def _instalar(connection, **kwargs):
+    if _registrar_consulta not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_registrar_consulta)
+
+
+connection_created.connect(_instalar)
+
+
+class Metricas:
+    """Contadores do processo no formato de texto do Prometheus"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requisicoes = Counter()
+        self.duracoes = defaultdict(lambda: [0] * (len(LIMITES_HISTOGRAMA) + 1))
+        self.soma_duracoes = Counter()
+        self.consultas = Counter()
+        self.tempo_banco = Counter()
+        self.n_mais_um = Counter()
+
+    def registrar(self, view, metodo, status, duracao, coleta, suspeitas):
+        with self._lock:
+            self.requisicoes[view, metodo, status] += 1
+            baldes = self.duracoes[view]
+            for i, limite in enumerate(LIMITES_HISTOGRAMA):
+                if duracao <= limite:
+                    baldes[i] += 1
+                    break
+            else:
+                baldes[-1] += 1
+            self.soma_duracoes[view] += duracao
+            self.consultas[view] += coleta.consultas
+            self.tempo_banco[view] += coleta.tempo_banco
+            if suspeitas:
+                self.n_mais_um[view] += len(suspeitas)
+
+    def exportar(self):
+        with self._lock:
+            linhas = [
+                '# HELP django_requisicoes_total Requisições atendidas por view, método e status.',
+                '# TYPE django_requisicoes_total counter',
+            ]
+            for (view, metodo, status), total in sorted(self.requisicoes.items()):
+                linhas.append(f'django_requisicoes_total{{view="{view}",metodo="{metodo}",status="{status}"}} {total}')
+
+            linhas += [
+                '# HELP django_requisicao_duracao_segundos Duração das requisições por view.',
+                '# TYPE django_requisicao_duracao_segundos histogram',
+            ]
+            for view, baldes in sorted(self.duracoes.items()):
+                acumulado = 0
+                for limite, quantidade in zip(LIMITES_HISTOGRAMA + ('+Inf',), baldes):
+                    acumulado += quantidade
+                    linhas.append(f'django_requisicao_duracao_segundos_bucket{{view="{view}",le="{limite}"}} {acumulado}')
+                linhas.append(f'django_requisicao_duracao_segundos_sum{{view="{view}"}} {self.soma_duracoes[view]:.6f}')
+                linhas.append(f'django_requisicao_duracao_segundos_count{{view="{view}"}} {acumulado}')
+
+            for nome, ajuda, valores, formato in (
+                ('django_consultas_sql_total', 'Consultas SQL executadas por view.', self.consultas, '{}'),
+                ('django_banco_segundos_total', 'Tempo gasto no banco por view.', self.tempo_banco, '{:.6f}'),
+                ('django_n_mais_um_total', 'Consultas repetidas (possível N+1) detectadas por view.', self.n_mais_um, '{}'),
+            ):
+                linhas += [f'# HELP {nome} {ajuda}', f'# TYPE {nome} counter']
+                for view, valor in sorted(valores.items()):
+                    linhas.append(f'{nome}{{view="{view}"}} {formato.format(valor)}')
+            return '\n'.join(linhas) + '\n'
+
+
+metricas = Metricas()
+
+
+class InstrumentacaoMiddleware(MiddlewareMixin):
+    """
+    Mede cada requisição: tempo total, consultas SQL e tempo no banco, por view.
+    Acumula os números em `metricas` (exportados em /metricas/), acrescenta o
+    cabeçalho Server-Timing quando INSTRUMENTACAO_SERVER_TIMING está ligado e
+    avisa no log quando o mesmo SQL roda INSTRUMENTACAO_N_MAIS_UM vezes ou mais
+    em uma requisição. Deve ser o primeiro da lista para medir os demais.
+    """
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        for connection in connections.all(initialized_only=True):
+            _instalar(connection)
+        comeco, coleta, token = self._iniciar()
+        try:
+            response = self.get_response(request)
+        finally:
+            _coleta.reset(token)
+        return self._finalizar(request, response, comeco, coleta)
+
+    async def __acall__(self, request):
+        comeco, coleta, token = self._iniciar()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _coleta.reset(token)
+        return self._finalizar(request, response, comeco, coleta)
+
+    def _iniciar(self):
+        coleta = Coleta()
+        return _time.perf_counter(), coleta, _coleta.set(coleta)
+
+    def _finalizar(self, request, response, comeco, coleta):
+        duracao = _time.perf_counter() - comeco
+        resolver_match = getattr(request, 'resolver_match', None)
+        view = resolver_match.view_name if resolver_match else 'nao_resolvida'
+
+        suspeitas = [
+            (sql, vezes) for sql, vezes in coleta.repeticoes.items()
+            if vezes >= settings.INSTRUMENTACAO_N_MAIS_UM
+        ]
+        for sql, vezes in suspeitas:
+            logger.warning('Possível N+1 em %s (%s): %d× %s', view, request.path, vezes, sql[:300])
+
+        metricas.registrar(view, request.method, response.status_code, duracao, coleta, suspeitas)
+
+        if settings.INSTRUMENTACAO_SERVER_TIMING:
+            response['Server-Timing'] = (
+                f'total;dur={duracao * 1000:.1f}, '
+                f'db;dur={coleta.tempo_banco * 1000:.1f};desc="{coleta.consultas} consultas"'
+            )
+        return response
+
+
+def metricas_view(request):
+    """
+    Métricas no formato do Prometheus, para quem mandar o cabeçalho
+    'Authorization: Bearer <METRICAS_TOKEN>'. Sem METRICAS_TOKEN, recusa todos:
+    o endereço de origem não serve, já que atrás de um proxy local é sempre 127.0.0.1.
+    """
+    if not settings.METRICAS_TOKEN:
+        return JsonResponse({'error': 'Métricas desativadas: configure METRICAS_TOKEN'}, status=403)
+    if request.headers.get('Authorization') != f'Bearer {settings.METRICAS_TOKEN}':
+        resposta = JsonResponse({'error': 'Token de métricas ausente ou inválido'}, status=401)
+        resposta['WWW-Authenticate'] = 'Bearer'
+        return resposta
+    return HttpResponse(metricas.exportar(), content_type='text/plain; version=0.0.4; charset=utf-8')
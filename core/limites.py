@@ -0,0 +1,121 @@
+import hashlib
+import math
+import time as _time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import JsonResponse
+from django.utils.deprecation import MiddlewareMixin
+
+from clientes.autenticacao import normalizar_email, normalizar_telefone
+
+
+def _ip(request):
+    if settings.LIMITES_X_FORWARDED_FOR:
+        # O último endereço é o que o nosso proxy viu; os anteriores vêm do cliente
+        encaminhado = request.META.get('HTTP_X_FORWARDED_FOR', '').split(',')[-1].strip()
+        if encaminhado:
+            return encaminhado
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def _conta(request):
+    """Conta tentada no login, normalizada como na busca; None se não veio"""
+    usuario = request.POST.get('usuario')
+    if not usuario:
+        return None
+    if '@' in usuario:
+        return normalizar_email(usuario)
+    return normalizar_telefone(usuario) or normalizar_email(usuario)
+
+
+def _chave(nome, tipo, valor):
+    # Emails e IPv6 têm caracteres que alguns backends de cache não aceitam na chave
+    return f'limite:{nome}:{tipo}:{hashlib.sha1(valor.encode()).hexdigest()}'
+
+
+def _incrementar(cache, chave, delta, validade):
+    cache.add(chave, 0, validade)
+    try:
+        return cache.incr(chave, delta)
+    except ValueError:
+        # Expirou entre o add e o incr
+        cache.add(chave, delta, validade)
+        return delta
+
+
+def _espera(capacidade, janela, decorrido, anterior, atual):
+    """Segundos até a estimativa da janela deslizante abrir espaço para mais uma requisição"""
+    if atual < capacidade and anterior:
+        # Ainda nesta janela, quando o peso da anterior cair o suficiente
+        return max(0, (1 - (capacidade - 1 - atual) / anterior) * janela - decorrido)
+    # Só na próxima janela, quando o peso desta cair o suficiente
+    return janela - decorrido + max(0, 1 - (capacidade - 1) / atual) * janela
+
+
+def consumir(cache, baldes, agora=None):
+    """
+    Conta uma requisição em cada limite (chave -> (capacidade, fichas por minuto)).
+
+    Cada limite é uma janela deslizante de capacidade * 60 / fichas por minuto
+    segundos que aceita até `capacidade` requisições: a contagem da janela
+    atual mais a da anterior, proporcional ao quanto dela ainda se sobrepõe.
+    As contagens usam só add e incr/decr do cache, atômicos no locmem, Redis e
+    Memcached: requisições simultâneas nunca leem o mesmo valor. Se algum
+    limite estourar, as contagens feitas são desfeitas e volta a espera em
+    segundos até haver espaço; senão volta 0.
+    """
+    agora = _time.time() if agora is None else agora
+    contadas = []
+    espera = 0
+    for chave, (capacidade, por_minuto) in baldes.items():
+        janela = capacidade * 60 / por_minuto
+        numero, decorrido = divmod(agora, janela)
+        validade = math.ceil(2 * janela) + 1
+        chave_atual = f'{chave}:{int(numero)}'
+        atual = _incrementar(cache, chave_atual, 1, validade)
+        contadas.append((chave_atual, validade))
+        anterior = cache.get(f'{chave}:{int(numero) - 1}', 0)
+        if anterior * (1 - decorrido / janela) + atual > capacidade:
+            espera = max(espera, _espera(capacidade, janela, decorrido, anterior, atual - 1), 0.001)
+    if espera:
+        for chave_atual, validade in contadas:
+            _incrementar(cache, chave_atual, -1, validade)
+    return espera
+
+
+class LimiteRequisicoesMiddleware(MiddlewareMixin):
+    """
+    Limita as URLs de LIMITES_REQUISICOES com janelas deslizantes por IP e,
+    no login, por conta. Roda antes da view, então uma requisição
+    recusada não chega a consultar o banco nem a conferir senha. Os contadores
+    ficam no cache LIMITES_CACHE; com o locmem, cada processo conta sozinho.
+    """
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not settings.LIMITES_ATIVOS or request.resolver_match is None:
+            return None
+        nome = request.resolver_match.url_name
+        limites = settings.LIMITES_REQUISICOES.get(nome)
+        if not limites or request.method not in limites.get('metodos', (request.method,)):
+            return None
+
+        baldes = {}
+        if 'ip' in limites:
+            baldes[_chave(nome, 'ip', _ip(request))] = limites['ip']
+        if 'conta' in limites:
+            conta = _conta(request)
+            if conta:
+                baldes[_chave(nome, 'conta', conta)] = limites['conta']
+        if not baldes:
+            return None
+
+        espera = consumir(caches[settings.LIMITES_CACHE], baldes)
+        if not espera:
+            return None
+        resposta = JsonResponse(
+            {'error': 'Muitas tentativas em pouco tempo. Aguarde um pouco e tente novamente.'},
+            status=429
+        )
+        resposta['Retry-After'] = str(math.ceil(espera))
+        return resposta
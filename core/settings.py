@@ -48,7 +48,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.instrumentacao.InstrumentacaoMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.limites.LimiteRequisicoesMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -80,7 +82,28 @@ WSGI_APPLICATION = 'core.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
+# DB_ENGINE=sqlite usa um banco SQLite local, útil para desenvolvimento e testes
+DB_ENGINE = config('DB_ENGINE', default='mysql')
+
+if DB_ENGINE == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+            # Transações já começam com o lock de escrita, evitando leituras
+            # desatualizadas entre a verificação de conflito e a reserva
+            'OPTIONS': {
+                'transaction_mode': 'IMMEDIATE',
+                'timeout': 20,
+            },
+            # Banco de testes em arquivo para permitir testes com várias threads
+            'TEST': {
+                'NAME': BASE_DIR / 'test_db.sqlite3',
+            },
+        }
+    }
+else:
+    DATABASES = {
         'default': {
             'ENGINE': 'django.db.backends.mysql',
             'NAME': config('NAME'),
@@ -91,6 +114,129 @@ DATABASES = {
         }
     }
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='derik-barber'),
+    },
+    # Contadores do limite de requisições, separados das páginas e da
+    # disponibilidade: o tráfego normal não os despeja e zera os limites
+    'limites': {
+        'BACKEND': config('LIMITES_CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('LIMITES_CACHE_LOCATION', default='derik-barber-limites'),
+        'OPTIONS': {'MAX_ENTRIES': config('LIMITES_CACHE_MAX_ENTRIES', default=100_000, cast=int)},
+    },
+}
+
+# Limite de requisições por nome de URL (janela deslizante). 'ip' e 'conta' são
+# (capacidade, fichas repostas por minuto): até `capacidade` requisições a cada
+# capacidade * 60 / fichas segundos; 'conta' usa o campo `usuario` do login.
+# 'metodos' restringe os métodos contados. Os contadores ficam no cache
+# LIMITES_CACHE, que precisa de incr atômico (locmem, Redis ou Memcached; o
+# cache em banco não serve). O locmem padrão conta em cada processo: em
+# produção, com vários workers, aponte LIMITES_CACHE_BACKEND/LOCATION para um
+# Redis ou Memcached compartilhado, senão cada worker aceita a capacidade inteira.
+LIMITES_ATIVOS = config('LIMITES_ATIVOS', default=True, cast=bool)
+LIMITES_CACHE = config('LIMITES_CACHE', default='limites')
+# Atrás de um proxy reverso, o IP do cliente vem no X-Forwarded-For
+LIMITES_X_FORWARDED_FOR = config('LIMITES_X_FORWARDED_FOR', default=False, cast=bool)
+LIMITES_REQUISICOES = {
+    'login': {'metodos': ('POST',), 'ip': (20, 10), 'conta': (5, 2)},
+    'login_funcionario': {'metodos': ('POST',), 'ip': (20, 10), 'conta': (5, 2)},
+    'horarios_disponiveis': {'ip': (60, 120)},
+    'horarios_disponiveis_stream': {'ip': (10, 20)},
+    'horarios_disponiveis_periodo': {'ip': (20, 30)},
+}
+
+# Instrumentação das requisições (core.instrumentacao): cabeçalho Server-Timing
+# com o tempo total e o do banco, e aviso no log quando o mesmo SQL se repete
+# tantas vezes em uma requisição (possível N+1). As métricas do processo ficam
+# em /metricas/ no formato do Prometheus, só para quem mandar
+# 'Authorization: Bearer <METRICAS_TOKEN>'. Sem token configurado, /metricas/
+# fica fechado: atrás de um proxy local todo pedido vem de 127.0.0.1.
+INSTRUMENTACAO_SERVER_TIMING = config('INSTRUMENTACAO_SERVER_TIMING', default=DEBUG, cast=bool)
+INSTRUMENTACAO_N_MAIS_UM = config('INSTRUMENTACAO_N_MAIS_UM', default=5, cast=int)
+METRICAS_TOKEN = config('METRICAS_TOKEN', default='')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'simples': {'format': '{asctime} {levelname} {name}: {message}', 'style': '{'},
+    },
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler', 'formatter': 'simples'},
+    },
+    'loggers': {
+        logger: {'handlers': ['console'], 'level': config('LOG_LEVEL', default='INFO'), 'propagate': False}
+        for logger in ('core', 'main', 'clientes', 'servicos', 'agendamento', 'funcionarios')
+    },
+}
+
+# Onde ficam as sessões do login de clientes e funcionários:
+# - 'db': tabela django_session, uma consulta por requisição com sessão (padrão)
+# - 'cached_db': a mesma tabela com o cache SESSAO_CACHE na frente; exige um
+#   cache compartilhado (Redis/Memcached): com o locmem padrão o check main.E001
+#   impede a subida, já que o logout num worker não chegaria aos demais
+# - 'cookie': a sessão (só ids e nomes) vai assinada no próprio cookie, sem
+#   banco; o logout não invalida cópias antigas do cookie antes de expirarem
+SESSAO_BACKEND = config('SESSAO_BACKEND', default='db')
+SESSION_ENGINE = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'cookie': 'django.contrib.sessions.backends.signed_cookies',
+}[SESSAO_BACKEND]
+SESSION_CACHE_ALIAS = config('SESSAO_CACHE', default='default')
+
+# Tempo (em segundos) que a disponibilidade de um dia fica em cache
+DISPONIBILIDADE_CACHE_TIMEOUT = config('DISPONIBILIDADE_CACHE_TIMEOUT', default=60 * 60, cast=int)
+
+# Páginas públicas (início, serviços, contato) guardadas inteiras no cache para
+# visitantes anônimos, pela versão do catálogo, e max-age do Cache-Control delas
+# (0 = o navegador revalida sempre, recebendo 304 quando nada mudou)
+PAGINAS_CACHE_TIMEOUT = config('PAGINAS_CACHE_TIMEOUT', default=60 * 60 * 24, cast=int)
+PAGINAS_MAX_AGE = config('PAGINAS_MAX_AGE', default=0, cast=int)
+
+# Horários de funcionamento, serviços e barbeiros ficam em memória em cada processo.
+# Edições avisam os outros processos por uma versão no cache, conferida no máximo
+# a cada CATALOGO_VERIFICACAO_SEGUNDOS (use um cache compartilhado com vários workers).
+CATALOGO_VERIFICACAO_SEGUNDOS = config('CATALOGO_VERIFICACAO_SEGUNDOS', default=2, cast=float)
+
+# Usa as versões assíncronas das APIs de disponibilidade, serviços e exclusão de
+# agendamento. Ative apenas quando servir via ASGI (ex.: uvicorn core.asgi:application);
+# sob WSGI cada view assíncrona roda em um event loop próprio e fica mais lenta.
+ASYNC_VIEWS = config('ASYNC_VIEWS', default=False, cast=bool)
+
+# Minutos que um horário fica reservado enquanto o cliente conclui o agendamento
+PRE_RESERVA_MINUTOS = config('PRE_RESERVA_MINUTOS', default=5, cast=int)
+
+# Grade de horários materializada (tabela Slot, gerada por `manage.py gerar_slots`):
+# a disponibilidade dos dias gerados vira uma única consulta por faixa de índice.
+# Depois de mudar a granularidade (em minutos), gere a grade novamente.
+AGENDA_SLOTS = config('AGENDA_SLOTS', default=False, cast=bool)
+AGENDA_SLOT_MINUTOS = config('AGENDA_SLOT_MINUTOS', default=5, cast=int)
+
+# Atualização da agenda em tempo real (SSE). Cada página aberta mantém uma conexão
+# por até alguns minutos: sob WSGI isso prende um worker por visitante, então o
+# stream só é servido com as views assíncronas (ASGI). Desligado, a página de
+# agenda consulta a disponibilidade periodicamente.
+SSE_ATIVO = config('SSE_ATIVO', default=ASYNC_VIEWS, cast=bool)
+
+# Broker de eventos usado para avisar as conexões SSE sobre novos agendamentos.
+# O BrokerCache passa pelo cache EVENTOS_CACHE (compartilhado entre os workers
+# com Redis/Memcached), conferido a cada EVENTOS_INTERVALO segundos; o
+# agendamento.eventos.BrokerLocal só alcança o próprio processo.
+EVENTOS_BROKER = config('EVENTOS_BROKER', default='agendamento.eventos.BrokerCache')
+EVENTOS_CACHE = config('EVENTOS_CACHE', default='default')
+EVENTOS_INTERVALO = config('EVENTOS_INTERVALO', default=1, cast=float)
+# Segundos que o contador e a última mensagem de um tópico sobrevivem à última
+# publicação. Precisa passar da conexão SSE mais longa (SSE_DURACAO_MAXIMA em
+# agendamento/views.py, 5 minutos): uma assinatura nunca vê o contador sumir.
+EVENTOS_TTL = config('EVENTOS_TTL', default=10 * 60, cast=int)
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -109,6 +255,29 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Algoritmo das senhas novas: 'pbkdf2' (padrão do Django), 'scrypt' (hashlib,
+# sem dependências) ou 'argon2' (requer argon2-cffi). Os demais continuam
+# aceitos, e o hash de quem entra é regravado no algoritmo escolhido.
+SENHA_HASHER = config('SENHA_HASHER', default='pbkdf2')
+# Custo do scrypt: memória = 128 * N * r bytes; o tempo cresce com N * r * p
+SENHA_SCRYPT_N = config('SENHA_SCRYPT_N', default=2 ** 14, cast=int)
+SENHA_SCRYPT_R = config('SENHA_SCRYPT_R', default=8, cast=int)
+SENHA_SCRYPT_P = config('SENHA_SCRYPT_P', default=5, cast=int)
+_HASHERS = {
+    'pbkdf2': 'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'scrypt': 'clientes.autenticacao.ScryptConfiguravel',
+    'argon2': 'django.contrib.auth.hashers.Argon2PasswordHasher',
+}
+PASSWORD_HASHERS = [_HASHERS[SENHA_HASHER]] + [
+    hasher for hasher in (
+        'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+        'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+        'django.contrib.auth.hashers.Argon2PasswordHasher',
+        'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+        'clientes.autenticacao.ScryptConfiguravel',
+    ) if hasher != _HASHERS[SENHA_HASHER]
+]
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
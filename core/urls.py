@@ -3,8 +3,11 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from core.instrumentacao import metricas_view
+
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metricas/', metricas_view, name='metricas'),
     path('', include('main.urls')),
     path('funcionario/', include('funcionarios.urls')),
 ]
@@ -0,0 +1,85 @@
+from datetime import date
+
+from django.core.cache import cache
+from django.db.models import Sum
+
+from agendamento.models import Agendamento, ResumoDiario
+from clientes.models import Cliente
+from servicos.models import Servico
+
+CHAVE_ESTATISTICAS_GERAIS = 'dashboard:estatisticas_gerais'
+
+# Clientes e serviços são invalidados por sinais; o timeout é só uma rede de segurança
+TIMEOUT_ESTATISTICAS_GERAIS = 60 * 60
+
+TOTAL_PROXIMOS = 10
+TOTAL_POPULARES = 5
+
+
+def calcular_cadastro():
+    """Serviços e total de clientes: mudam devagar e ficam no cache"""
+    return {
+        'total_clientes': Cliente.objects.count(),
+        'servicos': list(Servico.objects.values('id', 'nome', 'descricao', 'preco')),
+    }
+
+
+def estatisticas_gerais():
+    """
+    Totais e serviços populares. O cadastro vem do cache; as contagens de
+    agendamentos saem do ResumoDiario, que os sinais mantêm a cada reserva,
+    então agendar ou cancelar não descarta o cache do painel.
+    """
+    cadastro = cache.get(CHAVE_ESTATISTICAS_GERAIS)
+    if cadastro is None:
+        cadastro = calcular_cadastro()
+        cache.set(CHAVE_ESTATISTICAS_GERAIS, cadastro, TIMEOUT_ESTATISTICAS_GERAIS)
+
+    # Uma linha por dia e serviço: bem menor que a tabela de agendamentos
+    por_servico = dict(
+        ResumoDiario.objects.order_by().values_list('servico').annotate(total=Sum('quantidade'))
+    )
+    servicos = [
+        {**servico, 'total_agendamentos': por_servico.get(servico['id']) or 0}
+        for servico in cadastro['servicos']
+    ]
+    populares = sorted(servicos, key=lambda servico: -servico['total_agendamentos'])[:TOTAL_POPULARES]
+    return {
+        'total_clientes': cadastro['total_clientes'],
+        'total_agendamentos': sum(servico['total_agendamentos'] for servico in servicos),
+        'total_servicos': len(servicos),
+        'servicos_populares': populares,
+    }
+
+
+def invalidar_estatisticas_gerais():
+    cache.delete(CHAVE_ESTATISTICAS_GERAIS)
+
+
+def agenda_do_dia(hoje=None):
+    """Agendamentos de hoje, próximos agendamentos e receita do dia"""
+    hoje = hoje or date.today()
+    agendamentos_hoje = list(
+        Agendamento.objects.filter(data=hoje).select_related('cliente', 'servico').order_by('hora')
+    )
+
+    # Se hoje já tem agendamentos suficientes, os próximos saem da mesma lista
+    if len(agendamentos_hoje) >= TOTAL_PROXIMOS:
+        proximos_agendamentos = agendamentos_hoje[:TOTAL_PROXIMOS]
+    else:
+        proximos_agendamentos = list(
+            Agendamento.objects.filter(
+                data__gte=hoje
+            ).select_related('cliente', 'servico').order_by('data', 'hora')[:TOTAL_PROXIMOS]
+        )
+
+    return {
+        'agendamentos_hoje': agendamentos_hoje,
+        'proximos_agendamentos': proximos_agendamentos,
+        'receita_hoje': sum(agendamento.preco_cobrado for agendamento in agendamentos_hoje),
+    }
+
+
+def estatisticas_dashboard(hoje=None):
+    """Todos os dados do painel do funcionário"""
+    return {**estatisticas_gerais(), **agenda_do_dia(hoje)}
@@ -0,0 +1,100 @@
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models.functions import Coalesce
+
+from agendamento.models import Agendamento
+from clientes.models import Cliente
+
+TAMANHO_LOTE = 2000
+
+FORMATOS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+COLUNAS_AGENDAMENTOS = [
+    ('id', 'id'),
+    ('data', 'data'),
+    ('hora', 'hora'),
+    ('cliente_id', 'cliente_id'),
+    ('cliente', 'cliente__nome'),
+    ('telefone', 'cliente__telefone'),
+    ('email', 'cliente__email'),
+    ('servico_id', 'servico_id'),
+    ('servico', 'servico__nome'),
+    # Preço gravado no agendamento; sem ele (bulk_create), o atual do serviço
+    ('preco', Coalesce('preco', 'servico__preco')),
+    ('duracao', 'servico__duracao'),
+    ('funcionario_id', 'funcionario_id'),
+    ('funcionario', 'funcionario__nome'),
+    ('observacoes', 'observacoes'),
+    ('criado_em', 'criado_em'),
+]
+
+COLUNAS_CLIENTES = [
+    ('id', 'id'),
+    ('nome', 'nome'),
+    ('telefone', 'telefone'),
+    ('email', 'email'),
+    ('data_cadastro', 'data_cadastro'),
+]
+
+
+class _Eco:
+    """Pseudo-arquivo que devolve o que foi escrito, para o csv.writer gerar linhas sob demanda"""
+
+    def write(self, valor):
+        return valor
+
+
+def _tuplas(queryset, campos, tamanho_lote):
+    """
+    Tuplas com os `campos`, em ordem de id, lidas por paginação por chave:
+    cada lote é uma consulta a partir do último id visto. O iterator() não
+    bastaria: o mysqlclient traz o resultado inteiro para a memória do cliente.
+    """
+    ultimo = None
+    while True:
+        lote = queryset.order_by('id')
+        if ultimo is not None:
+            lote = lote.filter(id__gt=ultimo)
+        # values_list: só tuplas, sem montar instâncias do modelo
+        lote = list(lote.values_list('id', *campos)[:tamanho_lote])
+        for tupla in lote:
+            yield tupla[1:]
+        if len(lote) < tamanho_lote:
+            return
+        ultimo = lote[-1][0]
+
+
+def _linhas(queryset, colunas, formato, tamanho_lote):
+    nomes = [nome for nome, _ in colunas]
+    tuplas = _tuplas(queryset, [campo for _, campo in colunas], tamanho_lote)
+
+    if formato == 'csv':
+        escritor = csv.writer(_Eco())
+        yield escritor.writerow(nomes)
+        for tupla in tuplas:
+            yield escritor.writerow(tupla)
+    elif formato == 'ndjson':
+        for tupla in tuplas:
+            yield json.dumps(dict(zip(nomes, tupla)), cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+    else:
+        raise ValueError(f'Formato inválido: {formato}')
+
+
+def linhas_agendamentos(formato='csv', inicio=None, fim=None, tamanho_lote=TAMANHO_LOTE):
+    """Gera o export de agendamentos (com cliente e serviço) linha a linha"""
+    agendamentos = Agendamento.objects.all()
+    if inicio:
+        agendamentos = agendamentos.filter(data__gte=inicio)
+    if fim:
+        agendamentos = agendamentos.filter(data__lte=fim)
+    return _linhas(agendamentos, COLUNAS_AGENDAMENTOS, formato, tamanho_lote)
+
+
+def linhas_clientes(formato='csv', tamanho_lote=TAMANHO_LOTE):
+    """Gera o export de clientes linha a linha (sem a senha)"""
+    return _linhas(Cliente.objects.all(), COLUNAS_CLIENTES, formato, tamanho_lote)
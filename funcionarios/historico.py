@@ -0,0 +1,74 @@
+import base64
+from datetime import date, datetime, time
+
+from django.db.models import Q
+
+from agendamento.models import Agendamento
+
+TAMANHO_PAGINA = 50
+TAMANHO_MAXIMO_PAGINA = 200
+
+
+class CursorInvalido(ValueError):
+    pass
+
+
+def codificar_cursor(agendamento):
+    """Cursor opaco com a posição (data, hora, id) do último item da página"""
+    valor = f'{agendamento.data.isoformat()}|{agendamento.hora.isoformat()}|{agendamento.id}'
+    return base64.urlsafe_b64encode(valor.encode()).decode()
+
+
+def decodificar_cursor(cursor):
+    try:
+        data, hora, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return date.fromisoformat(data), time.fromisoformat(hora), int(pk)
+    except (ValueError, UnicodeDecodeError):
+        raise CursorInvalido('Cursor inválido')
+
+
+def filtrar(parametros):
+    """Agendamentos do histórico filtrados por período, serviço e nome do cliente"""
+    agendamentos = Agendamento.objects.select_related('cliente', 'servico')
+
+    inicio = parametros.get('inicio')
+    fim = parametros.get('fim')
+    if inicio:
+        agendamentos = agendamentos.filter(data__gte=datetime.strptime(inicio, '%Y-%m-%d').date())
+    if fim:
+        agendamentos = agendamentos.filter(data__lte=datetime.strptime(fim, '%Y-%m-%d').date())
+    if parametros.get('servico'):
+        agendamentos = agendamentos.filter(servico_id=int(parametros['servico']))
+    if parametros.get('cliente'):
+        agendamentos = agendamentos.filter(cliente__nome__icontains=parametros['cliente'].strip())
+
+    return agendamentos.order_by('-data', '-hora', '-id')
+
+
+def pagina(agendamentos, cursor=None, tamanho=TAMANHO_PAGINA):
+    """
+    Retorna (itens, próximo cursor) usando paginação por chave em
+    (-data, -hora, -id): cada página é uma busca no índice a partir do
+    último item visto, com custo constante independentemente da posição.
+    """
+    if cursor:
+        data, hora, pk = decodificar_cursor(cursor)
+        agendamentos = agendamentos.filter(
+            Q(data__lt=data)
+            | Q(data=data, hora__lt=hora)
+            | Q(data=data, hora=hora, id__lt=pk)
+        )
+
+    # Busca um item a mais para saber se existe próxima página
+    itens = list(agendamentos[:tamanho + 1])
+    if len(itens) > tamanho:
+        itens = itens[:tamanho]
+        return itens, codificar_cursor(itens[-1])
+    return itens, None
+
+
+def tamanho_pagina(valor):
+    try:
+        return max(1, min(int(valor), TAMANHO_MAXIMO_PAGINA))
+    except (TypeError, ValueError):
+        return TAMANHO_PAGINA
@@ -0,0 +1,52 @@
+import sys
+import time as _time
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from funcionarios import exportacao
+
+
+class Command(BaseCommand):
+    help = 'Exporta agendamentos ou clientes em CSV ou NDJSON, lendo o banco em lotes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('tipo', choices=['agendamentos', 'clientes'])
+        parser.add_argument('--formato', choices=list(exportacao.FORMATOS), default='csv')
+        parser.add_argument('--saida', help='Arquivo de saída. Padrão: saída padrão')
+        parser.add_argument('--inicio', help='Data inicial dos agendamentos (AAAA-MM-DD)')
+        parser.add_argument('--fim', help='Data final dos agendamentos (AAAA-MM-DD)')
+        parser.add_argument('--lote', type=int, default=exportacao.TAMANHO_LOTE,
+                            help=f'Linhas lidas do banco por vez (padrão: {exportacao.TAMANHO_LOTE})')
+
+    def handle(self, *args, **options):
+        try:
+            inicio = self.data(options['inicio'])
+            fim = self.data(options['fim'])
+        except ValueError:
+            raise CommandError('Datas devem estar no formato AAAA-MM-DD.')
+
+        if options['tipo'] == 'agendamentos':
+            linhas = exportacao.linhas_agendamentos(options['formato'], inicio, fim, options['lote'])
+        else:
+            linhas = exportacao.linhas_clientes(options['formato'], options['lote'])
+
+        comeco = _time.perf_counter()
+        total = 0
+        saida = open(options['saida'], 'w', encoding='utf-8', newline='') if options['saida'] else sys.stdout
+        try:
+            for linha in linhas:
+                saida.write(linha)
+                total += 1
+        finally:
+            if options['saida']:
+                saida.close()
+
+        if options['saida']:
+            duracao = _time.perf_counter() - comeco
+            self.stdout.write(self.style.SUCCESS(
+                f'{total} linhas gravadas em {options["saida"]} em {duracao:.1f}s.'
+            ))
+
+    def data(self, valor):
+        return datetime.strptime(valor, '%Y-%m-%d').date() if valor else None
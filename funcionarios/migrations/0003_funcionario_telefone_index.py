@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 15:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('funcionarios', '0002_horariofuncionamento'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='funcionario',
+            name='telefone',
+            field=models.CharField(blank=True, db_index=True, max_length=20, null=True),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.6 on 2026-10-18 15:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('funcionarios', '0003_funcionario_telefone_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='funcionario',
+            name='atende',
+            field=models.BooleanField(default=False, help_text='Barbeiro com cadeira própria: recebe agendamentos e conta na capacidade da barbearia'),
+        ),
+        migrations.CreateModel(
+            name='HorarioFuncionario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia_semana', models.IntegerField(choices=[(0, 'Segunda-feira'), (1, 'Terça-feira'), (2, 'Quarta-feira'), (3, 'Quinta-feira'), (4, 'Sexta-feira'), (5, 'Sábado'), (6, 'Domingo')])),
+                ('hora_inicio', models.TimeField()),
+                ('hora_fim', models.TimeField()),
+                ('ativo', models.BooleanField(default=True)),
+                ('funcionario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='horarios', to='funcionarios.funcionario')),
+            ],
+            options={
+                'verbose_name': 'Horário do Funcionário',
+                'verbose_name_plural': 'Horários dos Funcionários',
+                'ordering': ['funcionario', 'dia_semana'],
+                'constraints': [models.UniqueConstraint(fields=('funcionario', 'dia_semana'), name='horario_funcionario_dia_unico')],
+            },
+        ),
+    ]
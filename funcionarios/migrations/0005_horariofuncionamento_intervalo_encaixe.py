@@ -0,0 +1,24 @@
+# Generated by Django 5.2.6 on 2026-10-18 17:10
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('funcionarios', '0004_horariofuncionario'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='horariofuncionamento',
+            name='encaixe',
+            field=models.BooleanField(default=False, help_text='Oferece também horários colados ao fim dos agendamentos, para não deixar sobras'),
+        ),
+        migrations.AddField(
+            model_name='horariofuncionamento',
+            name='intervalo_minutos',
+            field=models.PositiveSmallIntegerField(default=30, help_text='Intervalo entre os horários oferecidos, em minutos', validators=[django.core.validators.MinValueValidator(1)]),
+        ),
+    ]
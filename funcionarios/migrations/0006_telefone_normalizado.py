@@ -0,0 +1,30 @@
+# Generated by Django 5.2.6 on 2026-10-18 19:41
+
+from django.db import migrations, models
+
+from clientes.autenticacao import normalizar_contas
+
+
+def normalizar(apps, schema_editor):
+    normalizar_contas(apps.get_model('funcionarios', 'Funcionario'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('funcionarios', '0005_horariofuncionamento_intervalo_encaixe'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='funcionario',
+            name='telefone_normalizado',
+            field=models.CharField(blank=True, db_index=True, editable=False, help_text='Só os dígitos do telefone, usado no login', max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='funcionario',
+            name='senha',
+            field=models.CharField(max_length=255),
+        ),
+        migrations.RunPython(normalizar, migrations.RunPython.noop),
+    ]
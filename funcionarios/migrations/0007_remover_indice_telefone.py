@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-18 23:10
+
+from django.db import migrations, models
+
+
+# O login busca por telefone_normalizado; o índice em telefone só pesava nas escritas
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('funcionarios', '0006_telefone_normalizado'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='funcionario',
+            name='telefone',
+            field=models.CharField(blank=True, max_length=20, null=True),
+        ),
+    ]
@@ -1,14 +1,30 @@
 from django.db import models
 from django.core.exceptions import ValidationError
+from django.core.validators import MinValueValidator
+
+from clientes.autenticacao import normalizar_email, normalizar_telefone
 
 # Create your models here.
 class Funcionario(models.Model):
     nome = models.CharField(max_length=100)
     telefone = models.CharField(max_length=20, blank=True, null=True)
+    telefone_normalizado = models.CharField(
+        max_length=20, blank=True, db_index=True, editable=False,
+        help_text="Só os dígitos do telefone, usado no login"
+    )
     email = models.EmailField(unique=True, blank=True, null=True)
-    senha = models.CharField(max_length=128)
+    senha = models.CharField(max_length=255)
     data_cadastro = models.DateTimeField(auto_now_add=True)
     status = models.BooleanField(default=False)
+    atende = models.BooleanField(
+        default=False,
+        help_text="Barbeiro com cadeira própria: recebe agendamentos e conta na capacidade da barbearia"
+    )
+
+    def save(self, *args, **kwargs):
+        self.email = normalizar_email(self.email)
+        self.telefone_normalizado = normalizar_telefone(self.telefone)
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return self.nome
@@ -28,6 +44,14 @@ class HorarioFuncionamento(models.Model):
     hora_inicio = models.TimeField()
     hora_fim = models.TimeField()
     ativo = models.BooleanField(default=True)
+    intervalo_minutos = models.PositiveSmallIntegerField(
+        default=30, validators=[MinValueValidator(1)],
+        help_text="Intervalo entre os horários oferecidos, em minutos"
+    )
+    encaixe = models.BooleanField(
+        default=False,
+        help_text="Oferece também horários colados ao fim dos agendamentos, para não deixar sobras"
+    )
     data_criacao = models.DateTimeField(auto_now_add=True)
     
     class Meta:
@@ -41,3 +65,27 @@ class HorarioFuncionamento(models.Model):
     
     def __str__(self):
         return f"{self.get_dia_semana_display()}: {self.hora_inicio} - {self.hora_fim}"
+
+
+class HorarioFuncionario(models.Model):
+    """Horário de um barbeiro em um dia da semana, dentro do horário de funcionamento da barbearia"""
+    funcionario = models.ForeignKey(Funcionario, on_delete=models.CASCADE, related_name='horarios')
+    dia_semana = models.IntegerField(choices=HorarioFuncionamento.DIAS_SEMANA)
+    hora_inicio = models.TimeField()
+    hora_fim = models.TimeField()
+    ativo = models.BooleanField(default=True)
+    
+    class Meta:
+        verbose_name = "Horário do Funcionário"
+        verbose_name_plural = "Horários dos Funcionários"
+        ordering = ['funcionario', 'dia_semana']
+        constraints = [
+            models.UniqueConstraint(fields=['funcionario', 'dia_semana'], name='horario_funcionario_dia_unico'),
+        ]
+    
+    def clean(self):
+        if self.hora_inicio >= self.hora_fim:
+            raise ValidationError("A hora de início deve ser anterior à hora de fim.")
+    
+    def __str__(self):
+        return f"{self.funcionario} - {self.get_dia_semana_display()}: {self.hora_inicio} - {self.hora_fim}"
@@ -0,0 +1,15 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from clientes.models import Cliente
+from funcionarios.dashboard import invalidar_estatisticas_gerais
+from servicos.models import Servico
+
+
+@receiver(post_save, sender=Cliente)
+@receiver(post_delete, sender=Cliente)
+@receiver(post_save, sender=Servico)
+@receiver(post_delete, sender=Servico)
+def invalidar_dashboard(sender, instance, **kwargs):
+    transaction.on_commit(invalidar_estatisticas_gerais)
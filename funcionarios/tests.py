@@ -1,3 +1,370 @@
-from django.test import TestCase
+import base64
+import csv
+import json
+from decimal import Decimal
+from datetime import date, time, timedelta
+from importlib import import_module
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from agendamento.models import Agendamento, ResumoDiario
+from clientes.models import Cliente
+from core.fabricas import SENHA, LimitesMixin, descartar_caches, popular
+from funcionarios import dashboard, exportacao, historico, views
+from funcionarios.models import Funcionario, HorarioFuncionamento
+from servicos.models import Servico
+
+
+@override_settings(LIMITES_ATIVOS=False)
+class ConsultasPainelFuncionarioTests(LimitesMixin, TestCase):
+    """
+    Limites de consultas SQL e de tempo das URLs de funcionarios/urls.py com a
+    barbearia populada e os caches vazios. Os limites não dependem do volume:
+    um N+1 (ex.: buscar o cliente de cada linha do histórico) estoura na hora.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cenario = popular()
+        cls.funcionario = cls.cenario.funcionario
+        cls.servico = cls.cenario.servicos[0]
+        cls.dia_lotado = Agendamento.objects.filter(data__gt=cls.cenario.hoje).earliest('data').data
+
+    def setUp(self):
+        descartar_caches()
+        self.entrar_como_funcionario(self.funcionario)
+
+    def pedir(self, metodo, url, dados=None, consultas=0, status=200):
+        with self.assertLimites(consultas):
+            resposta = getattr(self.client, metodo)(url, dados or {})
+            if resposta.streaming:
+                b''.join(resposta.streaming_content)
+        self.assertEqual(resposta.status_code, status)
+        return resposta
+
+    def test_painel(self):
+        resposta = self.pedir('get', reverse('index_funcionario'), consultas=6)
+        self.assertTrue(resposta.context['proximos_agendamentos'])
+
+    def test_login(self):
+        self.client.logout()
+        self.pedir('get', reverse('login_funcionario'), consultas=0)
+        self.pedir('post', reverse('login_funcionario'), {
+            'usuario': self.funcionario.telefone, 'senha': SENHA,
+        }, consultas=5, status=302)
+
+    def test_cadastro(self):
+        self.client.logout()
+        self.pedir('get', reverse('cadastro_funcionario'), consultas=2)
+        self.pedir('post', reverse('cadastro_funcionario'), {
+            'nome': 'Barbeiro Novo', 'email': 'novo@exemplo.com', 'telefone': '(11) 98765-4321',
+            'senha': 'segredo123', 'confirmar_senha': 'segredo123',
+        }, consultas=2)
+        self.assertTrue(Funcionario.objects.filter(email='novo@exemplo.com').exists())
+
+    def test_logout(self):
+        self.pedir('get', reverse('logout_funcionario'), consultas=2, status=302)
+
+    def test_gerenciar_horarios(self):
+        self.pedir('get', reverse('gerenciar_horarios'), consultas=2)
+        dados = {}
+        for dia in range(6):
+            dados.update({
+                f'dia_{dia}_ativo': 'on', f'dia_{dia}_inicio': '09:00', f'dia_{dia}_fim': '19:00',
+                f'dia_{dia}_intervalo': '15',
+            })
+        self.pedir('post', reverse('gerenciar_horarios'), dados, consultas=5, status=302)
+        self.assertEqual(HorarioFuncionamento.objects.get(dia_semana=0).intervalo_minutos, 15)
+
+    def test_historico(self):
+        resposta = self.pedir('get', reverse('historico_agendamentos'), consultas=3)
+        self.assertTrue(resposta.context['agendamentos'])
+
+    def test_historico_api(self):
+        primeira = self.pedir('get', reverse('historico_api'), {'limite': 200}, consultas=2).json()
+        self.assertEqual(len(primeira['agendamentos']), 200)
+        self.pedir('get', reverse('historico_api'), {'limite': 200, 'cursor': primeira['proximo_cursor']}, consultas=2)
+
+    def test_horarios_disponiveis(self):
+        self.pedir('get', reverse('horarios_disponiveis'), {
+            'data': self.dia_lotado.isoformat(), 'servico_id': self.servico.id,
+        }, consultas=6)
+
+    def test_servicos(self):
+        self.pedir('get', reverse('get_servicos'), consultas=5)
+
+    def test_dashboard_api(self):
+        self.pedir('get', reverse('dashboard_api'), consultas=6)
+
+    def test_relatorio_api(self):
+        hoje = self.cenario.hoje
+        self.pedir('get', reverse('relatorio_api'), {
+            'inicio': (hoje - timedelta(days=60)).isoformat(), 'fim': (hoje + timedelta(days=60)).isoformat(),
+        }, consultas=2)
+
+    def test_exportar_agendamentos(self):
+        self.pedir('get', reverse('exportar_agendamentos'), consultas=2)
+        self.pedir('get', reverse('exportar_agendamentos'), {'formato': 'ndjson'}, consultas=2)
+
+    def test_exportar_clientes(self):
+        self.pedir('get', reverse('exportar_clientes'), consultas=2)
+
+
+@override_settings(LIMITES_ATIVOS=False, AGENDA_SLOTS=True)
+class GerenciarHorariosTests(LimitesMixin, TestCase):
+    """A semana é gravada de uma vez, e só os dias alterados refazem a grade"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.funcionario = Funcionario.objects.create(nome='Barbeiro', telefone='11999990000', senha='!')
+        for dia in range(6):
+            HorarioFuncionamento.objects.create(dia_semana=dia, hora_inicio=time(8), hora_fim=time(18))
+
+    def setUp(self):
+        self.entrar_como_funcionario(self.funcionario)
+
+    def semana(self, **alteracoes):
+        dados = {}
+        for dia in range(7):
+            dados.update({
+                f'dia_{dia}_ativo': 'on', f'dia_{dia}_inicio': '08:00', f'dia_{dia}_fim': '18:00',
+                f'dia_{dia}_intervalo': '30',
+            })
+        dados.update(alteracoes)
+        return dados
+
+    def test_grava_e_refaz_so_os_dias_alterados(self):
+        dados = self.semana(dia_1_fim='20:00')
+        del dados['dia_2_ativo']
+        with mock.patch('funcionarios.views.slots.regenerar') as regenerar:
+            with self.captureOnCommitCallbacks(execute=True):
+                resposta = self.client.post(reverse('gerenciar_horarios'), dados)
+        self.assertEqual(resposta.status_code, 302)
+        regenerar.assert_called_once_with(dias_semana={1, 2, 6})
+
+        horarios = {horario.dia_semana: horario for horario in HorarioFuncionamento.objects.all()}
+        self.assertEqual(horarios[1].hora_fim, time(20))
+        self.assertFalse(horarios[2].ativo)
+        self.assertEqual((horarios[6].hora_inicio, horarios[6].ativo), (time(8), True))
+
+    def test_semana_sem_mudancas_nao_escreve(self):
+        with mock.patch('funcionarios.views.slots.regenerar') as regenerar:
+            with self.captureOnCommitCallbacks(execute=True), self.assertLimites(2):
+                self.client.post(reverse('gerenciar_horarios'), self.semana(dia_6_ativo=''))
+        regenerar.assert_not_called()
+
+
+class ViewsAssincronasTests(TestCase):
+    """As APIs assíncronas (ASGI) do painel respondem igual às síncronas"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cenario = popular(clientes=10, dias=3)
+
+    def setUp(self):
+        descartar_caches()
+        self.fabrica = RequestFactory()
+
+    async def pedido(self, url, parametros=None, **sessao):
+        pedido = self.fabrica.get(url, parametros or {})
+        pedido.session = import_module(settings.SESSION_ENGINE).SessionStore()
+        for chave, valor in sessao.items():
+            await pedido.session.aset(chave, valor)
+        return pedido
+
+    async def test_servicos(self):
+        resposta = await views.aget_servicos(await self.pedido('/funcionario/api/servicos/'))
+        self.assertEqual(resposta.status_code, 401)
+
+        pedido = await self.pedido('/funcionario/api/servicos/', funcionario_id=self.cenario.funcionario.id)
+        esperado = await sync_to_async(views.get_servicos)(pedido)
+        resposta = await views.aget_servicos(pedido)
+        self.assertEqual(json.loads(resposta.content), json.loads(esperado.content))
+        self.assertEqual(len(json.loads(resposta.content)['servicos']), len(self.cenario.servicos))
+
+    async def test_horarios_disponiveis(self):
+        data = await Agendamento.objects.order_by('-data').values_list('data', flat=True).afirst()
+        parametros = {'data': data.isoformat(), 'servico_id': self.cenario.servicos[0].id}
+        esperado = await sync_to_async(views.get_horarios_disponiveis)(await self.pedido('/', parametros))
+        await sync_to_async(descartar_caches)()
+        resposta = await views.aget_horarios_disponiveis(await self.pedido('/', parametros))
+        self.assertEqual(json.loads(resposta.content), json.loads(esperado.content))
+
+        resposta = await views.aget_horarios_disponiveis(await self.pedido('/', {'data': '07/01/2030'}))
+        self.assertEqual(resposta.status_code, 400)
+
+
+class EstatisticasDashboardTests(TestCase):
+    """Agendar ou cancelar atualiza as contagens do painel sem descartar o cache"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cenario = popular(clientes=20, dias=5)
+
+    def setUp(self):
+        descartar_caches()
+
+    def test_contagens_seguem_os_agendamentos_com_o_cache_quente(self):
+        inicial = dashboard.estatisticas_gerais()
+        self.assertEqual(inicial['total_agendamentos'], Agendamento.objects.count())
+
+        servico = self.cenario.servicos[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            agendamento = Agendamento.objects.create(
+                cliente=self.cenario.cliente, servico=servico,
+                data=self.cenario.hoje + timedelta(days=30), hora=time(9)
+            )
+        # Só o ResumoDiario é lido: o cadastro continua no cache
+        with self.assertNumQueries(1):
+            depois = dashboard.estatisticas_gerais()
+        self.assertEqual(depois['total_agendamentos'], inicial['total_agendamentos'] + 1)
+        self.assertEqual(depois['total_clientes'], inicial['total_clientes'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            agendamento.delete()
+        self.assertEqual(dashboard.estatisticas_gerais(), inicial)
+
+    def test_receita_do_dia_com_agendamento_sem_preco(self):
+        # bulk_create (importação, benchmark_agenda) não passa pelo save(): preço fica vazio
+        servico = self.cenario.servicos[0]
+        hoje = date(2030, 1, 7)
+        Agendamento.objects.bulk_create([
+            Agendamento(cliente=self.cenario.cliente, servico=servico, data=hoje, hora=time(9)),
+            Agendamento(cliente=self.cenario.cliente, servico=servico, data=hoje, hora=time(10), preco=10),
+        ])
+        self.assertEqual(dashboard.agenda_do_dia(hoje)['receita_hoje'], servico.preco + 10)
+
+    def test_servico_novo_invalida_o_cadastro(self):
+        dashboard.estatisticas_gerais()
+        with self.captureOnCommitCallbacks(execute=True):
+            Servico.objects.create(nome='Pigmentação', duracao=timedelta(minutes=40), preco=60)
+        self.assertEqual(dashboard.estatisticas_gerais()['total_servicos'], Servico.objects.count())
+
+
+class ExportacaoTests(LimitesMixin, TestCase):
+    """O export lê o banco em lotes por chave e devolve exatamente os registros filtrados"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cenario = popular(clientes=40, dias=20)
+
+    def setUp(self):
+        self.entrar_como_funcionario(self.cenario.funcionario)
+
+    def test_csv_em_lotes_igual_ao_queryset_filtrado(self):
+        inicio, fim = self.cenario.hoje - timedelta(days=5), self.cenario.hoje + timedelta(days=5)
+        esperados = list(
+            Agendamento.objects.filter(data__range=(inicio, fim)).order_by('id').values_list('id', 'cliente__nome')
+        )
+        lotes = len(esperados) // 7 + 1
+        with self.assertLimites(lotes):
+            linhas = list(csv.reader(''.join(exportacao.linhas_agendamentos('csv', inicio, fim, tamanho_lote=7)).splitlines()))
+        self.assertEqual(linhas[0], [nome for nome, _ in exportacao.COLUNAS_AGENDAMENTOS])
+        self.assertEqual([(int(linha[0]), linha[4]) for linha in linhas[1:]], esperados)
+
+    def test_preco_do_agendamento_e_nao_o_atual_do_servico(self):
+        servico = self.cenario.servicos[0]
+        data = self.cenario.hoje + timedelta(days=90)
+        agendamento = Agendamento.objects.create(cliente=self.cenario.cliente, servico=servico, data=data, hora=time(9))
+        Agendamento.objects.bulk_create([Agendamento(cliente=self.cenario.cliente, servico=servico, data=data, hora=time(10))])
+        Servico.objects.filter(pk=servico.pk).update(preco=servico.preco + 25)
+
+        registros = [
+            json.loads(linha) for linha in exportacao.linhas_agendamentos('ndjson', data, data)
+        ]
+        self.assertEqual(
+            [Decimal(registro['preco']) for registro in registros],
+            [agendamento.preco, servico.preco + 25]
+        )
+        total = ResumoDiario.objects.filter(data=data, servico=servico).values_list('receita', flat=True).get()
+        self.assertEqual(Decimal(registros[0]['preco']), total)
+
+        resposta = self.client.get(reverse('historico_api'), {'inicio': data.isoformat(), 'fim': data.isoformat()})
+        self.assertEqual(
+            [Decimal(item['preco']) for item in resposta.json()['agendamentos']],
+            [servico.preco + 25, agendamento.preco]
+        )
+
+    def test_view_faz_streaming(self):
+        resposta = self.client.get(reverse('exportar_clientes'), {'formato': 'ndjson'})
+        self.assertTrue(resposta.streaming)
+        self.assertEqual(resposta['Content-Type'], exportacao.FORMATOS['ndjson'])
+        registros = [json.loads(linha) for linha in b''.join(resposta.streaming_content).decode().splitlines()]
+        self.assertEqual([registro['id'] for registro in registros], list(Cliente.objects.order_by('id').values_list('id', flat=True)))
+        self.assertNotIn('senha', registros[0])
+
+
+@override_settings(LIMITES_ATIVOS=False)
+class HistoricoPaginacaoTests(LimitesMixin, TestCase):
+    """Paginação por cursor do histórico: ordem total, cursores inválidos e filtros"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.funcionario = Funcionario.objects.create(nome='Recepção', email='recepcao@exemplo.com', senha='!')
+        cls.corte = Servico.objects.create(nome='Corte', duracao=timedelta(minutes=30), preco=40)
+        cls.barba = Servico.objects.create(nome='Barba', duracao=timedelta(minutes=20), preco=30)
+        cls.ana = Cliente.objects.create(nome='Ana', telefone='(11) 90000-0001', senha='!')
+        cls.bruno = Cliente.objects.create(nome='Bruno', telefone='(11) 90000-0002', senha='!')
+        # Vários agendamentos no mesmo (data, hora): só o id desempata
+        dia = date(2026, 3, 10)
+        Agendamento.objects.bulk_create([
+            Agendamento(cliente=cliente, servico=servico, data=dia + timedelta(days=dias), hora=time(hora),
+                        preco=servico.preco)
+            for dias in range(3)
+            for hora in (9, 10)
+            for cliente in (cls.ana, cls.bruno)
+            for servico in (cls.corte, cls.barba)
+        ])
+
+    def setUp(self):
+        self.entrar_como_funcionario(self.funcionario)
+
+    def paginas(self, parametros, limite):
+        ids, cursor = [], None
+        while True:
+            consulta = dict(parametros, limite=limite, **({'cursor': cursor} if cursor else {}))
+            resposta = self.client.get(reverse('historico_api'), consulta)
+            self.assertEqual(resposta.status_code, 200)
+            corpo = resposta.json()
+            self.assertLessEqual(len(corpo['agendamentos']), limite)
+            ids.extend(item['id'] for item in corpo['agendamentos'])
+            cursor = corpo['proximo_cursor']
+            if not cursor:
+                return ids
+
+    def test_empates_desfeitos_pelo_id_sem_repetir_nem_pular(self):
+        esperados = list(Agendamento.objects.order_by('-data', '-hora', '-id').values_list('id', flat=True))
+        for limite in (1, 3, 4, 5, len(esperados)):
+            with self.subTest(limite=limite):
+                self.assertEqual(self.paginas({}, limite), esperados)
+
+    def test_cursor_invalido_ou_adulterado(self):
+        valido = historico.codificar_cursor(Agendamento.objects.earliest('id'))
+        adulterados = [
+            'lixo', '%%%',
+            base64.urlsafe_b64encode(b'2026-03-10|09:00').decode(),
+            base64.urlsafe_b64encode(b'2026-13-10|09:00:00|1').decode(),
+            base64.urlsafe_b64encode(b'2026-03-10|09:00:00|um').decode(),
+            base64.urlsafe_b64encode(b'\xff\xfe').decode(),
+            valido[:-3],
+        ]
+        for cursor in adulterados:
+            with self.subTest(cursor=cursor):
+                resposta = self.client.get(reverse('historico_api'), {'cursor': cursor})
+                self.assertEqual(resposta.status_code, 400)
+                self.assertIn('error', resposta.json())
+
+    def test_filtros_combinados_com_o_cursor(self):
+        parametros = {'inicio': '2026-03-11', 'fim': '2026-03-12', 'servico': self.corte.id, 'cliente': 'ana'}
+        esperados = list(
+            Agendamento.objects.filter(
+                data__range=(date(2026, 3, 11), date(2026, 3, 12)), servico=self.corte, cliente=self.ana
+            ).order_by('-data', '-hora', '-id').values_list('id', flat=True)
+        )
+        self.assertEqual(len(esperados), 4)
+        self.assertEqual(self.paginas(parametros, 1), esperados)
+        self.assertEqual(self.paginas(parametros, 3), esperados)
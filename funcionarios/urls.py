@@ -1,6 +1,12 @@
+from django.conf import settings
 from django.urls import path
 from funcionarios.views import *
 
+# Sob ASGI, as APIs mais acessadas usam as views assíncronas
+if settings.ASYNC_VIEWS:
+    get_horarios_disponiveis = aget_horarios_disponiveis
+    get_servicos = aget_servicos
+
 urlpatterns = [
     path('', IndexFuncionarioView.as_view(), name='index_funcionario'),
     path('login/', LoginView.as_view(), name='login_funcionario'),
@@ -10,4 +16,9 @@ urlpatterns = [
     path('historico/', HistoricoAgendamentosView.as_view(), name='historico_agendamentos'),
     path('api/horarios-disponiveis/', get_horarios_disponiveis, name='horarios_disponiveis'),
     path('api/servicos/', get_servicos, name='get_servicos'),
+    path('api/dashboard/', dashboard_api, name='dashboard_api'),
+    path('api/relatorio/', relatorio_api, name='relatorio_api'),
+    path('api/historico/', historico_api, name='historico_api'),
+    path('exportar/agendamentos/', exportar, {'tipo': 'agendamentos'}, name='exportar_agendamentos'),
+    path('exportar/clientes/', exportar, {'tipo': 'clientes'}, name='exportar_clientes'),
 ]
\ No newline at end of file
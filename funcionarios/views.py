@@ -2,18 +2,27 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.views.generic import TemplateView
 from django.views import View
 from django.urls import reverse_lazy
-from django.contrib.auth.hashers import make_password, check_password
+from django.contrib.auth.hashers import make_password
 from django.views.decorators.csrf import csrf_protect
 from django.utils.decorators import method_decorator
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
 from django.views.decorators.http import require_http_methods
 
 from funcionarios.models import Funcionario, HorarioFuncionamento
 from servicos.models import Planos, Servico
-from agendamento.models import Agendamento
+from agendamento.models import ResumoDiario
+from agendamento import slots
+from agendamento.caching import adisponibilidade_em_cache, disponibilidade_em_cache, invalidar_tudo
+from agendamento.catalogo import acatalogo, catalogo, invalidar as invalidar_catalogo
+from agendamento.disponibilidade import acalcular_horarios_funcionario, calcular_horarios_funcionario
+from funcionarios.dashboard import estatisticas_dashboard
+from funcionarios import exportacao, historico
+from clientes.autenticacao import buscar_conta, normalizar_email, verificar_senha
 from clientes.models import Cliente
-from django.db.models import Count, Sum
-from datetime import date, datetime, time
+from django.db import transaction
+from django.db.models import Sum
+from django.db.models.functions import TruncMonth
+from datetime import date, datetime
 from django.contrib import messages
 
 # Mixin customizado para autenticação baseada em sessão
@@ -36,43 +45,43 @@ class IndexFuncionarioView(SessionLoginRequiredMixin, TemplateView):
         funcionario_id = request.session.get('funcionario_id')
         funcionario_nome = request.session.get('funcionario_nome')
         
-        # Busca estatísticas gerais
-        total_clientes = Cliente.objects.count()
-        total_agendamentos = Agendamento.objects.count()
-        total_servicos = Servico.objects.count()
-        
-        # Agendamentos do dia atual
-        hoje = date.today()
-        agendamentos_hoje = Agendamento.objects.filter(data=hoje).select_related('cliente', 'servico').order_by('hora')
-        
-        # Próximos agendamentos (próximos 7 dias)
-        proximos_agendamentos = Agendamento.objects.filter(
-            data__gte=hoje
-        ).select_related('cliente', 'servico').order_by('data', 'hora')[:10]
-        
-        # Receita total do dia
-        receita_hoje = Agendamento.objects.filter(data=hoje).aggregate(
-            total=Sum('servico__preco')
-        )['total'] or 0
-        
-        # Serviços mais populares
-        servicos_populares = Servico.objects.annotate(
-            total_agendamentos=Count('agendamento')
-        ).order_by('-total_agendamentos')[:5]
-        
+        # Estatísticas gerais (em cache) e agenda do dia
         context = {
             'funcionario_nome': funcionario_nome,
             'funcionario_id': funcionario_id,
-            'total_clientes': total_clientes,
-            'total_agendamentos': total_agendamentos,
-            'total_servicos': total_servicos,
-            'agendamentos_hoje': agendamentos_hoje,
-            'proximos_agendamentos': proximos_agendamentos,
-            'receita_hoje': receita_hoje,
-            'servicos_populares': servicos_populares,
+            **estatisticas_dashboard(),
         }
         return render(request, self.template_name, context)
 
+def dashboard_api(request):
+    """API com os dados do painel do funcionário, para atualização incremental"""
+    # Verifica se o funcionário está logado
+    if not request.session.get('funcionario_id'):
+        return JsonResponse({'success': False, 'message': 'Acesso negado. Faça login primeiro.'}, status=401)
+    
+    estatisticas = estatisticas_dashboard()
+    
+    def serializar(agendamento):
+        return {
+            'id': agendamento.id,
+            'cliente': agendamento.cliente.nome,
+            'servico': agendamento.servico.nome,
+            'preco': agendamento.preco_cobrado,
+            'data': agendamento.data.strftime('%Y-%m-%d'),
+            'hora': agendamento.hora.strftime('%H:%M'),
+            'observacoes': agendamento.observacoes or '',
+        }
+    
+    return JsonResponse({
+        'total_clientes': estatisticas['total_clientes'],
+        'total_agendamentos': estatisticas['total_agendamentos'],
+        'total_servicos': estatisticas['total_servicos'],
+        'receita_hoje': estatisticas['receita_hoje'],
+        'servicos_populares': estatisticas['servicos_populares'],
+        'agendamentos_hoje': [serializar(ag) for ag in estatisticas['agendamentos_hoje']],
+        'proximos_agendamentos': [serializar(ag) for ag in estatisticas['proximos_agendamentos']],
+    })
+
 class LoginView(View):
     def get(self, request):
         # Se já estiver logado, redireciona para a área do funcionário
@@ -89,13 +98,13 @@ class LoginView(View):
         senha = request.POST.get("senha")
 
         # Busca pelo email ou telefone
-        funcionario = Funcionario.objects.filter(email=usuario).first() or Funcionario.objects.filter(telefone=usuario).first()
+        funcionario = buscar_conta(Funcionario, usuario)
 
         if funcionario:
             if not funcionario.status:
                 return render(request, "login_funcionario.html", {"erro": "Sua conta está inativa. Entre em contato com o administrador."})
             
-            if check_password(senha, funcionario.senha):
+            if verificar_senha(funcionario, senha):
                 # Salva id e nome na sessão
                 request.session["funcionario_id"] = funcionario.id
                 request.session["funcionario_nome"] = funcionario.nome
@@ -149,7 +158,7 @@ class CadastroFuncionarioView(View):
             erros.append("Senhas não coincidem")
         
         # Verifica se email já existe
-        if Funcionario.objects.filter(email=email).exists():
+        if Funcionario.objects.filter(email=normalizar_email(email)).exists():
             erros.append("Email já cadastrado")
         
         if erros:
@@ -198,6 +207,8 @@ class GerenciarHorariosView(SessionLoginRequiredMixin, TemplateView):
                 'ativo': horario_existente.ativo if horario_existente else False,
                 'hora_inicio': horario_existente.hora_inicio.strftime('%H:%M') if horario_existente else '08:00',
                 'hora_fim': horario_existente.hora_fim.strftime('%H:%M') if horario_existente else '18:00',
+                'intervalo_minutos': horario_existente.intervalo_minutos if horario_existente else 30,
+                'encaixe': horario_existente.encaixe if horario_existente else False,
             })
         
         context = {
@@ -208,37 +219,55 @@ class GerenciarHorariosView(SessionLoginRequiredMixin, TemplateView):
     
     def post(self, request, *args, **kwargs):
         try:
+            existentes = {horario.dia_semana: horario for horario in HorarioFuncionamento.objects.all()}
+            novos, alterados, dias_alterados = [], [], set()
+
             # Processa cada dia da semana
             for dia, nome_dia in HorarioFuncionamento.DIAS_SEMANA:
                 ativo = request.POST.get(f'dia_{dia}_ativo') == 'on'
                 hora_inicio = request.POST.get(f'dia_{dia}_inicio')
                 hora_fim = request.POST.get(f'dia_{dia}_fim')
-                
+                intervalo = max(1, int(request.POST.get(f'dia_{dia}_intervalo') or 30))
+                encaixe = request.POST.get(f'dia_{dia}_encaixe') == 'on'
+                horario = existentes.get(dia)
+
                 if ativo and hora_inicio and hora_fim:
-                    # Cria ou atualiza o horário
-                    horario, created = HorarioFuncionamento.objects.get_or_create(
-                        dia_semana=dia,
-                        defaults={
-                            'hora_inicio': hora_inicio,
-                            'hora_fim': hora_fim,
-                            'ativo': True
-                        }
-                    )
-                    
-                    if not created:
-                        horario.hora_inicio = hora_inicio
-                        horario.hora_fim = hora_fim
-                        horario.ativo = True
-                        horario.save()
-                else:
+                    valores = {
+                        'hora_inicio': datetime.strptime(hora_inicio, '%H:%M').time(),
+                        'hora_fim': datetime.strptime(hora_fim, '%H:%M').time(),
+                        'intervalo_minutos': intervalo,
+                        'encaixe': encaixe,
+                        'ativo': True,
+                    }
+                    if horario is None:
+                        novos.append(HorarioFuncionamento(dia_semana=dia, **valores))
+                        dias_alterados.add(dia)
+                        continue
+                elif horario is not None:
                     # Desativa o horário se não estiver marcado
-                    try:
-                        horario = HorarioFuncionamento.objects.get(dia_semana=dia)
-                        horario.ativo = False
-                        horario.save()
-                    except HorarioFuncionamento.DoesNotExist:
-                        pass
-            
+                    valores = {'ativo': False}
+                else:
+                    continue
+
+                if any(getattr(horario, campo) != valor for campo, valor in valores.items()):
+                    for campo, valor in valores.items():
+                        setattr(horario, campo, valor)
+                    alterados.append(horario)
+                    dias_alterados.add(dia)
+
+            if dias_alterados:
+                # Uma escrita para a semana inteira: bulk_* não dispara os sinais,
+                # então os caches e a grade dos dias alterados são refeitos aqui
+                with transaction.atomic():
+                    HorarioFuncionamento.objects.bulk_create(novos)
+                    HorarioFuncionamento.objects.bulk_update(
+                        alterados, ['hora_inicio', 'hora_fim', 'intervalo_minutos', 'encaixe', 'ativo']
+                    )
+                    transaction.on_commit(invalidar_catalogo)
+                    transaction.on_commit(invalidar_tudo)
+                    if slots.ativo():
+                        transaction.on_commit(lambda: slots.regenerar(dias_semana=dias_alterados))
+
             messages.success(request, 'Horários de funcionamento atualizados com sucesso!')
             return redirect('gerenciar_horarios')
             
@@ -246,51 +275,60 @@ class GerenciarHorariosView(SessionLoginRequiredMixin, TemplateView):
             messages.error(request, f'Erro ao salvar horários: {str(e)}')
             return redirect('gerenciar_horarios')
 
+def _parametros_horarios(request):
+    """Data e, opcionalmente, serviço e barbeiro da consulta de horários: (data, servico_id, funcionario_id)"""
+    servico_id = request.GET.get('servico_id') or None
+    funcionario_id = request.GET.get('funcionario_id') or None
+    return (
+        datetime.strptime(request.GET['data'], '%Y-%m-%d').date(),
+        int(servico_id) if servico_id else None,
+        int(funcionario_id) if funcionario_id else None,
+    )
+
 def get_horarios_disponiveis(request):
-    """API para retornar horários disponíveis em JSON"""
+    """
+    API para retornar horários disponíveis em JSON. Aceita servico_id e
+    funcionario_id opcionais; sem serviço, lista os intervalos livres do dia.
+    """
     data_agendamento = request.GET.get('data')
     if not data_agendamento:
         return JsonResponse({'error': 'Data não fornecida'}, status=400)
     
     try:
-        data_obj = datetime.strptime(data_agendamento, '%Y-%m-%d').date()
-        dia_semana = data_obj.weekday()
-        
-        # Busca horário de funcionamento para o dia
-        try:
-            horario_funcionamento = HorarioFuncionamento.objects.get(
-                dia_semana=dia_semana, 
-                ativo=True
-            )
-        except HorarioFuncionamento.DoesNotExist:
-            return JsonResponse({'horarios': []})
-        
-        # Busca agendamentos existentes para o dia
-        agendamentos = Agendamento.objects.filter(data=data_obj).values_list('hora', flat=True)
-        horarios_ocupados = [ag.hour * 60 + ag.minute for ag in agendamentos]
-        
-        # Gera horários disponíveis
-        horarios_disponiveis = []
-        inicio = horario_funcionamento.hora_inicio
-        fim = horario_funcionamento.hora_fim
+        data_obj, servico_id, funcionario_id = _parametros_horarios(request)
+        resultado = disponibilidade_em_cache(
+            data_obj,
+            f'funcionario:servico:{servico_id}:funcionario:{funcionario_id}',
+            lambda: calcular_horarios_funcionario(data_obj, servico_id, funcionario_id)
+        )
+        return JsonResponse(resultado)
         
-        # Converte para minutos para facilitar cálculos
-        inicio_minutos = inicio.hour * 60 + inicio.minute
-        fim_minutos = fim.hour * 60 + fim.minute
-        
-        # Gera horários de 30 em 30 minutos
-        for minutos in range(inicio_minutos, fim_minutos, 30):
-            if minutos not in horarios_ocupados:
-                hora = time(minutos // 60, minutos % 60)
-                horarios_disponiveis.append({
-                    'hora': hora.strftime('%H:%M'),
-                    'display': hora.strftime('%H:%M')
-                })
-        
-        return JsonResponse({'horarios': horarios_disponiveis})
+    except ValueError:
+        return JsonResponse({'error': 'Formato de data inválido'}, status=400)
+    except Servico.DoesNotExist:
+        return JsonResponse({'error': 'Serviço não encontrado'}, status=400)
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+async def aget_horarios_disponiveis(request):
+    """Versão assíncrona (ASGI) de get_horarios_disponiveis"""
+    data_agendamento = request.GET.get('data')
+    if not data_agendamento:
+        return JsonResponse({'error': 'Data não fornecida'}, status=400)
+    
+    try:
+        data_obj, servico_id, funcionario_id = _parametros_horarios(request)
+        resultado = await adisponibilidade_em_cache(
+            data_obj,
+            f'funcionario:servico:{servico_id}:funcionario:{funcionario_id}',
+            lambda: acalcular_horarios_funcionario(data_obj, servico_id, funcionario_id)
+        )
+        return JsonResponse(resultado)
         
     except ValueError:
         return JsonResponse({'error': 'Formato de data inválido'}, status=400)
+    except Servico.DoesNotExist:
+        return JsonResponse({'error': 'Serviço não encontrado'}, status=400)
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
 
@@ -298,14 +336,59 @@ class HistoricoAgendamentosView(SessionLoginRequiredMixin, TemplateView):
     template_name = 'historico_agendamentos.html'
     
     def get(self, request, *args, **kwargs):
-        # Busca todos os agendamentos com informações do cliente e serviço
-        agendamentos = Agendamento.objects.select_related('cliente', 'servico').order_by('-data', '-hora')
+        # Renderiza apenas a primeira página; as demais vêm da API conforme a rolagem
+        try:
+            agendamentos, proximo_cursor = historico.pagina(historico.filtrar(request.GET))
+        except ValueError:
+            messages.error(request, 'Filtros inválidos.')
+            agendamentos, proximo_cursor = [], None
         
         context = {
             'agendamentos': agendamentos,
+            'proximo_cursor': proximo_cursor,
+            'filtros': request.GET,
+            'servicos': Servico.objects.values('id', 'nome'),
         }
         return render(request, self.template_name, context)
 
+def historico_api(request):
+    """API paginada (por cursor) do histórico de agendamentos"""
+    # Verifica se o funcionário está logado
+    if not request.session.get('funcionario_id'):
+        return JsonResponse({'success': False, 'message': 'Acesso negado. Faça login primeiro.'}, status=401)
+    
+    try:
+        agendamentos, proximo_cursor = historico.pagina(
+            historico.filtrar(request.GET),
+            request.GET.get('cursor'),
+            historico.tamanho_pagina(request.GET.get('limite', historico.TAMANHO_PAGINA))
+        )
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    return JsonResponse({
+        'agendamentos': [
+            {
+                'id': agendamento.id,
+                'cliente': agendamento.cliente.nome,
+                'telefone': agendamento.cliente.telefone,
+                'servico': agendamento.servico.nome,
+                'preco': agendamento.preco_cobrado,
+                'data': agendamento.data.strftime('%d/%m/%Y'),
+                'hora': agendamento.hora.strftime('%H:%M'),
+                'observacoes': agendamento.observacoes or '',
+            }
+            for agendamento in agendamentos
+        ],
+        'proximo_cursor': proximo_cursor,
+    })
+
+
+def _servicos_resumidos(cadastro):
+    return [
+        {'id': servico.id, 'nome': servico.nome, 'preco': servico.preco}
+        for servico in cadastro.servicos.values()
+    ]
 
 @csrf_protect
 def get_servicos(request):
@@ -314,5 +397,73 @@ def get_servicos(request):
     if not request.session.get('funcionario_id'):
         return JsonResponse({'success': False, 'message': 'Acesso negado. Faça login primeiro.'}, status=401)
     
-    servicos = Servico.objects.all().values('id', 'nome', 'preco')
-    return JsonResponse({'servicos': list(servicos)})
+    return JsonResponse({'servicos': _servicos_resumidos(catalogo())})
+
+@csrf_protect
+async def aget_servicos(request):
+    """Versão assíncrona (ASGI) de get_servicos"""
+    # Verifica se o funcionário está logado
+    if not await request.session.aget('funcionario_id'):
+        return JsonResponse({'success': False, 'message': 'Acesso negado. Faça login primeiro.'}, status=401)
+    
+    return JsonResponse({'servicos': _servicos_resumidos(await acatalogo())})
+
+def relatorio_api(request):
+    """API com receita e agendamentos por mês, lida da tabela de resumo diário"""
+    # Verifica se o funcionário está logado
+    if not request.session.get('funcionario_id'):
+        return JsonResponse({'success': False, 'message': 'Acesso negado. Faça login primeiro.'}, status=401)
+    
+    try:
+        inicio = datetime.strptime(request.GET.get('inicio', ''), '%Y-%m-%d').date()
+        fim = datetime.strptime(request.GET.get('fim', ''), '%Y-%m-%d').date()
+    except ValueError:
+        return JsonResponse({'error': 'Informe início e fim no formato AAAA-MM-DD'}, status=400)
+    
+    meses = (
+        ResumoDiario.objects
+        .filter(data__range=(inicio, fim))
+        .annotate(mes=TruncMonth('data'))
+        .values('mes', 'servico__nome')
+        .annotate(quantidade=Sum('quantidade'), receita=Sum('receita'), minutos=Sum('minutos'))
+        .order_by('mes', 'servico__nome')
+    )
+    
+    return JsonResponse({'meses': [
+        {
+            'mes': linha['mes'].strftime('%Y-%m'),
+            'servico': linha['servico__nome'],
+            'quantidade': linha['quantidade'],
+            'receita': linha['receita'],
+            'minutos': linha['minutos'],
+        }
+        for linha in meses
+    ]})
+
+def exportar(request, tipo):
+    """Exporta agendamentos ou clientes em CSV ou NDJSON, em streaming"""
+    # Verifica se o funcionário está logado
+    if not request.session.get('funcionario_id'):
+        return JsonResponse({'success': False, 'message': 'Acesso negado. Faça login primeiro.'}, status=401)
+    
+    formato = request.GET.get('formato', 'csv')
+    if formato not in exportacao.FORMATOS:
+        return JsonResponse({'error': 'Formato deve ser csv ou ndjson'}, status=400)
+    
+    try:
+        if tipo == 'agendamentos':
+            inicio = request.GET.get('inicio')
+            fim = request.GET.get('fim')
+            linhas = exportacao.linhas_agendamentos(
+                formato,
+                datetime.strptime(inicio, '%Y-%m-%d').date() if inicio else None,
+                datetime.strptime(fim, '%Y-%m-%d').date() if fim else None
+            )
+        else:
+            linhas = exportacao.linhas_clientes(formato)
+    except ValueError:
+        return JsonResponse({'error': 'Formato de data inválido'}, status=400)
+    
+    response = StreamingHttpResponse(linhas, content_type=exportacao.FORMATOS[formato])
+    response['Content-Disposition'] = f'attachment; filename="{tipo}.{formato}"'
+    return response
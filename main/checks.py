@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.core import checks
+
+# Caches que vivem dentro de cada processo (ou não guardam nada)
+CACHES_LOCAIS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@checks.register(checks.Tags.caches)
+def sessao_em_cache_compartilhado(app_configs, **kwargs):
+    """
+    Com cached_db, a sessão lida do cache vale mais que a tabela: num cache por
+    processo, o logout feito num worker não chega aos outros, que seguem
+    aceitando a sessão até ela sair do cache local deles.
+    """
+    if settings.SESSION_ENGINE != 'django.contrib.sessions.backends.cached_db':
+        return []
+    backend = settings.CACHES.get(settings.SESSION_CACHE_ALIAS, {}).get('BACKEND')
+    if backend not in CACHES_LOCAIS:
+        return []
+    return [checks.Error(
+        f"SESSAO_BACKEND='cached_db' com o cache '{settings.SESSION_CACHE_ALIAS}' ({backend}), "
+        'que não é compartilhado entre processos.',
+        hint='Aponte SESSAO_CACHE para um cache Redis/Memcached compartilhado ou use '
+             "SESSAO_BACKEND='db'. Com um único processo, inclua main.E001 em SILENCED_SYSTEM_CHECKS.",
+        id='main.E001',
+    )]
@@ -0,0 +1,80 @@
+import statistics
+import time as _time
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+BACKENDS = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'cookie': 'django.contrib.sessions.backends.signed_cookies',
+}
+
+
+class Desfazer(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede o custo por requisição de cada backend de sessão: o SessionMiddleware '
+        'carregando uma sessão de cliente logado e a view lendo cliente_id, como o '
+        'SessionLoginRequiredMixin. As sessões criadas são desfeitas no fim.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requisicoes', type=int, default=2000,
+                            help='Requisições medidas por backend (padrão: 2.000)')
+        parser.add_argument('--backend', choices=sorted(BACKENDS), action='append',
+                            help='Mede só este backend (pode repetir). Padrão: todos')
+
+    def handle(self, *args, **options):
+        if options['requisicoes'] < 1:
+            raise CommandError('--requisicoes deve ser positivo')
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'Mediana de {options["requisicoes"]} requisições com sessão (cache: {settings.SESSION_CACHE_ALIAS})'
+        ))
+        try:
+            with transaction.atomic():
+                for nome in options['backend'] or list(BACKENDS):
+                    self.medir(nome, options['requisicoes'])
+                raise Desfazer
+        except Desfazer:
+            pass
+
+    def medir(self, nome, requisicoes):
+        SessionStore = import_module(BACKENDS[nome]).SessionStore
+        sessao = SessionStore()
+        sessao['cliente_id'] = 1
+        sessao['cliente_nome'] = 'Cliente Benchmark'
+        sessao.save()
+
+        def view(request):
+            request.session.get('cliente_id')
+            return HttpResponse()
+
+        middleware = SessionMiddleware(view)
+        middleware.SessionStore = SessionStore
+        fabrica = RequestFactory()
+        fabrica.cookies[settings.SESSION_COOKIE_NAME] = sessao.session_key
+
+        middleware(fabrica.get('/'))  # aquece o cache do cached_db
+        tempos = []
+        with CaptureQueriesContext(connection) as consultas:
+            for _ in range(requisicoes):
+                request = fabrica.get('/')
+                comeco = _time.perf_counter()
+                middleware(request)
+                tempos.append((_time.perf_counter() - comeco) * 1_000_000)
+
+        self.stdout.write(
+            f'  {nome:<10} {statistics.median(tempos):>8.1f} µs/requisição'
+            f'  {len(consultas) / requisicoes:>5.2f} consultas/requisição'
+            f'  cookie de {len(sessao.session_key)} bytes'
+        )
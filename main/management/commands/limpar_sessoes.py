@@ -0,0 +1,51 @@
+import time as _time
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+# Backends que guardam as sessões na tabela django_session
+BACKENDS_COM_TABELA = (
+    'django.contrib.sessions.backends.db',
+    'django.contrib.sessions.backends.cached_db',
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Apaga as sessões expiradas da tabela django_session em lotes pequenos, cada '
+        'um em sua transação, para não travar a tabela como um único DELETE grande. '
+        'Agende diariamente (ex.: cron).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=1000,
+                            help='Sessões apagadas por transação (padrão: 1.000)')
+        parser.add_argument('--pausa', type=float, default=0,
+                            help='Segundos de espera entre lotes, para aliviar o banco (padrão: 0)')
+
+    def handle(self, *args, **options):
+        if options['lote'] < 1 or options['pausa'] < 0:
+            raise CommandError('--lote deve ser positivo e --pausa não pode ser negativa.')
+        if settings.SESSION_ENGINE not in BACKENDS_COM_TABELA:
+            self.stdout.write(f'{settings.SESSION_ENGINE} não guarda sessões no banco: nada a limpar.')
+            return
+
+        agora = timezone.now()
+        total = 0
+        while True:
+            with transaction.atomic():
+                chaves = list(
+                    Session.objects.filter(expire_date__lt=agora)
+                    .values_list('session_key', flat=True)[:options['lote']]
+                )
+                if not chaves:
+                    break
+                removidas, _ = Session.objects.filter(session_key__in=chaves).delete()
+            total += removidas
+            if options['pausa']:
+                _time.sleep(options['pausa'])
+
+        self.stdout.write(self.style.SUCCESS(f'{total} sessões expiradas removidas.'))
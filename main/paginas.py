@@ -0,0 +1,90 @@
+import time as _time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+# Versão das páginas públicas: muda quando Planos ou Servico são editados
+CHAVE_VERSAO_PAGINAS = 'paginas:versao'
+
+
+def _agora():
+    return int(_time.time() * 1000)
+
+
+def versao_paginas():
+    """
+    Versão atual das páginas públicas. É o instante (em ms) da última edição
+    do catálogo, então também serve de Last-Modified.
+    """
+    versao = cache.get(CHAVE_VERSAO_PAGINAS)
+    if versao is None:
+        cache.add(CHAVE_VERSAO_PAGINAS, _agora(), None)
+        versao = cache.get(CHAVE_VERSAO_PAGINAS)
+    return versao
+
+
+def invalidar_paginas():
+    """Descarta as páginas e fragmentos em cache de todos os processos"""
+    atual = cache.get(CHAVE_VERSAO_PAGINAS) or 0
+    cache.set(CHAVE_VERSAO_PAGINAS, max(_agora(), atual + 1), None)
+
+
+def contexto_fragmentos():
+    """Variáveis usadas pelos {% cache %} dos templates públicos"""
+    return {'versao_paginas': versao_paginas(), 'paginas_cache_timeout': settings.PAGINAS_CACHE_TIMEOUT}
+
+
+def _cacheavel(request, resposta):
+    # Páginas com token CSRF ou que definem cookies são de um visitante só
+    return (
+        resposta.status_code == 200
+        and not resposta.cookies
+        and not request.META.get('CSRF_COOKIE_NEEDS_UPDATE')
+    )
+
+
+def pagina_publica(view):
+    """
+    Guarda a página inteira no cache, pela versão das páginas públicas, para
+    visitantes anônimos (sem cookie de sessão), e responde GETs condicionais
+    (If-None-Match/If-Modified-Since) com 304. Quem tem sessão vê a página
+    renderizada normalmente, já que o menu mostra o nome do cliente.
+    """
+    @wraps(view)
+    def _view(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD') or settings.SESSION_COOKIE_NAME in request.COOKIES:
+            return view(request, *args, **kwargs)
+
+        versao = versao_paginas()
+        etag = quote_etag(str(versao))
+        ultima_modificacao = versao // 1000
+        resposta = get_conditional_response(request, etag=etag, last_modified=ultima_modificacao)
+        if resposta is None:
+            # Campanhas acrescentam parâmetros (utm_*) que não mudam a página: a chave usa só o caminho
+            chave = f'paginas:{versao}:{request.path}'
+            guardada = cache.get(chave)
+            if guardada is not None:
+                resposta = HttpResponse(guardada['conteudo'], content_type=guardada['tipo'])
+            else:
+                resposta = view(request, *args, **kwargs)
+                if hasattr(resposta, 'render'):
+                    resposta.render()
+                if not _cacheavel(request, resposta):
+                    return resposta
+                cache.set(
+                    chave,
+                    {'conteudo': resposta.content, 'tipo': resposta['Content-Type']},
+                    settings.PAGINAS_CACHE_TIMEOUT
+                )
+
+        resposta.headers.setdefault('ETag', etag)
+        resposta.headers.setdefault('Last-Modified', http_date(ultima_modificacao))
+        patch_cache_control(resposta, public=True, max_age=settings.PAGINAS_MAX_AGE)
+        patch_vary_headers(resposta, ('Cookie',))
+        return resposta
+
+    return _view
@@ -0,0 +1,14 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from main.paginas import invalidar_paginas
+from servicos.models import Planos, Servico
+
+
+@receiver(post_save, sender=Planos)
+@receiver(post_delete, sender=Planos)
+@receiver(post_save, sender=Servico)
+@receiver(post_delete, sender=Servico)
+def invalidar_paginas_publicas(sender, instance, **kwargs):
+    transaction.on_commit(invalidar_paginas)
@@ -1,3 +1,484 @@
-from django.test import TestCase
+import json
+import threading
+from datetime import date, time, timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from agendamento.models import Agendamento, PreReserva
+from agendamento.views import MeusAgendamentosView
+from clientes.models import Cliente
+from core.instrumentacao import InstrumentacaoMiddleware
+from core.limites import consumir
+from core.fabricas import SENHA, LimitesMixin, descartar_caches, popular
+from funcionarios.models import HorarioFuncionamento
+from main.checks import sessao_em_cache_compartilhado
+from servicos.models import Servico
+
+
+def dia_util(data):
+    return data if data.weekday() != 6 else data + timedelta(days=1)
+
+
+@override_settings(LIMITES_ATIVOS=False)
+class ConsultasPaginasClienteTests(LimitesMixin, TestCase):
+    """
+    Limites de consultas SQL e de tempo das URLs de main/urls.py com a
+    barbearia populada e os caches vazios. Os limites não dependem do volume:
+    um N+1 (ex.: buscar o serviço de cada agendamento) estoura na hora.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cenario = popular()
+        cls.cliente = cls.cenario.cliente
+        cls.servico = cls.cenario.servicos[0]
+        # Dia com agenda cheia e dia livre, depois dos agendamentos gerados
+        cls.dia_lotado = Agendamento.objects.filter(data__gt=cls.cenario.hoje).earliest('data').data
+        cls.dia_livre = dia_util(cls.cenario.hoje + timedelta(days=45))
+
+    def setUp(self):
+        descartar_caches()
+
+    def pedir(self, metodo, url, dados=None, consultas=0, status=200):
+        with self.assertLimites(consultas):
+            resposta = getattr(self.client, metodo)(url, dados or {})
+            if resposta.streaming:
+                b''.join(resposta.streaming_content)
+        self.assertEqual(resposta.status_code, status)
+        return resposta
+
+    def test_inicio(self):
+        self.pedir('get', reverse('index'), consultas=1)
+        # Visitante anônimo: a segunda visita sai do cache de páginas
+        self.pedir('get', reverse('index'), consultas=0)
+
+    def test_servicos(self):
+        self.pedir('get', reverse('servicos'), consultas=4)
+
+    def test_contato(self):
+        self.pedir('get', reverse('contato'), consultas=0)
+
+    def test_login(self):
+        self.pedir('get', reverse('login'), consultas=0)
+        self.pedir('post', reverse('login'), {'usuario': self.cliente.telefone, 'senha': SENHA}, consultas=5, status=302)
+
+    def test_login_com_senha_errada(self):
+        resposta = self.pedir('post', reverse('login'), {'usuario': self.cliente.email, 'senha': 'errada'}, consultas=1)
+        self.assertContains(resposta, 'Senha incorreta')
+
+    def test_cadastro(self):
+        self.pedir('get', reverse('cadastro'), consultas=1)
+        self.pedir('post', reverse('cadastro'), {
+            'nome': 'Cliente Novo', 'email': 'novo@exemplo.com', 'telefone': '(11) 98765-4321',
+            'senha': 'segredo123', 'confirmar_senha': 'segredo123',
+        }, consultas=3)
+        self.assertTrue(Cliente.objects.filter(email='novo@exemplo.com').exists())
+
+    def test_agenda(self):
+        self.entrar_como_cliente(self.cliente)
+        self.pedir('get', reverse('agenda'), consultas=5)
+
+    def test_agendar(self):
+        self.entrar_como_cliente(self.cliente)
+        # Primeira reserva do dia com os caches vazios: carrega o catálogo (4) e
+        # cria as linhas de DiaAgenda e ResumoDiario do dia (3 cada, com savepoints)
+        self.pedir('post', reverse('agenda'), {
+            'servico': self.servico.id, 'data': self.dia_livre.isoformat(), 'horario': '10:00',
+        }, consultas=22, status=302)
+        # Caminho normal: sessão, limpeza das pré-reservas expiradas, bloqueio do
+        # dia, ocupação (pré-reservas + agendamentos), gravação e resumo
+        self.pedir('post', reverse('agenda'), {
+            'servico': self.servico.id, 'data': self.dia_livre.isoformat(), 'horario': '11:00',
+        }, consultas=12, status=302)
+        self.assertEqual(Agendamento.objects.filter(cliente=self.cliente, data=self.dia_livre).count(), 2)
+
+    def test_meus_agendamentos(self):
+        self.entrar_como_cliente(self.cliente)
+        resposta = self.pedir('get', reverse('my-agendamento'), consultas=3)
+        self.assertGreaterEqual(len(resposta.context['agendamentos']), 40)
+
+    def test_meus_agendamentos_view(self):
+        # MeusAgendamentosView não está nas URLs, mas renderiza o mesmo template
+        request = RequestFactory().get('/meus-agendamentos/')
+        request.session = {'cliente_id': self.cliente.id}
+        with self.assertLimites(1):
+            MeusAgendamentosView.as_view()(request)
+
+    def test_horarios_disponiveis(self):
+        self.pedir('get', '/horarios-disponiveis/', {
+            'data': self.dia_lotado.isoformat(), 'servico_id': self.servico.id,
+        }, consultas=6)
+
+    def test_horarios_disponiveis_periodo(self):
+        self.pedir('get', reverse('horarios_disponiveis_periodo'), {
+            'inicio': self.dia_lotado.isoformat(),
+            'fim': (self.dia_lotado + timedelta(days=13)).isoformat(),
+            'servico_id': self.servico.id,
+        }, consultas=6)
+
+    @override_settings(SSE_ATIVO=True)
+    def test_horarios_disponiveis_stream(self):
+        # Sem tempo de conexão, o stream envia a disponibilidade atual e termina
+        with mock.patch('agendamento.views.SSE_DURACAO_MAXIMA', 0):
+            self.pedir('get', reverse('horarios_disponiveis_stream'), {
+                'data': self.dia_lotado.isoformat(), 'servico_id': self.servico.id,
+            }, consultas=6)
+
+    def test_pre_reserva(self):
+        self.entrar_como_cliente(self.cliente)
+        self.pedir('post', reverse('pre_reserva'), {
+            'servico': self.servico.id, 'data': self.dia_livre.isoformat(), 'horario': '11:00',
+        }, consultas=17)
+        self.assertTrue(PreReserva.objects.filter(cliente=self.cliente).exists())
+        self.pedir('delete', reverse('pre_reserva'), consultas=3)
+
+    def test_deletar_agendamento(self):
+        self.entrar_como_cliente(self.cliente)
+        agendamento = Agendamento.objects.filter(cliente=self.cliente).first()
+        with self.assertLogs('agendamento.views', 'INFO'):
+            self.pedir('post', reverse('deletar-agendamento', args=[agendamento.id]), consultas=6)
+        self.assertFalse(Agendamento.objects.filter(pk=agendamento.pk).exists())
+
+    def test_logout(self):
+        self.entrar_como_cliente(self.cliente)
+        self.pedir('get', reverse('logout'), consultas=2, status=302)
+
+
+@override_settings(LIMITES_ATIVOS=False)
+class PaginasPublicasTests(TestCase):
+    """Páginas públicas em cache para visitantes anônimos, com ETag/Last-Modified e 304"""
+
+    def setUp(self):
+        descartar_caches()
+        self.servico = Servico.objects.create(nome='Corte', duracao=timedelta(minutes=45), preco=30)
+
+    def test_pagina_sai_do_cache_e_ignora_parametros_de_campanha(self):
+        primeira = self.client.get(reverse('servicos'))
+        self.assertContains(primeira, 'Corte')
+        with self.assertNumQueries(0):
+            segunda = self.client.get(reverse('servicos'), {'utm_source': 'instagram'})
+        self.assertEqual(segunda.content, primeira.content)
+        self.assertEqual(segunda['ETag'], primeira['ETag'])
+        self.assertIn('Cookie', segunda['Vary'])
+        self.assertIn('public', segunda['Cache-Control'])
+
+    def test_get_condicional_responde_304(self):
+        primeira = self.client.get(reverse('index'))
+        with self.assertNumQueries(0):
+            resposta = self.client.get(reverse('index'), HTTP_IF_NONE_MATCH=primeira['ETag'])
+        self.assertEqual(resposta.status_code, 304)
+        self.assertEqual(resposta.content, b'')
+        resposta = self.client.get(reverse('index'), HTTP_IF_MODIFIED_SINCE=primeira['Last-Modified'])
+        self.assertEqual(resposta.status_code, 304)
+
+    def test_editar_servico_muda_a_versao(self):
+        primeira = self.client.get(reverse('servicos'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.servico.nome = 'Corte Degradê'
+            self.servico.save()
+        resposta = self.client.get(reverse('servicos'), HTTP_IF_NONE_MATCH=primeira['ETag'])
+        self.assertEqual(resposta.status_code, 200)
+        self.assertNotEqual(resposta['ETag'], primeira['ETag'])
+        self.assertContains(resposta, 'Corte Degradê')
+
+    def test_visitante_com_sessao_ve_a_pagina_renderizada(self):
+        self.client.get(reverse('servicos'))
+        self.client.cookies[settings.SESSION_COOKIE_NAME] = 'sessao'
+        resposta = self.client.get(reverse('servicos'))
+        self.assertEqual(resposta.status_code, 200)
+        self.assertNotIn('ETag', resposta)
+        self.assertTrue(resposta.templates)
+
+    def test_pagina_com_token_csrf_nao_vai_para_o_cache(self):
+        self.client.get(reverse('contato'))
+        resposta = self.client.get(reverse('contato'))
+        # Renderizada de novo: o token CSRF é de cada visitante
+        self.assertTrue(resposta.templates)
+
+
+@override_settings(SSE_ATIVO=True)
+class StreamDisponibilidadeTests(TestCase):
+    """Stream (SSE) da disponibilidade: ligado só por SSE_ATIVO e sujeito ao limite por IP"""
+
+    def setUp(self):
+        descartar_caches()
+        self.cliente = Cliente.objects.create(nome='Cliente', telefone='11999990000', senha='x')
+        self.servico = Servico.objects.create(nome='Corte', duracao=timedelta(minutes=45), preco=30)
+        for dia in range(7):
+            HorarioFuncionamento.objects.create(dia_semana=dia, hora_inicio=time(8), hora_fim=time(12))
+        self.data = date.today() + timedelta(days=2)
+        self.parametros = {'data': self.data.isoformat(), 'servico_id': self.servico.id}
+
+    def eventos(self, resposta):
+        for parte in resposta.streaming_content:
+            parte = parte.decode()
+            if parte.startswith('event: horarios'):
+                yield json.loads(parte.split('data: ', 1)[1])
+
+    def test_envia_alteracoes_da_data(self):
+        resposta = self.client.get(reverse('horarios_disponiveis_stream'), self.parametros)
+        self.assertEqual(resposta['Content-Type'], 'text/event-stream')
+        eventos = self.eventos(resposta)
+        self.assertEqual(next(eventos)['horarios_ocupados'], [])
+        with self.captureOnCommitCallbacks(execute=True):
+            Agendamento.objects.create(cliente=self.cliente, servico=self.servico, data=self.data, hora=time(9))
+        self.assertEqual(next(eventos)['horarios_ocupados'][0]['inicio'], '09:00')
+        resposta.close()
+
+    @override_settings(SSE_ATIVO=False)
+    def test_desligado_a_agenda_consulta_periodicamente(self):
+        resposta = self.client.get(reverse('horarios_disponiveis_stream'), self.parametros)
+        self.assertEqual(resposta.status_code, 404)
+        sessao = self.client.session
+        sessao['cliente_id'] = self.cliente.id
+        sessao.save()
+        resposta = self.client.get(reverse('agenda'))
+        self.assertFalse(resposta.context['sse_ativo'])
+        self.assertContains(resposta, 'const usarStream = false')
+
+    @override_settings(LIMITES_ATIVOS=True)
+    def test_conexoes_limitadas_por_ip(self):
+        capacidade = settings.LIMITES_REQUISICOES['horarios_disponiveis_stream']['ip'][0]
+        with mock.patch('agendamento.views.SSE_DURACAO_MAXIMA', 0):
+            for _ in range(capacidade):
+                resposta = self.client.get(reverse('horarios_disponiveis_stream'), self.parametros)
+                self.assertEqual(resposta.status_code, 200)
+                b''.join(resposta.streaming_content)
+        resposta = self.client.get(reverse('horarios_disponiveis_stream'), self.parametros)
+        self.assertEqual(resposta.status_code, 429)
+        self.assertIn('Retry-After', resposta)
+
+
+@override_settings(LIMITES_ATIVOS=True)
+class LimiteRequisicoesTests(TestCase):
+    """Limites por IP e por conta do LimiteRequisicoesMiddleware"""
+
+    def setUp(self):
+        descartar_caches()
+        self.agora = 1_000_000.0
+        relogio = mock.patch('core.limites._time.time', lambda: self.agora)
+        relogio.start()
+        self.addCleanup(relogio.stop)
+
+    def tentar_login(self, usuario, ip='10.0.0.1'):
+        return self.client.post(reverse('login'), {'usuario': usuario, 'senha': 'errada'}, REMOTE_ADDR=ip)
+
+    def test_recusa_depois_da_capacidade_com_retry_after(self):
+        capacidade = settings.LIMITES_REQUISICOES['login']['conta'][0]
+        for _ in range(capacidade):
+            self.assertEqual(self.tentar_login('cliente@exemplo.com').status_code, 200)
+        with self.assertNumQueries(0):
+            resposta = self.tentar_login('Cliente@Exemplo.com ')
+        self.assertEqual(resposta.status_code, 429)
+        self.assertIn('error', resposta.json())
+        self.assertGreaterEqual(int(resposta['Retry-After']), 1)
+
+    def test_reabastece_com_o_tempo(self):
+        capacidade, por_minuto = settings.LIMITES_REQUISICOES['login']['conta']
+        for _ in range(capacidade):
+            self.tentar_login('cliente@exemplo.com')
+        espera = int(self.tentar_login('cliente@exemplo.com')['Retry-After'])
+        self.agora += espera - 1
+        self.assertEqual(self.tentar_login('cliente@exemplo.com').status_code, 429)
+        self.agora += 1
+        self.assertEqual(self.tentar_login('cliente@exemplo.com').status_code, 200)
+
+    def test_conta_vale_para_qualquer_ip_e_ip_para_qualquer_conta(self):
+        capacidade = settings.LIMITES_REQUISICOES['login']['conta'][0]
+        for i in range(capacidade):
+            self.tentar_login('cliente@exemplo.com', ip=f'10.0.0.{i}')
+        self.assertEqual(self.tentar_login('cliente@exemplo.com', ip='10.0.1.1').status_code, 429)
+        self.assertEqual(self.tentar_login('outro@exemplo.com', ip='10.0.0.1').status_code, 200)
+
+        capacidade_ip = settings.LIMITES_REQUISICOES['login']['ip'][0]
+        for i in range(capacidade_ip):
+            self.tentar_login(f'cliente{i}@exemplo.com', ip='10.0.2.1')
+        self.assertEqual(self.tentar_login('novo@exemplo.com', ip='10.0.2.1').status_code, 429)
+        self.assertEqual(self.tentar_login('novo@exemplo.com', ip='10.0.2.2').status_code, 200)
+
+    def test_telefone_em_outro_formato_conta_na_mesma_chave(self):
+        capacidade = settings.LIMITES_REQUISICOES['login']['conta'][0]
+        for i in range(capacidade):
+            self.tentar_login('(11) 99999-0000', ip=f'10.0.3.{i}')
+        self.assertEqual(self.tentar_login('11999990000', ip='10.0.4.1').status_code, 429)
+
+    @override_settings(LIMITES_X_FORWARDED_FOR=True)
+    def test_ip_do_proxy_vem_do_x_forwarded_for(self):
+        capacidade = settings.LIMITES_REQUISICOES['login']['ip'][0]
+        for i in range(capacidade):
+            self.client.post(reverse('login'), {'usuario': f'cliente{i}@exemplo.com', 'senha': 'errada'},
+                             REMOTE_ADDR='10.9.9.9', HTTP_X_FORWARDED_FOR=f'1.2.3.{i}, 10.0.5.1')
+        # O endereço forjado pelo cliente (primeiro da lista) não muda a chave
+        resposta = self.client.post(reverse('login'), {'usuario': 'novo@exemplo.com', 'senha': 'errada'},
+                                    REMOTE_ADDR='10.9.9.9', HTTP_X_FORWARDED_FOR='5.6.7.8, 10.0.5.1')
+        self.assertEqual(resposta.status_code, 429)
+        resposta = self.client.post(reverse('login'), {'usuario': 'novo@exemplo.com', 'senha': 'errada'},
+                                    REMOTE_ADDR='10.9.9.9', HTTP_X_FORWARDED_FOR='10.0.5.2')
+        self.assertEqual(resposta.status_code, 200)
+
+    @override_settings(LIMITES_ATIVOS=False)
+    def test_desligado_nao_limita(self):
+        capacidade = settings.LIMITES_REQUISICOES['login']['conta'][0]
+        for _ in range(capacidade + 1):
+            self.assertEqual(self.tentar_login('cliente@exemplo.com').status_code, 200)
+
+    def test_encher_o_cache_padrao_nao_zera_os_contadores(self):
+        capacidade = settings.LIMITES_REQUISICOES['login']['conta'][0]
+        for _ in range(capacidade):
+            self.tentar_login('cliente@exemplo.com')
+        # Páginas, disponibilidade e versões bem além do MAX_ENTRIES do cache padrão
+        cache.set_many({f'disponibilidade:teste:{i}': i for i in range(1000)})
+        self.assertEqual(self.tentar_login('cliente@exemplo.com').status_code, 429)
+
+    def test_so_conta_os_metodos_configurados(self):
+        capacidade = settings.LIMITES_REQUISICOES['login']['ip'][0]
+        for _ in range(capacidade + 1):
+            self.assertEqual(self.client.get(reverse('login')).status_code, 200)
+
+    def test_requisicoes_simultaneas_nao_passam_do_limite(self):
+        # Sem leitura e escrita separadas, cada requisição vê a contagem das anteriores
+        baldes = {'limite:teste': (5, 60)}
+        inicio = threading.Barrier(20)
+        aceitas = []
+
+        def requisicao():
+            inicio.wait()
+            if not consumir(cache, baldes, self.agora):
+                aceitas.append(1)
+
+        threads = [threading.Thread(target=requisicao) for _ in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(aceitas), 5)
+
+    def test_recusa_nao_consome_os_outros_limites(self):
+        baldes = {'limite:ip': (10, 60), 'limite:conta': (1, 60)}
+        self.assertEqual(consumir(cache, baldes, self.agora), 0)
+        for _ in range(5):
+            self.assertGreater(consumir(cache, baldes, self.agora), 0)
+        self.assertEqual(consumir(cache, {'limite:ip': (10, 60)}, self.agora), 0)
+        self.assertEqual(cache.get(f'limite:ip:{int(self.agora // 10)}'), 2)
+
+
+@override_settings(LIMITES_ATIVOS=False)
+class InstrumentacaoTests(TestCase):
+    """Server-Timing, aviso de N+1 e acesso às métricas do InstrumentacaoMiddleware"""
+
+    def repetir_consulta(self, vezes):
+        def view(request):
+            for _ in range(vezes):
+                list(Servico.objects.filter(pk=1))
+            return HttpResponse('ok')
+        pedido = RequestFactory().get('/teste/')
+        return InstrumentacaoMiddleware(view)(pedido)
+
+    @override_settings(INSTRUMENTACAO_SERVER_TIMING=True)
+    def test_server_timing(self):
+        resposta = self.repetir_consulta(2)
+        self.assertRegex(resposta['Server-Timing'], r'^total;dur=[\d.]+, db;dur=[\d.]+;desc="2 consultas"$')
+
+    @override_settings(INSTRUMENTACAO_SERVER_TIMING=False)
+    def test_server_timing_desligado(self):
+        self.assertNotIn('Server-Timing', self.repetir_consulta(1))
+
+    @override_settings(INSTRUMENTACAO_N_MAIS_UM=3)
+    def test_avisa_n_mais_um_a_partir_do_limite(self):
+        with self.assertNoLogs('core.instrumentacao', 'WARNING'):
+            self.repetir_consulta(2)
+        with self.assertLogs('core.instrumentacao', 'WARNING') as logs:
+            self.repetir_consulta(3)
+        self.assertIn('3× SELECT', logs.output[0])
+
+    def test_metricas_fechadas_sem_token(self):
+        with override_settings(METRICAS_TOKEN=''):
+            # Atrás de um proxy local todo pedido vem de 127.0.0.1: não pode bastar
+            self.assertEqual(self.client.get(reverse('metricas'), REMOTE_ADDR='127.0.0.1').status_code, 403)
+
+    @override_settings(METRICAS_TOKEN='segredo')
+    def test_metricas_com_token(self):
+        self.client.get(reverse('contato'))
+        resposta = self.client.get(reverse('metricas'))
+        self.assertEqual(resposta.status_code, 401)
+        self.assertEqual(resposta['WWW-Authenticate'], 'Bearer')
+        resposta = self.client.get(reverse('metricas'), HTTP_AUTHORIZATION='Bearer outro')
+        self.assertEqual(resposta.status_code, 401)
+
+        resposta = self.client.get(reverse('metricas'), HTTP_AUTHORIZATION='Bearer segredo')
+        self.assertEqual(resposta.status_code, 200)
+        self.assertIn('django_requisicoes_total{view="contato",metodo="GET",status="200"}', resposta.content.decode())
+
+
+class LimparSessoesTests(TestCase):
+    """Comando limpar_sessoes: lotes pequenos, só nos backends com tabela, argumentos validados"""
+
+    def setUp(self):
+        agora = timezone.now()
+        Session.objects.bulk_create(
+            [Session(session_key=f'expirada{i}', session_data='', expire_date=agora - timedelta(days=1))
+             for i in range(7)]
+            + [Session(session_key=f'valida{i}', session_data='', expire_date=agora + timedelta(days=1))
+               for i in range(2)]
+        )
+
+    def limpar(self, *args, **opcoes):
+        saida = StringIO()
+        call_command('limpar_sessoes', *args, stdout=saida, **opcoes)
+        return saida.getvalue()
+
+    def test_apaga_as_expiradas_em_lotes(self):
+        with CaptureQueriesContext(connection) as consultas, \
+                mock.patch('main.management.commands.limpar_sessoes._time.sleep') as pausa:
+            saida = self.limpar(lote=3, pausa=0.5)
+        apagamentos = [consulta for consulta in consultas.captured_queries if consulta['sql'].startswith('DELETE')]
+        self.assertEqual(len(apagamentos), 3)
+        self.assertEqual(pausa.call_count, 3)
+        self.assertIn('7 sessões expiradas removidas', saida)
+        self.assertEqual(sorted(Session.objects.values_list('session_key', flat=True)), ['valida0', 'valida1'])
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.cached_db')
+    def test_cached_db_tambem_usa_a_tabela(self):
+        self.assertIn('7 sessões expiradas removidas', self.limpar())
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.signed_cookies')
+    def test_backend_sem_tabela_nao_toca_o_banco(self):
+        with self.assertNumQueries(0):
+            saida = self.limpar()
+        self.assertIn('nada a limpar', saida)
+        self.assertEqual(Session.objects.count(), 9)
+
+    def test_argumentos_invalidos(self):
+        for args, opcoes in (((), {'lote': 0}), ((), {'pausa': -1}), (('--lote', 'muitos'), {})):
+            with self.subTest(args=args, opcoes=opcoes), self.assertRaises(CommandError):
+                self.limpar(*args, **opcoes)
+        self.assertEqual(Session.objects.count(), 9)
+
+
+class SessaoEmCacheTests(TestCase):
+    """cached_db só sobe com um cache de sessão compartilhado entre processos"""
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.cached_db', SESSION_CACHE_ALIAS='default')
+    def test_cached_db_com_cache_local_e_erro(self):
+        self.assertEqual([erro.id for erro in sessao_em_cache_compartilhado(None)], ['main.E001'])
+
+    def test_cached_db_com_cache_compartilhado(self):
+        caches = {**settings.CACHES, 'sessoes': {'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+                                                 'LOCATION': 'redis://localhost:6379'}}
+        with self.settings(SESSION_ENGINE='django.contrib.sessions.backends.cached_db',
+                           SESSION_CACHE_ALIAS='sessoes', CACHES=caches):
+            self.assertEqual(sessao_em_cache_compartilhado(None), [])
+        with self.settings(SESSION_ENGINE='django.contrib.sessions.backends.db'):
+            self.assertEqual(sessao_em_cache_compartilhado(None), [])
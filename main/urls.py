@@ -1,9 +1,18 @@
+from django.conf import settings
 from django.urls import path
 from main.views import *
 from clientes.views import LoginView, LogoutView, CadastroView
-from agendamento.views import MyAgendamentos, AgendaView, horarios_disponiveis, deletar_agendamento
+from agendamento.views import MyAgendamentos, AgendaView, horarios_disponiveis, horarios_disponiveis_periodo, deletar_agendamento
+from agendamento.views import horarios_disponiveis_stream, ahorarios_disponiveis_stream, pre_reserva
+from agendamento.views import ahorarios_disponiveis, adeletar_agendamento
 from servicos.views import ServicosView
 
+# Sob ASGI, as APIs mais acessadas usam as views assíncronas
+if settings.ASYNC_VIEWS:
+    horarios_disponiveis = ahorarios_disponiveis
+    horarios_disponiveis_stream = ahorarios_disponiveis_stream
+    deletar_agendamento = adeletar_agendamento
+
 urlpatterns = [
     path('', IndexView.as_view(), name='index'),
     path('login/', LoginView.as_view(), name='login'),
@@ -11,7 +20,10 @@ urlpatterns = [
     path("cadastro/", CadastroView.as_view(), name="cadastro"),
     path("servicos/", ServicosView, name="servicos"),
     path("agenda/", AgendaView.as_view(), name="agenda"),
+    path("agenda/pre-reserva/", pre_reserva, name="pre_reserva"),
     path("horarios-disponiveis/", horarios_disponiveis, name="horarios_disponiveis"),
+    path("horarios-disponiveis/stream/", horarios_disponiveis_stream, name="horarios_disponiveis_stream"),
+    path("horarios-disponiveis/periodo/", horarios_disponiveis_periodo, name="horarios_disponiveis_periodo"),
     path("contato/", ContatoView.as_view(), name="contato"),
     path("my-agendamento/", MyAgendamentos.as_view(), name="my-agendamento"),
     path("deletar-agendamento/<int:agendamento_id>/", deletar_agendamento, name="deletar-agendamento"),
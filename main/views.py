@@ -1,6 +1,8 @@
 from django.shortcuts import redirect
 from django.views.generic import TemplateView
 from django.urls import reverse_lazy
+from django.utils.decorators import method_decorator
+from main.paginas import contexto_fragmentos, pagina_publica
 from servicos.models import Planos
 
 # Mixin customizado para autenticação baseada em sessão
@@ -15,13 +17,17 @@ class SessionLoginRequiredMixin:
             return redirect(f"{self.login_url}?{self.redirect_field_name}={request.get_full_path()}")
         return super().dispatch(request, *args, **kwargs)
 
+@method_decorator(pagina_publica, name='dispatch')
 class IndexView(TemplateView):
     template_name = 'index.html'
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
+        # Consulta preguiçosa: com o fragmento em cache, o banco não é lido
         context['planos'] = Planos.objects.all()
+        context.update(contexto_fragmentos())
         return context
 
+@method_decorator(pagina_publica, name='dispatch')
 class ContatoView(TemplateView):
     template_name = 'contato.html'
\ No newline at end of file
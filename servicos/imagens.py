@@ -0,0 +1,94 @@
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+# Larguras (em px) das versões reduzidas geradas para cada imagem enviada
+LARGURAS = (320, 640, 1024)
+
+# extensão -> (formato do Pillow, opções de gravação)
+FORMATOS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 6}),
+    'jpg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+
+def caminho_derivada(nome, largura, extensao):
+    """'servicos/corte.jpg' -> 'servicos/corte-640w.webp', ao lado do original"""
+    base, _ = os.path.splitext(nome)
+    return f'{base}-{largura}w.{extensao}'
+
+
+def larguras_para(largura_original):
+    """Larguras geradas: as de LARGURAS que cabem no original e, se ele for menor que a maior, a própria largura dele"""
+    larguras = [largura for largura in LARGURAS if largura <= largura_original]
+    if largura_original < LARGURAS[-1] and largura_original not in larguras:
+        larguras.append(largura_original)
+    return larguras
+
+
+def gerar_arquivos(nome, storage=default_storage):
+    """
+    Gera as versões WebP e JPEG de uma imagem já gravada no storage e retorna
+    as larguras geradas. Não toca no banco, para poder rodar em outro processo.
+    """
+    with storage.open(nome, 'rb') as arquivo:
+        imagem = ImageOps.exif_transpose(Image.open(arquivo))
+        imagem = imagem.convert('RGB')
+
+    larguras = larguras_para(imagem.width)
+    for largura in larguras:
+        altura = round(imagem.height * largura / imagem.width)
+        reduzida = imagem.resize((largura, altura), Image.LANCZOS) if largura != imagem.width else imagem
+        for extensao, (formato, opcoes) in FORMATOS.items():
+            conteudo = BytesIO()
+            reduzida.save(conteudo, formato, **opcoes)
+            caminho = caminho_derivada(nome, largura, extensao)
+            if storage.exists(caminho):
+                storage.delete(caminho)
+            storage.save(caminho, ContentFile(conteudo.getvalue()))
+    return larguras
+
+
+def remover_arquivos(nome, larguras, storage=default_storage):
+    """Apaga as versões reduzidas de uma imagem (o original fica)"""
+    for largura in larguras:
+        for extensao in FORMATOS:
+            caminho = caminho_derivada(nome, largura, extensao)
+            if storage.exists(caminho):
+                storage.delete(caminho)
+
+
+class ImagemResponsiva:
+    """
+    Atributos para <picture>/srcset de modelos com `imagem` e `imagem_larguras`.
+    Sem versões geradas (ex.: antes do `gerar_imagens`), usa o arquivo original.
+    """
+
+    def _srcset(self, extensao):
+        if not self.imagem or not self.imagem_larguras:
+            return ''
+        storage = self.imagem.storage
+        return ', '.join(
+            f'{storage.url(caminho_derivada(self.imagem.name, largura, extensao))} {largura}w'
+            for largura in self.imagem_larguras
+        )
+
+    @property
+    def imagem_srcset_webp(self):
+        return self._srcset('webp')
+
+    @property
+    def imagem_srcset_jpeg(self):
+        return self._srcset('jpg')
+
+    @property
+    def imagem_src(self):
+        """URL do <img>: a maior versão JPEG gerada, ou o original"""
+        if not self.imagem:
+            return ''
+        if not self.imagem_larguras:
+            return self.imagem.url
+        return self.imagem.storage.url(caminho_derivada(self.imagem.name, max(self.imagem_larguras), 'jpg'))
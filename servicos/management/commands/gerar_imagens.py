@@ -0,0 +1,81 @@
+import os
+import time as _time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+
+from agendamento import catalogo
+from main.paginas import invalidar_paginas
+from servicos import imagens
+from servicos.models import Planos, Servico
+
+MODELOS = {'servico': Servico, 'planos': Planos}
+
+
+class Command(BaseCommand):
+    help = (
+        'Gera as versões reduzidas (WebP/JPEG) das imagens de serviços e planos já '
+        'enviadas, em paralelo. Imagens novas já são processadas no envio.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processos', type=int, default=os.cpu_count() or 1,
+                            help='Processos em paralelo (padrão: número de CPUs)')
+        parser.add_argument('--forcar', action='store_true',
+                            help='Regera também as imagens que já têm versões reduzidas')
+        parser.add_argument('--modelo', choices=sorted(MODELOS), action='append',
+                            help='Processa só este modelo (pode repetir). Padrão: todos')
+
+    def handle(self, *args, **options):
+        if options['processos'] < 1:
+            raise CommandError('--processos deve ser maior que zero.')
+
+        # nome do arquivo -> [(modelo, pk)]; registros com o mesmo arquivo são processados uma vez
+        pendentes = defaultdict(list)
+        # nome do arquivo -> larguras já geradas, para apagar as que deixarem de valer
+        anteriores = defaultdict(set)
+        for nome_modelo in options['modelo'] or sorted(MODELOS):
+            modelo = MODELOS[nome_modelo]
+            registros = modelo.objects.exclude(imagem='').exclude(imagem__isnull=True)
+            if not options['forcar']:
+                registros = registros.filter(imagem_larguras=[])
+            for pk, imagem, larguras in registros.values_list('pk', 'imagem', 'imagem_larguras'):
+                pendentes[imagem].append((modelo, pk))
+                anteriores[imagem].update(larguras or [])
+
+        if not pendentes:
+            self.stdout.write('Nenhuma imagem pendente.')
+            return
+
+        comeco = _time.perf_counter()
+        # Os processos filhos não podem herdar as conexões abertas com o banco
+        connections.close_all()
+        geradas = falhas = 0
+        with ProcessPoolExecutor(max_workers=options['processos']) as executor:
+            tarefas = {executor.submit(imagens.gerar_arquivos, nome): nome for nome in pendentes}
+            for tarefa in as_completed(tarefas):
+                nome = tarefas[tarefa]
+                try:
+                    larguras = tarefa.result()
+                except (OSError, ValueError) as erro:
+                    falhas += 1
+                    self.stderr.write(self.style.WARNING(f'{nome}: {erro}'))
+                    continue
+                with transaction.atomic():
+                    for modelo, pk in pendentes[nome]:
+                        modelo.objects.filter(pk=pk).update(imagem_larguras=larguras)
+                # Com --forcar, versões de larguras que não se aplicam mais virariam órfãs
+                imagens.remover_arquivos(nome, sorted(anteriores[nome] - set(larguras)))
+                geradas += 1
+
+        # update() não dispara sinais: descarta o catálogo e as páginas em cache
+        catalogo.invalidar()
+        invalidar_paginas()
+        duracao = _time.perf_counter() - comeco
+        self.stdout.write(self.style.SUCCESS(
+            f'{geradas} imagem(ns) processada(s) em {duracao:.1f}s com {options["processos"]} processo(s).'
+        ))
+        if falhas:
+            self.stderr.write(self.style.WARNING(f'{falhas} imagem(ns) não puderam ser lidas.'))
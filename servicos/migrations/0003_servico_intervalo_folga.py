@@ -0,0 +1,24 @@
+# Generated by Django 5.2.6 on 2026-10-18 17:10
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('servicos', '0002_planos'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='servico',
+            name='folga_minutos',
+            field=models.PositiveSmallIntegerField(default=0, help_text='Tempo de limpeza/preparo após o serviço, em que a cadeira segue ocupada'),
+        ),
+        migrations.AddField(
+            model_name='servico',
+            name='intervalo_minutos',
+            field=models.PositiveSmallIntegerField(blank=True, help_text='Intervalo entre os horários oferecidos; vazio usa o do horário de funcionamento', null=True, validators=[django.core.validators.MinValueValidator(1)]),
+        ),
+    ]
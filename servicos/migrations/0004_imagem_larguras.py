@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-18 19:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('servicos', '0003_servico_intervalo_folga'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='planos',
+            name='imagem_larguras',
+            field=models.JSONField(blank=True, default=list, editable=False, help_text='Larguras das versões reduzidas (WebP/JPEG) geradas da imagem'),
+        ),
+        migrations.AddField(
+            model_name='servico',
+            name='imagem_larguras',
+            field=models.JSONField(blank=True, default=list, editable=False, help_text='Larguras das versões reduzidas (WebP/JPEG) geradas da imagem'),
+        ),
+    ]
@@ -1,21 +1,40 @@
+from django.core.validators import MinValueValidator
 from django.db import models
 
+from servicos.imagens import ImagemResponsiva
+
 # Create your models here.
-class Servico(models.Model):
+class Servico(ImagemResponsiva, models.Model):
     nome = models.CharField(max_length=100)
     descricao = models.TextField(blank=True, null=True)
     duracao = models.DurationField(help_text="Duração do serviço (hh:mm:ss)")
     preco = models.DecimalField(max_digits=8, decimal_places=2)
     imagem = models.ImageField(upload_to='servicos/', blank=True, null=True)
+    imagem_larguras = models.JSONField(
+        default=list, blank=True, editable=False,
+        help_text="Larguras das versões reduzidas (WebP/JPEG) geradas da imagem"
+    )
+    intervalo_minutos = models.PositiveSmallIntegerField(
+        blank=True, null=True, validators=[MinValueValidator(1)],
+        help_text="Intervalo entre os horários oferecidos; vazio usa o do horário de funcionamento"
+    )
+    folga_minutos = models.PositiveSmallIntegerField(
+        default=0,
+        help_text="Tempo de limpeza/preparo após o serviço, em que a cadeira segue ocupada"
+    )
 
     def __str__(self):
         return self.nome
     
-class Planos(models.Model):
+class Planos(ImagemResponsiva, models.Model):
     nome = models.CharField(max_length=100)
     descricao = models.TextField(blank=True, null=True)
     preco = models.DecimalField(max_digits=8, decimal_places=2)
     imagem = models.ImageField(upload_to='planos/', blank=True, null=True)
+    imagem_larguras = models.JSONField(
+        default=list, blank=True, editable=False,
+        help_text="Larguras das versões reduzidas (WebP/JPEG) geradas da imagem"
+    )
 
     def __str__(self):
         return self.nome
\ No newline at end of file
@@ -0,0 +1,62 @@
+import logging
+
+from django.db import transaction
+from django.db.models.signals import post_save, pre_save
+from django.dispatch import receiver
+from PIL import Image
+
+from agendamento import catalogo
+from main.paginas import invalidar_paginas
+from servicos import imagens
+from servicos.models import Planos, Servico
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(pre_save, sender=Planos)
+@receiver(pre_save, sender=Servico)
+def guardar_imagem_anterior(sender, instance, **kwargs):
+    anterior = None
+    if instance.pk is not None:
+        anterior = sender.objects.filter(pk=instance.pk).values('imagem', 'imagem_larguras').first()
+    instance._imagem_anterior = anterior
+
+
+@receiver(post_save, sender=Planos)
+@receiver(post_save, sender=Servico)
+def gerar_versoes_da_imagem(sender, instance, raw=False, **kwargs):
+    """Gera as versões reduzidas quando a imagem é enviada ou trocada, depois do commit"""
+    if raw:
+        return
+    anterior = getattr(instance, '_imagem_anterior', None) or {}
+    nome = instance.imagem.name if instance.imagem else ''
+    if nome == (anterior.get('imagem') or '') and (instance.imagem_larguras or not nome):
+        return
+    # Depois do commit: a requisição não segura a transação enquanto o Pillow
+    # trabalha, e um rollback não apaga as versões que o banco ainda usa
+    transaction.on_commit(lambda: _gerar_versoes(sender, instance, nome, anterior))
+
+
+def _gerar_versoes(sender, instance, nome, anterior):
+    # Roda depois do commit: um arquivo ruim não pode derrubar a requisição já confirmada
+    try:
+        if anterior.get('imagem') and anterior.get('imagem') != nome:
+            imagens.remover_arquivos(anterior['imagem'], anterior.get('imagem_larguras') or [])
+    except OSError:
+        logger.exception('Não foi possível apagar as versões de %s', anterior['imagem'])
+
+    larguras = []
+    if nome:
+        try:
+            larguras = imagens.gerar_arquivos(nome, instance.imagem.storage)
+        except (OSError, ValueError, Image.DecompressionBombError):
+            # Arquivo ilegível ou grande demais para o Pillow: os templates usam o original
+            logger.warning('Não foi possível gerar as versões de %s', nome, exc_info=True)
+            larguras = []
+    instance.imagem_larguras = larguras
+    # update() não dispara post_save de novo; se a imagem já foi trocada outra vez, a próxima geração cuida dela
+    sender.objects.filter(pk=instance.pk, imagem=nome).update(imagem_larguras=larguras)
+    # Nem os sinais do catálogo e das páginas: sem isso, uma página guardada
+    # enquanto o Pillow trabalhava ficaria sem srcset até expirar
+    catalogo.invalidar()
+    invalidar_paginas()
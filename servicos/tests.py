@@ -1,3 +1,110 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from PIL import Image
+
+from agendamento import catalogo
+from main.paginas import versao_paginas
+from servicos import imagens
+from servicos.models import Servico
+
+
+def imagem_png(nome, largura, altura):
+    conteudo = BytesIO()
+    Image.new('RGB', (largura, altura), (180, 40, 40)).save(conteudo, 'PNG')
+    return SimpleUploadedFile(nome, conteudo.getvalue(), content_type='image/png')
+
+
+class MidiaTemporariaMixin:
+    def setUp(self):
+        super().setUp()
+        self.midia = tempfile.mkdtemp()
+        configuracao = override_settings(MEDIA_ROOT=self.midia)
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+        self.addCleanup(shutil.rmtree, self.midia)
+
+    def arquivos(self):
+        return sorted(os.listdir(os.path.join(self.midia, 'servicos')))
+
+
+class LargurasTests(SimpleTestCase):
+    def test_larguras_geradas(self):
+        self.assertEqual(imagens.larguras_para(200), [200])
+        self.assertEqual(imagens.larguras_para(320), [320])
+        self.assertEqual(imagens.larguras_para(800), [320, 640, 800])
+        self.assertEqual(imagens.larguras_para(1024), [320, 640, 1024])
+        self.assertEqual(imagens.larguras_para(2000), [320, 640, 1024])
+
+
+class VersoesDaImagemTests(MidiaTemporariaMixin, TestCase):
+    def test_versoes_geradas_depois_do_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            servico = Servico.objects.create(
+                nome='Corte', duracao=timedelta(minutes=30), preco=30, imagem=imagem_png('corte.png', 1024, 600)
+            )
+            # Antes do commit só existe o original
+            self.assertEqual(self.arquivos(), ['corte.png'])
+        for callback in callbacks:
+            callback()
+        servico.refresh_from_db()
+        self.assertEqual(servico.imagem_larguras, [320, 640, 1024])
+        self.assertIn('corte-1024w.webp', self.arquivos())
+        self.assertTrue(servico.imagem_src.endswith('corte-1024w.jpg'))
+
+    def test_paginas_e_catalogo_invalidados_depois_das_versoes(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            Servico.objects.create(
+                nome='Corte', duracao=timedelta(minutes=30), preco=30, imagem=imagem_png('corte.png', 700, 400)
+            )
+        # Página guardada enquanto as versões ainda não existem
+        versao = versao_paginas()
+        catalogo.catalogo()
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(versao_paginas(), versao)
+        self.assertEqual(catalogo.catalogo().servicos[Servico.objects.get().pk].imagem_larguras, [320, 640, 700])
+
+    def test_imagem_grande_demais_nao_derruba_a_requisicao(self):
+        with mock.patch.object(imagens, 'gerar_arquivos', side_effect=Image.DecompressionBombError('bomba')):
+            with self.assertLogs('servicos.signals', 'WARNING'), self.captureOnCommitCallbacks(execute=True):
+                servico = Servico.objects.create(
+                    nome='Corte', duracao=timedelta(minutes=30), preco=30, imagem=imagem_png('corte.png', 700, 400)
+                )
+        servico.refresh_from_db()
+        self.assertEqual(servico.imagem_larguras, [])
+
+    def test_troca_de_imagem_apaga_as_versoes_antigas(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            servico = Servico.objects.create(
+                nome='Corte', duracao=timedelta(minutes=30), preco=30, imagem=imagem_png('corte.png', 700, 400)
+            )
+        with self.captureOnCommitCallbacks(execute=True):
+            servico.imagem = imagem_png('barba.png', 300, 200)
+            servico.save()
+        self.assertFalse([nome for nome in self.arquivos() if nome.startswith('corte-')])
+        self.assertEqual(Servico.objects.get().imagem_larguras, [300])
+
+
+class GerarImagensTests(MidiaTemporariaMixin, TransactionTestCase):
+    def test_forcar_apaga_versoes_que_nao_se_aplicam_mais(self):
+        servico = Servico.objects.create(
+            nome='Corte', duracao=timedelta(minutes=30), preco=30, imagem=imagem_png('corte.png', 800, 500)
+        )
+        # Versão de uma largura que não é mais gerada (ex.: LARGURAS mudou)
+        for extensao in imagens.FORMATOS:
+            with open(os.path.join(self.midia, imagens.caminho_derivada(servico.imagem.name, 1600, extensao)), 'wb'):
+                pass
+        Servico.objects.update(imagem_larguras=[320, 640, 1600])
+
+        call_command('gerar_imagens', forcar=True, processos=1, stdout=StringIO())
+        self.assertEqual(Servico.objects.get().imagem_larguras, [320, 640, 800])
+        self.assertFalse([nome for nome in self.arquivos() if '-1600w.' in nome])
+        self.assertIn('corte-800w.jpg', self.arquivos())
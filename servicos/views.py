@@ -1,11 +1,14 @@
 from django.shortcuts import render
 from django.views.generic import ListView
+from agendamento.catalogo import catalogo
+from main.paginas import contexto_fragmentos, pagina_publica
 from servicos.models import Servico, Planos
 
 # Create your views here.
+@pagina_publica
 def ServicosView(request):
-    servicos = Servico.objects.all()  # pega todos os serviços
-    return render(request, "servicos.html", {"servicos": servicos})
+    servicos = list(catalogo().servicos.values())  # pega todos os serviços (do catálogo em memória)
+    return render(request, "servicos.html", {"servicos": servicos, **contexto_fragmentos()})
 
 class ServicosListView(ListView):
     model = Servico